@@ -0,0 +1,146 @@
+# acesso_rede.py
+import os
+import json
+import time
+import logging
+import threading
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+NOME_ARQUIVO_DISJUNTOR = "disjuntor_rede.json" # Na raiz da pasta de cache
+ESPERA_MAXIMA_DISJUNTOR_S = 60 * 60 # A espera dobra a cada falha seguida, até uma hora
+
+_lock = threading.Lock()
+_operacoes_pendentes = {} # {nome_operacao: Thread} ainda bloqueadas após o prazo
+
+def executar_com_prazo(funcao, prazo_segundos, nome_operacao):
+    """
+    Executa funcao() em uma thread auxiliar e lança TimeoutError se ela não terminar em prazo_segundos.
+    A thread bloqueada (ex: servidor UNC que não responde) é abandonada; enquanto ela não terminar,
+    novas chamadas com o mesmo nome_operacao falham imediatamente em vez de acumular threads.
+    """
+    with _lock:
+        pendente = _operacoes_pendentes.get(nome_operacao)
+        if pendente and pendente.is_alive():
+            raise TimeoutError(f"{nome_operacao}: operação anterior ainda não respondeu")
+        _operacoes_pendentes.pop(nome_operacao, None)
+
+    resultado = {}
+    def executar():
+        try:
+            resultado["valor"] = funcao()
+        except BaseException as e:
+            resultado["erro"] = e
+
+    thread_operacao = threading.Thread(target=executar, name=f"Prazo-{nome_operacao}", daemon=True)
+    thread_operacao.start()
+    thread_operacao.join(prazo_segundos)
+    if thread_operacao.is_alive():
+        with _lock:
+            _operacoes_pendentes[nome_operacao] = thread_operacao
+        raise TimeoutError(f"{nome_operacao}: sem resposta em {prazo_segundos} s")
+    if "erro" in resultado:
+        raise resultado["erro"]
+    return resultado["valor"]
+
+def sondar_pasta(pasta, prazo_segundos, verificar=os.path.isdir):
+    """
+    Verifica se a pasta está acessível em no máximo prazo_segundos (fora da thread chamadora).
+    Retorna (acessivel, latencia_ms); lança TimeoutError se o prazo vencer.
+    """
+    inicio = time.perf_counter()
+    acessivel = executar_com_prazo(lambda: verificar(pasta), prazo_segundos, "sondagem_rede")
+    return bool(acessivel), (time.perf_counter() - inicio) * 1000
+
+
+class DisjuntorRede:
+    """
+    Disjuntor (circuit breaker) do acesso à pasta de rede, persistido entre execuções.
+    Após uma falha (pasta inacessível ou sem resposta no prazo), as próximas execuções vão direto
+    ao cache durante a espera, sem pagar de novo o tempo da sondagem; vencida a espera, uma nova
+    tentativa é feita ("meio aberto"). A espera dobra a cada falha seguida e zera no primeiro sucesso.
+    """
+
+    def __init__(self, pasta_cache, pasta_rede, espera_inicial_s=300):
+        self.caminho_arquivo = os.path.join(pasta_cache, NOME_ARQUIVO_DISJUNTOR)
+        self.pasta_rede = pasta_rede
+        self.espera_inicial_s = espera_inicial_s
+        self._registro = {"falhas_seguidas": 0, "aberto_ate": 0, "ultima_falha": None, "motivo": None, "latencia_ms": None}
+        self._carregar()
+
+    def _carregar(self):
+        try:
+            with open(self.caminho_arquivo, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Estado do disjuntor da rede inválido, será recriado: {e}")
+            return
+        registro = dados.get(self.pasta_rede) if isinstance(dados, dict) else None
+        if isinstance(registro, dict):
+            self._registro.update(registro)
+
+    def _salvar(self):
+        """Grava o estado desta pasta de rede de forma atômica, preservando o das demais."""
+        try:
+            with open(self.caminho_arquivo, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+            if not isinstance(dados, dict):
+                dados = {}
+        except (OSError, ValueError):
+            dados = {}
+        dados[self.pasta_rede] = self._registro
+        caminho_temp = f"{self.caminho_arquivo}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.caminho_arquivo), exist_ok=True)
+            with open(caminho_temp, 'w', encoding='utf-8') as f:
+                json.dump(dados, f, ensure_ascii=False, indent=2)
+            os.replace(caminho_temp, self.caminho_arquivo)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o estado do disjuntor da rede: {e}")
+
+    def estado(self):
+        """'fechado' (rede em uso), 'aberto' (usando só o cache até a espera vencer) ou 'meio_aberto' (nova tentativa)."""
+        if not self._registro["falhas_seguidas"]:
+            return "fechado"
+        return "aberto" if time.time() < self._registro["aberto_ate"] else "meio_aberto"
+
+    def permite_tentativa(self):
+        return self.estado() != "aberto"
+
+    def segundos_restantes(self):
+        return max(0.0, self._registro["aberto_ate"] - time.time())
+
+    def registrar_sucesso(self, latencia_ms=None):
+        estava_com_falhas = bool(self._registro["falhas_seguidas"])
+        alterado = estava_com_falhas or latencia_ms is not None
+        self._registro.update({"falhas_seguidas": 0, "aberto_ate": 0, "motivo": None})
+        if latencia_ms is not None:
+            self._registro["latencia_ms"] = round(latencia_ms, 1)
+        if estava_com_falhas:
+            logger.info(f"Pasta de rede '{self.pasta_rede}' voltou a responder. Disjuntor fechado.")
+        if alterado:
+            self._salvar()
+
+    def registrar_falha(self, motivo):
+        falhas = self._registro["falhas_seguidas"] + 1
+        espera = min(self.espera_inicial_s * 2 ** (falhas - 1), ESPERA_MAXIMA_DISJUNTOR_S)
+        agora = time.time()
+        self._registro.update({
+            "falhas_seguidas": falhas, "aberto_ate": agora + espera,
+            "ultima_falha": agora, "motivo": str(motivo)[:300],
+        })
+        logger.warning(
+            f"Falha no acesso à pasta de rede '{self.pasta_rede}' ({falhas}ª seguida): {motivo}. "
+            f"Disjuntor aberto: usando apenas o cache pelos próximos {espera:.0f} s."
+        )
+        self._salvar()
+
+    def resumo(self):
+        return {
+            "estado": self.estado(), "falhas_seguidas": self._registro["falhas_seguidas"],
+            "segundos_restantes": round(self.segundos_restantes()), "latencia_ms": self._registro["latencia_ms"],
+            "motivo": self._registro["motivo"],
+        }
@@ -0,0 +1,85 @@
+# animacao_gif.py
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from PIL import Image # pip install Pillow
+
+import carregador_imagens
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+DURACAO_PADRAO_QUADRO_MS = 100 # Usada quando o GIF não informa a duração do quadro
+DURACAO_MINIMA_QUADRO_MS = 20 # Navegadores tratam durações menores como ~100 ms; evitamos laços apertados
+
+class AnimacaoGif:
+    """
+    Reprodução de GIF animado com quadros decodificados e redimensionados sob demanda.
+    Apenas o próximo quadro é preparado à frente (em uma thread própria, pois o arquivo
+    aberto pelo PIL não pode ser usado por várias threads). Quadros já redimensionados
+    ficam em um cache LRU limitado em bytes e são reutilizados nas repetições da animação.
+    """
+
+    def __init__(self, caminho_imagem, largura, altura, limite_bytes_quadros):
+        self.caminho_imagem = caminho_imagem
+        self.largura = largura
+        self.altura = altura
+        self.indice_proximo = 1 # O quadro 0 já foi exibido pelo fluxo normal (prefetch)
+        self.numero_quadros = None # Conhecido após a abertura do arquivo (futuro_abertura)
+        self.quadros_atrasados = 0 # Quadros que não estavam prontos no momento de exibição
+        self.aguardando_quadro = False
+        self._img = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="AnimacaoGif")
+        self._lock = threading.Lock()
+        self._futuros = {} # {indice: Future}
+        self._quadros = carregador_imagens.CacheMemoriaImagens(limite_bytes_quadros)
+        self._duracoes = {} # {indice: duração em ms}
+        self.futuro_abertura = self._executor.submit(self._abrir)
+
+    def _abrir(self):
+        """Abre o arquivo e retorna (numero_quadros, duracao_quadro_0_ms)."""
+        self._img = Image.open(self.caminho_imagem)
+        numero_quadros = getattr(self._img, "n_frames", 1)
+        return numero_quadros, self._img.info.get("duration") or DURACAO_PADRAO_QUADRO_MS
+
+    def _decodificar_quadro(self, indice):
+        self._img.seek(indice)
+        duracao_ms = max(self._img.info.get("duration") or DURACAO_PADRAO_QUADRO_MS, DURACAO_MINIMA_QUADRO_MS)
+        quadro = self._img.convert("RGBA") # Já composto com os quadros anteriores (disposal) pelo PIL
+        quadro.thumbnail((self.largura, self.altura), Image.Resampling.LANCZOS)
+        self._quadros.adicionar(indice, quadro)
+        with self._lock:
+            self._duracoes[indice] = duracao_ms
+            self._futuros.pop(indice, None)
+        return quadro, duracao_ms
+
+    def futuro_quadro(self, indice):
+        """Retorna o Future de (quadro, duracao_ms), reaproveitando quadros já preparados."""
+        with self._lock:
+            futuro = self._futuros.get(indice)
+            if futuro is not None:
+                return futuro
+            quadro = self._quadros.obter(indice)
+            if quadro is not None:
+                futuro = Future()
+                futuro.set_result((quadro, self._duracoes[indice]))
+                return futuro
+            futuro = self._executor.submit(self._decodificar_quadro, indice)
+            self._futuros[indice] = futuro
+            return futuro
+
+    def encerrar(self):
+        """Descarta os quadros pendentes e fecha o arquivo na thread da animação."""
+        def fechar():
+            if self._img is not None:
+                self._img.close()
+        with self._lock:
+            for futuro in self._futuros.values():
+                futuro.cancel()
+            self._futuros.clear()
+        self._executor.submit(fechar)
+        self._executor.shutdown(wait=False)
+        if self.quadros_atrasados:
+            logger.debug(f"Animação '{self.caminho_imagem}': {self.quadros_atrasados} quadros exibidos com atraso.")
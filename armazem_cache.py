@@ -0,0 +1,310 @@
+# armazem_cache.py
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+
+import copiador
+import manifesto
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+NOME_INDICE = "indice_cache.json" # Índice de nomes e objetos, na raiz da pasta de cache
+SUBPASTA_OBJETOS = "objetos" # Conteúdo endereçado por hash: objetos/<hh>/<sha256><ext>
+SUBPASTA_ENTRADA = "_entrada" # Área temporária (dentro de objetos) para arquivos ainda sem hash conhecido
+VERSAO_INDICE = 2
+
+class ArmazemCache:
+    """
+    Cache local endereçado por conteúdo: cada imagem é gravada uma única vez, identificada pelo
+    hash SHA-256 do conteúdo, e um índice de nomes aponta cada arquivo da rede para o seu objeto.
+    Imagens iguais publicadas com nomes diferentes ocupam espaço apenas uma vez.
+
+    Com um limite de bytes configurado, os objetos exibidos há mais tempo são removidos (LRU)
+    para abrir espaço. Objetos marcados como protegidos (na fila de exibição) nunca são removidos.
+    """
+
+    def __init__(self, pasta_cache, limite_bytes=None, ao_remover_objeto=None):
+        self.pasta_cache = pasta_cache
+        self.pasta_objetos = os.path.join(pasta_cache, SUBPASTA_OBJETOS)
+        self.pasta_entrada = os.path.join(self.pasta_objetos, SUBPASTA_ENTRADA)
+        self.limite_bytes = limite_bytes or None
+        self.ao_remover_objeto = ao_remover_objeto # Callback(nome_arquivo_objeto), ex: limpar versões redimensionadas
+        self._lock = threading.RLock()
+        self._protegidos = set() # Hashes que não podem ser removidos (imagem atual e as ainda não exibidas na rodada)
+        self._nomes = {} # {nome_arquivo: {"hash", "tamanho", "mtime"}}
+        self._objetos = {} # {hash: {"extensao", "tamanho", "ultimo_uso"}}
+        self._bytes_reservados = 0 # Espaço reservado para cópias em andamento
+        self._carregar_indice()
+
+    # --- Índice ---
+    def _ler_indice(self):
+        """Lê o índice gravado. Retorna (nomes, objetos) ou None se não existir ou estiver inválido."""
+        try:
+            with open(os.path.join(self.pasta_cache, NOME_INDICE), 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Índice do cache inválido, será reconstruído: {e}")
+            return None
+        if not isinstance(indice, dict) or indice.get("versao") != VERSAO_INDICE:
+            logger.info("Índice do cache em formato antigo. Será reconstruído.")
+            return None
+
+        # Descarta objetos cujo arquivo sumiu (ex: pasta limpa manualmente) e nomes que apontavam para eles
+        objetos = {}
+        for hash_objeto, registro in indice.get("objetos", {}).items():
+            if os.path.isfile(self._caminho_objeto(hash_objeto, registro["extensao"])):
+                objetos[hash_objeto] = registro
+        nomes = {nome: registro for nome, registro in indice.get("nomes", {}).items() if registro.get("hash") in objetos}
+        return nomes, objetos
+
+    def _carregar_indice(self):
+        lido = self._ler_indice()
+        if lido:
+            self._nomes, self._objetos = lido
+
+    def recarregar_indice(self):
+        """
+        Substitui o estado em memória pelo índice gravado (ex: por outra instância que sincronizou o cache),
+        preservando os instantes de exibição mais recentes registrados por esta instância.
+        """
+        lido = self._ler_indice()
+        if not lido:
+            return
+        nomes, objetos = lido
+        with self._lock:
+            for hash_objeto, registro in objetos.items():
+                registro_atual = self._objetos.get(hash_objeto)
+                if registro_atual:
+                    registro["ultimo_uso"] = max(registro.get("ultimo_uso", 0), registro_atual.get("ultimo_uso", 0))
+            self._nomes, self._objetos = nomes, objetos
+
+    def salvar_indice(self):
+        """Grava o índice de forma atômica (arquivo temporário + renomeação)."""
+        with self._lock:
+            indice = {"versao": VERSAO_INDICE, "nomes": dict(self._nomes), "objetos": {h: dict(r) for h, r in self._objetos.items()}}
+        caminho_indice = os.path.join(self.pasta_cache, NOME_INDICE)
+        caminho_temp = f"{caminho_indice}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(caminho_temp, 'w', encoding='utf-8') as f:
+                json.dump(indice, f, ensure_ascii=False)
+            os.replace(caminho_temp, caminho_indice)
+        except OSError as e:
+            logger.error(f"Não foi possível gravar o índice do cache: {e}")
+
+    # --- Consultas ---
+    def _caminho_objeto(self, hash_objeto, extensao):
+        return os.path.join(self.pasta_objetos, hash_objeto[:2], hash_objeto + extensao)
+
+    def nomes(self):
+        """Retorna uma cópia do índice de nomes ({nome: {hash, tamanho, mtime}})."""
+        with self._lock:
+            return {nome: dict(registro) for nome, registro in self._nomes.items()}
+
+    def possui_objeto(self, hash_objeto):
+        with self._lock:
+            return hash_objeto in self._objetos
+
+    def caminho_por_nome(self, nome_arquivo):
+        """Retorna o caminho do objeto associado ao nome, ou None se não estiver no cache."""
+        with self._lock:
+            registro = self._nomes.get(nome_arquivo)
+            if not registro or registro["hash"] not in self._objetos:
+                return None
+            return self._caminho_objeto(registro["hash"], self._objetos[registro["hash"]]["extensao"])
+
+    def listar_caminhos(self):
+        """Retorna os caminhos dos objetos referenciados por algum nome (cada conteúdo uma única vez)."""
+        with self._lock:
+            hashes = {registro["hash"] for registro in self._nomes.values()}
+            return [self._caminho_objeto(h, self._objetos[h]["extensao"]) for h in hashes if h in self._objetos]
+
+    def tamanho_total(self):
+        with self._lock:
+            return sum(registro["tamanho"] for registro in self._objetos.values())
+
+    @staticmethod
+    def _hash_do_caminho(caminho_objeto):
+        return os.path.splitext(os.path.basename(caminho_objeto))[0]
+
+    # --- Uso pela apresentação (thread do Tkinter) ---
+    def registrar_exibicao(self, caminho_imagem):
+        """Atualiza o instante da última exibição do objeto (base da remoção LRU)."""
+        with self._lock:
+            registro = self._objetos.get(self._hash_do_caminho(caminho_imagem))
+            if registro:
+                registro["ultimo_uso"] = time.time()
+
+    def definir_protegidos(self, caminhos_imagens):
+        """Define os objetos na fila de exibição, que não podem ser removidos."""
+        with self._lock:
+            self._protegidos = {self._hash_do_caminho(caminho) for caminho in caminhos_imagens}
+
+    def acrescentar_protegidos(self, caminhos_imagens):
+        """Acrescenta objetos aos protegidos sem desproteger os definidos pela apresentação."""
+        with self._lock:
+            self._protegidos |= {self._hash_do_caminho(caminho) for caminho in caminhos_imagens}
+
+    # --- Atualização (thread de sincronização) ---
+    def caminho_entrada(self, nome_arquivo):
+        """Caminho temporário para receber um arquivo cujo hash ainda não é conhecido."""
+        os.makedirs(self.pasta_entrada, exist_ok=True)
+        return os.path.join(self.pasta_entrada, nome_arquivo)
+
+    def associar_nome(self, nome_arquivo, registro_origem):
+        """Associa um nome a um objeto já existente (conteúdo duplicado: nenhuma cópia necessária)."""
+        with self._lock:
+            self._nomes[nome_arquivo] = {
+                "hash": registro_origem["hash"], "tamanho": registro_origem.get("tamanho"), "mtime": registro_origem.get("mtime")
+            }
+
+    def confirmar_nome(self, nome_arquivo, registro_origem):
+        """
+        Atualiza tamanho/mtime de um nome cujo conteúdo a origem confirmou inalterado (ex: HTTP 304),
+        para que a próxima comparação com a listagem não o considere alterado de novo.
+        O instante de exibição (LRU) não muda: confirmar não é exibir.
+        """
+        with self._lock:
+            registro = self._nomes.get(nome_arquivo)
+            if not registro:
+                return False
+            if registro_origem.get("tamanho") is not None:
+                registro["tamanho"] = registro_origem["tamanho"]
+            registro["mtime"] = registro_origem.get("mtime")
+            return True
+
+    def importar_arquivo(self, caminho_arquivo, nome_arquivo, registro_origem=None):
+        """
+        Move um arquivo já completo (na área de entrada) para o armazém e associa o nome a ele.
+        registro_origem traz tamanho/mtime (e opcionalmente o hash) do arquivo na rede.
+        Se o conteúdo já existir, o arquivo recebido é descartado.
+        """
+        registro_origem = registro_origem or {}
+        hash_objeto = registro_origem.get("hash") or manifesto.calcular_hash_arquivo(caminho_arquivo)
+        extensao = os.path.splitext(nome_arquivo)[1].lower()
+        tamanho = os.path.getsize(caminho_arquivo)
+        with self._lock:
+            if hash_objeto in self._objetos:
+                os.remove(caminho_arquivo)
+            else:
+                caminho_objeto = self._caminho_objeto(hash_objeto, extensao)
+                os.makedirs(os.path.dirname(caminho_objeto), exist_ok=True)
+                os.replace(caminho_arquivo, caminho_objeto)
+                self._objetos[hash_objeto] = {"extensao": extensao, "tamanho": tamanho, "ultimo_uso": time.time()}
+            self._bytes_reservados = max(0, self._bytes_reservados - tamanho)
+            self._nomes[nome_arquivo] = {
+                "hash": hash_objeto, "tamanho": registro_origem.get("tamanho", tamanho), "mtime": registro_origem.get("mtime")
+            }
+        return hash_objeto
+
+    def remover_nome(self, nome_arquivo):
+        """Remove um nome do índice (o objeto é apagado na coleta, se ficar sem nomes)."""
+        with self._lock:
+            self._nomes.pop(nome_arquivo, None)
+
+    def _remover_objeto(self, hash_objeto):
+        registro = self._objetos.pop(hash_objeto)
+        self._nomes = {nome: reg for nome, reg in self._nomes.items() if reg["hash"] != hash_objeto}
+        caminho_objeto = self._caminho_objeto(hash_objeto, registro["extensao"])
+        try:
+            os.remove(caminho_objeto)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Erro ao remover objeto '{caminho_objeto}' do cache: {e}")
+        if self.ao_remover_objeto:
+            self.ao_remover_objeto(os.path.basename(caminho_objeto))
+
+    def coletar_orfaos(self):
+        """Apaga os objetos que não são mais referenciados por nenhum nome."""
+        with self._lock:
+            referenciados = {registro["hash"] for registro in self._nomes.values()}
+            orfaos = [h for h in self._objetos if h not in referenciados and h not in self._protegidos]
+            for hash_objeto in orfaos:
+                self._remover_objeto(hash_objeto)
+        if orfaos:
+            logger.info(f"{len(orfaos)} objetos sem referência removidos do cache.")
+
+    def reservar_espaco(self, num_bytes):
+        """
+        Garante espaço para num_bytes dentro do limite, removendo os objetos exibidos há mais tempo.
+        O espaço fica reservado até o arquivo ser importado ou até liberar_reservas().
+        Retorna False se não for possível (ex: objetos restantes estão protegidos).
+        """
+        if not self.limite_bytes:
+            return True
+        with self._lock:
+            total = self.tamanho_total() + self._bytes_reservados
+            if total + num_bytes > self.limite_bytes:
+                candidatos = sorted(
+                    (h for h in self._objetos if h not in self._protegidos),
+                    key=lambda h: self._objetos[h].get("ultimo_uso", 0)
+                )
+                removidos = 0
+                for hash_objeto in candidatos:
+                    if total + num_bytes <= self.limite_bytes:
+                        break
+                    total -= self._objetos[hash_objeto]["tamanho"]
+                    self._remover_objeto(hash_objeto)
+                    removidos += 1
+                if removidos:
+                    logger.info(f"{removidos} objetos removidos do cache (LRU) para respeitar o limite de {self.limite_bytes} bytes.")
+            if total + num_bytes > self.limite_bytes:
+                return False
+            self._bytes_reservados += num_bytes
+            return True
+
+    def liberar_reservas(self):
+        """Descarta as reservas de cópias que não chegaram a ser importadas (ex: falhas)."""
+        with self._lock:
+            self._bytes_reservados = 0
+
+    def aplicar_limite(self):
+        """Remove objetos (LRU) até que o cache caiba no limite configurado."""
+        return self.reservar_espaco(0)
+
+    def limpar_entrada(self):
+        """Remove arquivos temporários deixados por sincronizações interrompidas."""
+        shutil.rmtree(self.pasta_entrada, ignore_errors=True)
+
+    def migrar_arquivos_soltos(self, extensoes):
+        """
+        Importa para o armazém as imagens gravadas diretamente na raiz do cache (formato antigo,
+        espelho da pasta de rede) e remove as cópias temporárias que esse formato deixava na raiz
+        ('<imagem>.<pid>.<thread>.tmp'). Os temporários dos arquivos de estado (índice, quarentena,
+        disjuntor, origem HTTP), gravados por outras threads e instâncias sem a trava, não são tocados.
+        """
+        try:
+            entradas = list(os.scandir(self.pasta_cache))
+        except OSError:
+            return
+        migrados = 0
+        for entrada in entradas:
+            if not entrada.is_file():
+                continue
+            try:
+                if _eh_copia_temporaria_de_imagem(entrada.name, extensoes):
+                    os.remove(entrada.path)
+                elif any(entrada.name.lower().endswith(ext) for ext in extensoes):
+                    info = entrada.stat()
+                    self.importar_arquivo(entrada.path, entrada.name, {"tamanho": info.st_size, "mtime": info.st_mtime})
+                    migrados += 1
+            except OSError as e:
+                logger.warning(f"Não foi possível migrar '{entrada.name}' para o armazém do cache: {e}")
+        if migrados:
+            logger.info(f"{migrados} imagens do cache no formato antigo migradas para o armazém por conteúdo.")
+
+
+def _eh_copia_temporaria_de_imagem(nome_arquivo, extensoes):
+    """True para '<imagem><ext>.<pid>.<thread>.tmp' (cópia interrompida do copiador no formato antigo)."""
+    if not nome_arquivo.endswith(copiador.SUFIXO_TEMPORARIO):
+        return False
+    partes = nome_arquivo[:-len(copiador.SUFIXO_TEMPORARIO)].rsplit(".", 2)
+    if len(partes) != 3 or not (partes[1].isdigit() and partes[2].isdigit()):
+        return False
+    return any(partes[0].lower().endswith(ext) for ext in extensoes)
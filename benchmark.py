@@ -0,0 +1,438 @@
+# benchmark.py
+"""
+Benchmark de inicialização, sincronização e troca de imagens do protetor de tela.
+
+Gera um acervo sintético de imagens, simula o compartilhamento de rede com pastas locais
+(opcionalmente com latência injetada em cada chamada de sistema de arquivos) e mede:
+  - carregamento da configuração (primeira busca e busca condicional com cópia persistida);
+  - sincronizar_cache_e_carregar_imagens com cache frio e quente;
+  - sincronizar_cache com a "rede" travada (prazo da sondagem e disjuntor indo direto ao cache);
+  - sincronizar_cache com as imagens servidas por HTTP local (download completo, 304 e retomada com Range);
+  - latência de decodificação + redimensionamento por imagem (o trabalho de mostrar_proxima_imagem);
+  - tempo de CPU por troca e memória no cache de páginas com o pacote de pixels mapeado, contra as versões redimensionadas;
+  - os temporizadores por fase do módulo metricas acumulados durante as medições acima.
+
+O resultado é um JSON, para comparar execuções antes e depois de uma mudança.
+
+Exemplos:
+    python benchmark.py --quantidade 50 --largura 6000 --altura 4000 --formato jpg
+    python benchmark.py --latencia-ms 5 --manifesto --saida resultado.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import builtins
+import tempfile
+import threading
+import statistics
+import http.server
+import functools
+
+from PIL import Image # pip install Pillow
+
+import protetor_tela
+import acesso_rede
+import origem_http
+import configuracao
+import carregador_imagens
+import cache_redimensionado
+import pacote_pixels
+import manifesto
+import metricas
+
+FORMATOS = {"jpg": "JPEG", "png": "PNG", "gif": "GIF", "bmp": "BMP"}
+
+def gerar_acervo(pasta, quantidade, largura, altura, formato, semente=0):
+    """Gera 'quantidade' imagens sintéticas (ruído suavizado, próximo de uma foto em tamanho de arquivo)."""
+    os.makedirs(pasta, exist_ok=True)
+    gerador = random.Random(semente)
+    for indice in range(quantidade):
+        base = Image.merge("RGB", [Image.effect_noise((64, 48), gerador.randint(20, 90)) for _ in range(3)])
+        img = base.resize((largura, altura), Image.Resampling.BICUBIC)
+        if formato == "gif":
+            img = img.convert("P", palette=Image.Palette.ADAPTIVE)
+        img.save(os.path.join(pasta, f"imagem_{indice:04d}.{formato}"), FORMATOS[formato])
+
+def _percentis(valores_ms):
+    if not valores_ms:
+        return {}
+    ordenados = sorted(valores_ms)
+    def percentil(p):
+        return round(ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))], 2)
+    return {
+        "n": len(ordenados), "media_ms": round(statistics.fmean(ordenados), 2),
+        "p50_ms": percentil(50), "p95_ms": percentil(95), "max_ms": round(ordenados[-1], 2),
+    }
+
+
+class LatenciaInjetada:
+    """
+    Context manager que atrasa cada chamada de sistema de arquivos feita sob 'pasta_rede'
+    (stat, listdir, scandir e open), simulando as idas e voltas de um compartilhamento SMB.
+    """
+
+    def __init__(self, pasta_rede, latencia_ms):
+        self.pasta_rede = os.path.abspath(pasta_rede)
+        self.latencia_s = latencia_ms / 1000.0
+        self.chamadas = 0
+        self._originais = []
+        self._lock = threading.Lock()
+
+    def _envolver(self, modulo, nome):
+        original = getattr(modulo, nome)
+
+        @functools.wraps(original)
+        def com_latencia(caminho=".", *args, **kwargs):
+            if isinstance(caminho, (str, os.PathLike)) and os.path.abspath(os.fspath(caminho)).startswith(self.pasta_rede):
+                with self._lock:
+                    self.chamadas += 1
+                self._aguardar()
+            return original(caminho, *args, **kwargs)
+
+        self._originais.append((modulo, nome, original))
+        setattr(modulo, nome, com_latencia)
+
+    def _aguardar(self):
+        time.sleep(self.latencia_s)
+
+    def __enter__(self):
+        if self.latencia_s > 0:
+            for modulo, nome in ((os, "stat"), (os, "listdir"), (os, "scandir"), (builtins, "open")):
+                self._envolver(modulo, nome)
+        return self
+
+    def __exit__(self, *exc):
+        for modulo, nome, original in reversed(self._originais):
+            setattr(modulo, nome, original)
+        self._originais = []
+
+
+class RedeTravada(LatenciaInjetada):
+    """Como LatenciaInjetada, mas cada chamada sob 'pasta_rede' fica bloqueada até a saída do contexto (servidor que não responde)."""
+
+    def __init__(self, pasta_rede):
+        super().__init__(pasta_rede, latencia_ms=1)
+        self._liberar = threading.Event()
+
+    def _aguardar(self):
+        self._liberar.wait()
+
+    def __exit__(self, *exc):
+        self._liberar.set() # Libera as threads de sondagem abandonadas
+        super().__exit__(*exc)
+
+
+class ManipuladorSilencioso(http.server.SimpleHTTPRequestHandler):
+    """Serve a pasta como o SimpleHTTPRequestHandler, sem registrar cada requisição na saída."""
+
+    def log_message(self, *args):
+        pass
+
+
+class ManipuladorImagensHttp(http.server.SimpleHTTPRequestHandler):
+    """
+    Serve a pasta de imagens com HTTP/1.1 (conexões persistentes), ETag/If-None-Match e Range/If-Range,
+    como um servidor web real. 'cortar_apos_bytes' (atributo da classe) simula uma queda: cada imagem
+    enviada por completo é interrompida após esse número de bytes (a listagem não).
+    """
+    protocol_version = "HTTP/1.1"
+    cortar_apos_bytes = None
+    conexoes_abertas = 0
+
+    def setup(self):
+        super().setup()
+        ManipuladorImagensHttp.conexoes_abertas += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        caminho = self.translate_path(self.path)
+        try:
+            info = os.stat(caminho)
+        except OSError:
+            self.send_error(404)
+            return
+        etag = f'"{info.st_mtime_ns:x}-{info.st_size:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        inicio = 0
+        faixa = self.headers.get("Range")
+        if faixa and faixa.startswith("bytes=") and self.headers.get("If-Range", etag) == etag:
+            inicio = int(faixa[len("bytes="):].split("-", 1)[0])
+            if inicio >= info.st_size:
+                self.send_error(416)
+                return
+        tamanho = info.st_size - inicio
+        self.send_response(206 if inicio else 200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(tamanho))
+        if inicio:
+            self.send_header("Content-Range", f"bytes {inicio}-{info.st_size - 1}/{info.st_size}")
+        self.end_headers()
+        with open(caminho, "rb") as f:
+            f.seek(inicio)
+            dados = f.read()
+        cortar = self.cortar_apos_bytes is not None and not caminho.endswith(manifesto.NOME_MANIFESTO)
+        if cortar and not inicio and len(dados) > self.cortar_apos_bytes:
+            self.wfile.write(dados[:self.cortar_apos_bytes])
+            self.close_connection = True
+            return
+        self.wfile.write(dados)
+
+
+def medir_configuracao(pasta_trabalho, config_base):
+    """Mede o carregamento da configuração servida por um http.server local."""
+    pasta_http = os.path.join(pasta_trabalho, "http")
+    os.makedirs(pasta_http, exist_ok=True)
+    with open(os.path.join(pasta_http, "config_remota.json"), "w", encoding="utf-8") as f:
+        json.dump(config_base, f)
+
+    manipulador = functools.partial(ManipuladorSilencioso, directory=pasta_http)
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), manipulador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/config_remota.json"
+    pasta_estado = os.path.join(pasta_trabalho, "estado")
+    try:
+        resultados = {}
+        for rotulo in ("primeira_busca_ms", "busca_condicional_ms"):
+            inicio = time.perf_counter()
+            configuracao.carregar_configuracao(url, pasta_estado=pasta_estado)
+            resultados[rotulo] = round((time.perf_counter() - inicio) * 1000, 2)
+        return resultados
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+def medir_sincronizacao(config, pasta_rede, latencia_ms, pasta_estado):
+    """Mede sincronizar_cache_e_carregar_imagens com o cache vazio (frio) e já sincronizado (quente)."""
+    resultados = {}
+    protetor_tela.CONFIG = config
+    protetor_tela.LISTA_REPRODUCAO = None
+    protetor_tela.obter_lista_reproducao(pasta_estado) # A lista de reprodução fica na pasta de trabalho
+    for rotulo in ("cache_frio", "cache_quente"):
+        with LatenciaInjetada(pasta_rede, latencia_ms) as latencia:
+            inicio = time.perf_counter()
+            protetor_tela.sincronizar_cache_e_carregar_imagens()
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+        resultados[rotulo] = {
+            "duracao_ms": round(duracao_ms, 2),
+            "imagens": len(protetor_tela.IMAGENS_DISPONIVEIS),
+            "chamadas_rede_com_latencia": latencia.chamadas,
+        }
+    return resultados
+
+def medir_rede_travada(config, pasta_rede, prazo_sondagem_s=1.0):
+    """
+    Mede sincronizar_cache com a pasta de rede travada: a primeira execução deve desistir no prazo da sondagem
+    e usar o cache; a segunda deve ir direto ao cache pelo disjuntor aberto, sem esperar. Requer o cache já sincronizado.
+    """
+    config = dict(config, prazo_sondagem_rede_segundos=prazo_sondagem_s)
+    resultados = {}
+    with RedeTravada(pasta_rede):
+        for rotulo in ("primeira_execucao", "disjuntor_aberto"):
+            inicio = time.perf_counter()
+            imagens = protetor_tela.sincronizar_cache(config)
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            disjuntor = acesso_rede.DisjuntorRede(config["pasta_cache_local_completa"], pasta_rede)
+            resultados[rotulo] = {"duracao_ms": round(duracao_ms, 2), "imagens": len(imagens), "disjuntor": disjuntor.estado()}
+    return resultados
+
+def medir_origem_http(config, pasta_rede):
+    """
+    Mede sincronizar_cache com a pasta de imagens servida por HTTP local: download completo (cache frio),
+    nova sincronização sem mudanças (listagem 304) e retomada com Range de downloads interrompidos.
+    """
+    if not os.path.exists(os.path.join(pasta_rede, manifesto.NOME_MANIFESTO)):
+        manifesto.gerar_manifesto(pasta_rede, config.get("extensoes_permitidas"))
+    manipulador = functools.partial(ManipuladorImagensHttp, directory=pasta_rede)
+    servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), manipulador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/"
+    pasta_cache = config["pasta_cache_local_completa"] + "_http"
+    config = dict(config, pasta_imagens_rede=url, pasta_cache_local_completa=pasta_cache, gerar_miniaturas=False)
+    resultados = {}
+    try:
+        etapas = (
+            ("interrompido", lambda: setattr(ManipuladorImagensHttp, "cortar_apos_bytes", 4096)),
+            ("retomado", lambda: setattr(ManipuladorImagensHttp, "cortar_apos_bytes", None)),
+            ("sem_mudancas", lambda: None),
+        )
+        for rotulo, preparar in etapas:
+            preparar()
+            ManipuladorImagensHttp.conexoes_abertas = 0
+            inicio = time.perf_counter()
+            imagens = protetor_tela.sincronizar_cache(config)
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            resultados[rotulo] = {
+                "duracao_ms": round(duracao_ms, 2), "imagens": len(imagens),
+                "conexoes_abertas": ManipuladorImagensHttp.conexoes_abertas,
+            }
+        resultados["parciais_restantes"] = len(os.listdir(os.path.join(pasta_cache, origem_http.SUBPASTA_PARCIAIS)))
+        return resultados
+    finally:
+        ManipuladorImagensHttp.cortar_apos_bytes = None
+        if protetor_tela.ORIGEM_HTTP:
+            protetor_tela.ORIGEM_HTTP.fechar()
+            protetor_tela.ORIGEM_HTTP = None
+        servidor.shutdown()
+        servidor.server_close()
+
+def medir_decodificacao(caminhos, largura_tela, altura_tela, pasta_cache):
+    """Mede decodificação + redimensionamento por imagem, sem cache e com versões redimensionadas em disco."""
+    cache = cache_redimensionado.CacheRedimensionado(pasta_cache)
+    amostras = {"sem_cache": [], "cache_redimensionado_frio": [], "cache_redimensionado_quente": []}
+    for caminho in caminhos:
+        inicio = time.perf_counter()
+        carregador_imagens.preparar_imagem(caminho, largura_tela, altura_tela)
+        amostras["sem_cache"].append((time.perf_counter() - inicio) * 1000)
+    for rotulo in ("cache_redimensionado_frio", "cache_redimensionado_quente"):
+        for caminho in caminhos:
+            inicio = time.perf_counter()
+            carregador_imagens.preparar_imagem(caminho, largura_tela, altura_tela, cache)
+            amostras[rotulo].append((time.perf_counter() - inicio) * 1000)
+    return {rotulo: _percentis(valores) for rotulo, valores in amostras.items()}
+
+def _memoria_arquivos_mapeados_kb():
+    """Páginas de arquivos mapeados residentes na memória deste processo (RssFile, Linux); None se indisponível."""
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for linha in f:
+                if linha.startswith("RssFile:"):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return None
+
+def medir_pacote_pixels(caminhos, largura_tela, altura_tela, pasta_cache):
+    """
+    Compara, por troca de imagem, o tempo de CPU do caminho atual (versão redimensionada em disco, decodificada)
+    com o pacote de pixels mapeado (sem decodificação), incluindo a conversão feita ao criar o PhotoImage.
+    Também mede o tamanho do pacote e a memória de páginas do arquivo mapeado após percorrer todas as imagens.
+    """
+    cache = cache_redimensionado.CacheRedimensionado(pasta_cache)
+    pacote = pacote_pixels.PacotePixels(pasta_cache, largura_tela, altura_tela)
+    inicio = time.perf_counter()
+    pacote.atualizar(caminhos, cache)
+    tempo_montagem_ms = (time.perf_counter() - inicio) * 1000
+    inicio = time.perf_counter()
+    pacote.atualizar(caminhos, cache) # Incremental: nada a acrescentar
+    tempo_atualizacao_ms = (time.perf_counter() - inicio) * 1000
+
+    amostras = {"versao_redimensionada": [], "pacote_pixels": []}
+    memoria_antes_kb = _memoria_arquivos_mapeados_kb()
+    for caminho in caminhos:
+        for rotulo, preparar in (
+            ("versao_redimensionada", lambda: carregador_imagens.preparar_imagem(caminho, largura_tela, altura_tela, cache)),
+            ("pacote_pixels", lambda: pacote.obter(caminho)),
+        ):
+            inicio_cpu = time.process_time()
+            img = preparar()
+            img.convert("RGB") # O que ImageTk.PhotoImage faz com a imagem na troca
+            amostras[rotulo].append((time.process_time() - inicio_cpu) * 1000)
+    memoria_depois_kb = _memoria_arquivos_mapeados_kb()
+    arquivos_pacote = [nome for nome in os.listdir(pacote.pasta) if nome.endswith(".pack")]
+    return {
+        "cpu_por_troca": {rotulo: _percentis(valores) for rotulo, valores in amostras.items()},
+        "montagem_ms": round(tempo_montagem_ms, 2), "atualizacao_sem_mudancas_ms": round(tempo_atualizacao_ms, 2),
+        "tamanho_pacote_bytes": sum(os.path.getsize(os.path.join(pacote.pasta, nome)) for nome in arquivos_pacote),
+        "memoria_paginas_mapeadas_kb": (
+            memoria_depois_kb - memoria_antes_kb if memoria_antes_kb is not None and memoria_depois_kb is not None else None
+        ),
+        "acertos": pacote.resumo(),
+    }
+
+def executar(argumentos):
+    pasta_trabalho = argumentos.pasta_trabalho or tempfile.mkdtemp(prefix="benchmark_protetor_")
+    pasta_rede = os.path.join(pasta_trabalho, "rede")
+    pasta_cache = os.path.join(pasta_trabalho, "cache")
+    try:
+        inicio = time.perf_counter()
+        gerar_acervo(pasta_rede, argumentos.quantidade, argumentos.largura, argumentos.altura, argumentos.formato)
+        tempo_geracao_ms = (time.perf_counter() - inicio) * 1000
+        if argumentos.manifesto:
+            manifesto.gerar_manifesto(pasta_rede)
+
+        config_base = {
+            "versao_config": "benchmark",
+            "pasta_imagens_rede": pasta_rede,
+            "pasta_cache_local_subpath": "benchmark",
+            "tempo_exibicao_imagem_segundos": 10,
+            "extensoes_permitidas": [f".{argumentos.formato}"],
+        }
+        config = dict(config_base, pasta_cache_local_completa=pasta_cache)
+
+        caminhos = sorted(os.path.join(pasta_rede, nome) for nome in os.listdir(pasta_rede) if nome.endswith(argumentos.formato))
+        return {
+            "ambiente": {
+                "python": platform.python_version(), "pillow": Image.__version__,
+                "plataforma": platform.platform(), "cpus": os.cpu_count(),
+            },
+            "parametros": {
+                "quantidade": argumentos.quantidade, "largura": argumentos.largura, "altura": argumentos.altura,
+                "formato": argumentos.formato, "latencia_ms": argumentos.latencia_ms, "manifesto": argumentos.manifesto,
+                "tela": f"{argumentos.largura_tela}x{argumentos.altura_tela}",
+            },
+            "resultados": {
+                "geracao_acervo_ms": round(tempo_geracao_ms, 2),
+                "configuracao": medir_configuracao(pasta_trabalho, config_base),
+                "sincronizacao": medir_sincronizacao(
+                    config, pasta_rede, argumentos.latencia_ms, os.path.join(pasta_trabalho, "estado")
+                ),
+                "rede_travada": medir_rede_travada(config, pasta_rede),
+                "origem_http": medir_origem_http(config, pasta_rede),
+                "decodificacao": medir_decodificacao(
+                    caminhos[:argumentos.amostras_decodificacao], argumentos.largura_tela, argumentos.altura_tela,
+                    os.path.join(pasta_trabalho, "redimensionadas")
+                ),
+                "pacote_pixels": medir_pacote_pixels(
+                    caminhos[:argumentos.amostras_decodificacao], argumentos.largura_tela, argumentos.altura_tela,
+                    os.path.join(pasta_trabalho, "pacote")
+                ),
+                "metricas_fases": metricas.resumo(),
+            },
+        }
+    finally:
+        if not argumentos.manter_arquivos:
+            shutil.rmtree(pasta_trabalho, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do protetor de tela (saída em JSON).")
+    parser.add_argument("--quantidade", type=int, default=30, help="Número de imagens sintéticas.")
+    parser.add_argument("--largura", type=int, default=4000, help="Largura das imagens geradas.")
+    parser.add_argument("--altura", type=int, default=3000, help="Altura das imagens geradas.")
+    parser.add_argument("--formato", choices=sorted(FORMATOS), default="jpg")
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="Latência injetada por chamada de sistema de arquivos na 'rede'.")
+    parser.add_argument("--manifesto", action="store_true", help="Publica manifesto_imagens.json na pasta de rede simulada.")
+    parser.add_argument("--largura-tela", type=int, default=1920)
+    parser.add_argument("--altura-tela", type=int, default=1080)
+    parser.add_argument("--amostras-decodificacao", type=int, default=20, help="Imagens usadas na medição de decodificação.")
+    parser.add_argument("--pasta-trabalho", help="Pasta para acervo e cache (padrão: temporária).")
+    parser.add_argument("--manter-arquivos", action="store_true", help="Não apaga a pasta de trabalho ao final.")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout).")
+    argumentos = parser.parse_args()
+
+    # Os logs do protetor não fazem parte da medição; apenas avisos e erros são mantidos
+    logging.getLogger().setLevel(logging.WARNING)
+
+    resultado = executar(argumentos)
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if argumentos.saida:
+        with open(argumentos.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# cache_redimensionado.py
+import os
+import glob
+import hashlib
+import logging
+import threading
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+SUBPASTA_REDIMENSIONADAS = "_redimensionadas" # Subpasta (dentro do cache local) com as versões já redimensionadas
+
+class CacheRedimensionado:
+    """
+    Armazena em disco cópias das imagens já redimensionadas para uma resolução de tela.
+    Cada versão é identificada pela origem (nome, tamanho, data de modificação) e pela resolução alvo,
+    de modo que a decodificação completa do original ocorra uma única vez por imagem e resolução.
+
+    Estrutura: <pasta_cache>/_redimensionadas/<largura>x<altura>/<hash_nome>_<tamanho>_<mtime_ns>.<ext>
+    """
+
+    def __init__(self, pasta_cache):
+        self.pasta_base = os.path.join(pasta_cache, SUBPASTA_REDIMENSIONADAS)
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    @staticmethod
+    def _hash_nome(nome_arquivo):
+        return hashlib.sha1(nome_arquivo.encode('utf-8')).hexdigest()[:16]
+
+    def _pasta_resolucao(self, largura, altura):
+        return os.path.join(self.pasta_base, f"{largura}x{altura}")
+
+    def _prefixo_versao(self, caminho_origem):
+        """Retorna o prefixo do nome da versão redimensionada e a identidade atual do original."""
+        info = os.stat(caminho_origem)
+        hash_nome = self._hash_nome(os.path.basename(caminho_origem))
+        return hash_nome, f"{hash_nome}_{info.st_size}_{info.st_mtime_ns}"
+
+    def obter(self, caminho_origem, largura, altura):
+        """Retorna o caminho da versão redimensionada válida, ou None se não existir (ou estiver obsoleta)."""
+        _, identidade = self._prefixo_versao(caminho_origem)
+        pasta = self._pasta_resolucao(largura, altura)
+        for extensao in (".jpg", ".png"):
+            caminho_versao = os.path.join(pasta, identidade + extensao)
+            if os.path.isfile(caminho_versao):
+                with self._lock:
+                    self.acertos += 1
+                return caminho_versao
+        with self._lock:
+            self.faltas += 1
+        return None
+
+    def salvar(self, caminho_origem, largura, altura, img_pil):
+        """
+        Grava a versão redimensionada de forma atômica (arquivo temporário + renomeação)
+        e remove as versões obsoletas do mesmo original em todas as resoluções.
+        """
+        hash_nome, identidade = self._prefixo_versao(caminho_origem)
+        pasta = self._pasta_resolucao(largura, altura)
+        os.makedirs(pasta, exist_ok=True)
+
+        # Imagens com transparência ou paleta vão para PNG; as demais para JPEG (menor e mais rápido de decodificar)
+        possui_alfa = img_pil.mode in ("RGBA", "LA", "PA") or (img_pil.mode == "P" and "transparency" in img_pil.info)
+        if possui_alfa or img_pil.mode == "P":
+            extensao, formato, opcoes = ".png", "PNG", {}
+        else:
+            extensao, formato, opcoes = ".jpg", "JPEG", {"quality": 90}
+            if img_pil.mode not in ("RGB", "L"):
+                img_pil = img_pil.convert("RGB")
+
+        caminho_versao = os.path.join(pasta, identidade + extensao)
+        caminho_temp = f"{caminho_versao}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            img_pil.save(caminho_temp, formato, **opcoes)
+            os.replace(caminho_temp, caminho_versao)
+            logger.debug("Versão redimensionada salva: %s", caminho_versao)
+        except OSError as e:
+            logger.warning(f"Não foi possível salvar versão redimensionada de '{caminho_origem}': {e}")
+            try:
+                os.remove(caminho_temp)
+            except OSError:
+                pass
+            return None
+
+        for caminho_antigo in glob.glob(os.path.join(self.pasta_base, "*", hash_nome + "_*")):
+            if not os.path.basename(caminho_antigo).startswith(identidade):
+                try:
+                    os.remove(caminho_antigo)
+                    logger.debug("Versão redimensionada obsoleta removida: %s", caminho_antigo)
+                except OSError:
+                    pass
+        return caminho_versao
+
+    def remover_versoes(self, nome_arquivo):
+        """Remove todas as versões redimensionadas de um original (ex: removido do cache)."""
+        for caminho_versao in glob.glob(os.path.join(self.pasta_base, "*", self._hash_nome(nome_arquivo) + "_*")):
+            try:
+                os.remove(caminho_versao)
+                logger.debug("Versão redimensionada removida: %s", caminho_versao)
+            except OSError as e:
+                logger.warning(f"Erro ao remover versão redimensionada '{caminho_versao}': {e}")
+
+    def resumo(self):
+        """Retorna um dicionário com os acertos, faltas e a taxa de acertos do cache de versões redimensionadas."""
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                "acertos": self.acertos, "faltas": self.faltas,
+                "taxa_acertos": round(self.acertos / consultas, 3) if consultas else None,
+            }
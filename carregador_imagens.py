@@ -0,0 +1,313 @@
+# carregador_imagens.py
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from PIL import Image # pip install Pillow
+
+import metricas
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+# Miniaturas persistidas (camada própria do cache redimensionado), usadas pelo preview (/p)
+LARGURA_MINIATURA = 320
+ALTURA_MINIATURA = 240
+LIMITE_BYTES_DECODIFICACAO_MINIATURA = 8 * 1024 * 1024 # Originais maiores (já com draft) não são decodificados no preview
+
+# Limites verificados pelo cabeçalho, antes da decodificação completa (arquivos corrompidos ou "bombas" de descompressão)
+LIMITE_PIXELS_IMAGEM = 100_000_000
+LIMITE_BYTES_ARQUIVO_IMAGEM = 200 * 1024 * 1024
+
+class ImagemGrandeDemais(Exception):
+    """A decodificação da imagem ultrapassaria o limite de memória permitido."""
+
+class ImagemInvalida(Exception):
+    """O arquivo não é uma imagem utilizável (cabeçalho inválido ou acima dos limites de pixels/tamanho)."""
+
+class ImagemCorrompida(ImagemInvalida):
+    """O decodificador recusou o conteúdo do arquivo (truncado ou com dados inválidos)."""
+
+# Falhas que indicam um arquivo ruim (e não um problema da apresentação): levam a imagem para a quarentena.
+# Falhas de acesso (OSError com código do sistema: permissão, compartilhamento, rede, disco cheio) não entram:
+# a apresentação segue para a próxima imagem e tenta esta de novo mais tarde.
+ERROS_DECODIFICACAO = (ImagemInvalida, Image.UnidentifiedImageError, SyntaxError, ValueError, Image.DecompressionBombError)
+
+def _eh_conteudo_invalido(erro):
+    """Pillow sinaliza dados truncados ou inválidos com um OSError sem código do sistema (errno)."""
+    return isinstance(erro, ERROS_DECODIFICACAO) or (type(erro) is OSError and erro.errno is None)
+
+def configurar_limites(limite_pixels=None, limite_bytes_arquivo=None):
+    """Define os limites de pixels e de tamanho de arquivo aceitos (None mantém o atual)."""
+    global LIMITE_PIXELS_IMAGEM, LIMITE_BYTES_ARQUIVO_IMAGEM
+    if limite_pixels:
+        LIMITE_PIXELS_IMAGEM = int(limite_pixels)
+    if limite_bytes_arquivo:
+        LIMITE_BYTES_ARQUIVO_IMAGEM = int(limite_bytes_arquivo)
+    # A proteção do próprio Pillow (erro acima do dobro do limite) acompanha o nosso limite
+    Image.MAX_IMAGE_PIXELS = LIMITE_PIXELS_IMAGEM
+
+def _verificar_limites(caminho_imagem, img_pil=None, tamanho_arquivo=None):
+    """Lança ImagemInvalida se o arquivo ou as dimensões (lidas do cabeçalho) ultrapassarem os limites."""
+    if tamanho_arquivo is not None and tamanho_arquivo > LIMITE_BYTES_ARQUIVO_IMAGEM:
+        raise ImagemInvalida(f"arquivo de {tamanho_arquivo / (1024 * 1024):.0f} MB acima do limite de {LIMITE_BYTES_ARQUIVO_IMAGEM / (1024 * 1024):.0f} MB")
+    if img_pil is not None and img_pil.width * img_pil.height > LIMITE_PIXELS_IMAGEM:
+        raise ImagemInvalida(f"{img_pil.width}x{img_pil.height} pixels acima do limite de {LIMITE_PIXELS_IMAGEM}")
+
+def validar_cabecalho(caminho_imagem, tamanho_arquivo=None):
+    """
+    Valida o arquivo lendo apenas o cabeçalho (formato e dimensões), sem decodificar os pixels.
+    Usada na sincronização, antes de copiar para o cache. Retorna None se válido ou o motivo da recusa.
+    Falhas de acesso (ex: rede) não recusam o arquivo.
+    """
+    try:
+        _verificar_limites(caminho_imagem, tamanho_arquivo=tamanho_arquivo if tamanho_arquivo is not None else os.path.getsize(caminho_imagem))
+        with Image.open(caminho_imagem) as img:
+            _verificar_limites(caminho_imagem, img_pil=img)
+    except ImagemInvalida as e:
+        return str(e)
+    except (Image.UnidentifiedImageError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        return f"cabeçalho inválido: {e}"
+    except OSError as e:
+        logger.warning(f"Não foi possível validar o cabeçalho de '{caminho_imagem}': {e}")
+    return None
+
+
+def preparar_imagem(caminho_imagem, largura, altura, cache_redimensionado=None, limite_bytes_decodificacao=None):
+    """
+    Decodifica a imagem e a redimensiona para caber em largura x altura, mantendo a proporção.
+    Se um CacheRedimensionado for informado, reutiliza a versão já redimensionada em disco
+    ou a grava após a primeira decodificação.
+    Arquivos acima de LIMITE_BYTES_ARQUIVO_IMAGEM ou LIMITE_PIXELS_IMAGEM são recusados (ImagemInvalida) pelo cabeçalho;
+    com limite_bytes_decodificacao, recusa (ImagemGrandeDemais) originais que ocupariam mais memória que isso.
+    Retorna a imagem PIL pronta para ser convertida em PhotoImage pela thread do Tkinter.
+    """
+    if cache_redimensionado:
+        caminho_versao = cache_redimensionado.obter(caminho_imagem, largura, altura)
+        if caminho_versao:
+            try:
+                with metricas.medir("leitura_versao_redimensionada"), Image.open(caminho_versao) as img_versao:
+                    img_versao.load()
+                    return img_versao.copy()
+            except (OSError, SyntaxError, ValueError) as e:
+                if not _eh_conteudo_invalido(e):
+                    raise
+                # Versão danificada (ex: gravação interrompida): refeita a partir do original, sem culpar o original
+                logger.warning(f"Versão redimensionada de '{caminho_imagem}' inválida, será refeita: {e}")
+
+    _verificar_limites(caminho_imagem, tamanho_arquivo=os.path.getsize(caminho_imagem))
+    try:
+        with Image.open(caminho_imagem) as img_origem:
+            _verificar_limites(caminho_imagem, img_pil=img_origem)
+            with metricas.medir("decodificacao"):
+                # Em JPEG, o modo draft decodifica já reduzido (1/2, 1/4 ou 1/8), evitando processar todos os pixels
+                img_origem.draft(img_origem.mode, (largura, altura))
+                if limite_bytes_decodificacao and tamanho_em_memoria(img_origem) > limite_bytes_decodificacao:
+                    raise ImagemGrandeDemais(f"{img_origem.size[0]}x{img_origem.size[1]} ({img_origem.mode}) em '{caminho_imagem}'")
+                img_origem.load()
+            with metricas.medir("redimensionamento"):
+                img_origem.thumbnail((largura, altura), Image.Resampling.LANCZOS)
+                # copy() desacopla a imagem do arquivo, que é fechado ao sair do bloco 'with'
+                img_pronta = img_origem.copy()
+    except OSError as e:
+        if _eh_conteudo_invalido(e) and not isinstance(e, ERROS_DECODIFICACAO):
+            raise ImagemCorrompida(f"'{caminho_imagem}': {e}") from e
+        raise # Falha de acesso (ou UnidentifiedImageError, já uma falha de decodificação)
+
+    if cache_redimensionado:
+        with metricas.medir("gravacao_versao_redimensionada"):
+            cache_redimensionado.salvar(caminho_imagem, largura, altura, img_pronta)
+    return img_pronta
+
+def preparar_miniatura(caminho_imagem, largura, altura, cache_redimensionado=None):
+    """
+    Variante de preparar_imagem para o preview: parte da miniatura persistida (LARGURA_MINIATURA x ALTURA_MINIATURA),
+    gerando-a se ainda não existir, e a reduz para a janela. A decodificação do original é limitada
+    a LIMITE_BYTES_DECODIFICACAO_MINIATURA.
+    """
+    img_miniatura = preparar_imagem(
+        caminho_imagem, LARGURA_MINIATURA, ALTURA_MINIATURA, cache_redimensionado,
+        limite_bytes_decodificacao=LIMITE_BYTES_DECODIFICACAO_MINIATURA
+    )
+    img_miniatura.thumbnail((largura, altura), Image.Resampling.LANCZOS)
+    return img_miniatura
+
+def gerar_miniaturas(caminhos_imagens, cache_redimensionado, ao_falhar=None):
+    """
+    Gera as miniaturas que ainda não existem para os caminhos informados (chamada pela sincronização,
+    fora da thread do Tkinter). Se informado, ao_falhar(caminho, erro) é chamado para arquivos que não
+    puderam ser decodificados. Retorna o número de miniaturas geradas.
+    """
+    geradas = 0
+    for caminho_imagem in caminhos_imagens:
+        try:
+            if cache_redimensionado.obter(caminho_imagem, LARGURA_MINIATURA, ALTURA_MINIATURA):
+                continue
+            preparar_imagem(caminho_imagem, LARGURA_MINIATURA, ALTURA_MINIATURA, cache_redimensionado)
+            geradas += 1
+        except ERROS_DECODIFICACAO as e:
+            if ao_falhar:
+                ao_falhar(caminho_imagem, e)
+            else:
+                logger.warning(f"Não foi possível gerar a miniatura de '{caminho_imagem}': {e}")
+        except Exception as e:
+            logger.warning(f"Não foi possível gerar a miniatura de '{caminho_imagem}': {e}")
+    return geradas
+
+
+def tamanho_em_memoria(img_pil):
+    """Estimativa dos bytes ocupados pelos pixels decodificados da imagem."""
+    largura, altura = img_pil.size
+    return largura * altura * len(img_pil.getbands())
+
+
+class CacheMemoriaImagens:
+    """
+    Cache em memória das imagens já prontas para exibição, chaveado por (caminho, largura, altura).
+    O limite é em bytes de pixels decodificados (não em número de itens); ao ultrapassá-lo,
+    as imagens usadas há mais tempo (LRU) são descartadas.
+    """
+
+    def __init__(self, limite_bytes):
+        self.limite_bytes = int(limite_bytes)
+        self._itens = OrderedDict() # {chave: (img_pil, tamanho_bytes)}
+        self._bytes_em_uso = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.remocoes = 0
+
+    def obter(self, chave):
+        """Retorna a imagem em cache (marcando-a como usada recentemente) ou None."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.faltas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[0]
+
+    def adicionar(self, chave, img_pil):
+        """Guarda a imagem, descartando as menos usadas recentemente até caber no limite."""
+        tamanho = tamanho_em_memoria(img_pil)
+        if tamanho > self.limite_bytes:
+            return # Maior que o limite inteiro: não vale a pena guardar
+        with self._lock:
+            anterior = self._itens.pop(chave, None)
+            if anterior:
+                self._bytes_em_uso -= anterior[1]
+            while self._itens and self._bytes_em_uso + tamanho > self.limite_bytes:
+                _, (_, tamanho_removido) = self._itens.popitem(last=False)
+                self._bytes_em_uso -= tamanho_removido
+                self.remocoes += 1
+            self._itens[chave] = (img_pil, tamanho)
+            self._bytes_em_uso += tamanho
+
+    def resumo(self):
+        """Retorna um dicionário com os contadores do cache em memória."""
+        with self._lock:
+            return {
+                "acertos": self.acertos, "faltas": self.faltas, "remocoes": self.remocoes,
+                "itens": len(self._itens), "bytes_em_uso": self._bytes_em_uso, "limite_bytes": self.limite_bytes,
+            }
+
+
+class PrefetcherImagens:
+    """
+    Decodifica e redimensiona as próximas imagens da lista em threads de trabalho,
+    para que a thread do Tkinter apenas troque uma imagem já preparada.
+    Com um PacotePixels na resolução pedida, as imagens presentes nele são apenas mapeadas (sem decodificação).
+    """
+
+    def __init__(self, num_antecipadas=3, num_threads=2, cache_redimensionado=None, cache_memoria=None, preparar=preparar_imagem,
+                 pacote_pixels=None):
+        self.preparar = preparar # preparar_imagem, ou preparar_miniatura no preview
+        self.cache_redimensionado = cache_redimensionado
+        self.cache_memoria = cache_memoria
+        self.pacote_pixels = pacote_pixels
+        self.num_antecipadas = max(0, int(num_antecipadas))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(num_threads)), thread_name_prefix="PrefetchImagens")
+        self._futuros = {} # {(caminho, largura, altura): Future}
+        self._lock = threading.Lock()
+        # Estatísticas de latência de decodificação (em ms), atualizadas pelas threads de trabalho
+        self._total_decodificacoes = 0
+        self._soma_latencia_ms = 0.0
+        self._max_latencia_ms = 0.0
+
+    def _decodificar(self, caminho_imagem, largura, altura):
+        pacote = self.pacote_pixels
+        if pacote and (pacote.largura, pacote.altura) == (largura, altura):
+            img_mapeada = pacote.obter(caminho_imagem)
+            if img_mapeada is not None:
+                return img_mapeada # Já está no cache de páginas do sistema: não ocupa o cache em memória
+        inicio = time.perf_counter()
+        img_pil = self.preparar(caminho_imagem, largura, altura, self.cache_redimensionado)
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        with self._lock:
+            self._total_decodificacoes += 1
+            self._soma_latencia_ms += latencia_ms
+            self._max_latencia_ms = max(self._max_latencia_ms, latencia_ms)
+        logger.debug("Imagem '%s' decodificada em segundo plano em %.1f ms.", os.path.basename(caminho_imagem), latencia_ms)
+        if self.cache_memoria:
+            self.cache_memoria.adicionar((caminho_imagem, largura, altura), img_pil)
+        return img_pil
+
+    def obter(self, caminho_imagem, largura, altura):
+        """Retorna o Future da imagem preparada, agendando a decodificação se ainda não existir."""
+        chave = (caminho_imagem, largura, altura)
+        with self._lock:
+            futuro = self._futuros.get(chave)
+            if futuro is None and self.cache_memoria:
+                img_em_memoria = self.cache_memoria.obter(chave)
+                if img_em_memoria is not None: # Já decodificada em um ciclo anterior
+                    futuro = Future()
+                    futuro.set_result(img_em_memoria)
+                    self._futuros[chave] = futuro
+            if futuro is None:
+                futuro = self._executor.submit(self._decodificar, caminho_imagem, largura, altura)
+                self._futuros[chave] = futuro
+        return futuro
+
+    def consumir(self, caminho_imagem, largura, altura):
+        """Remove a imagem do prefetch após ser exibida, liberando a memória correspondente."""
+        with self._lock:
+            self._futuros.pop((caminho_imagem, largura, altura), None)
+
+    def antecipar(self, caminhos, largura, altura):
+        """
+        Agenda a preparação das imagens em 'caminhos' (no máximo num_antecipadas)
+        e descarta as preparações que não estão mais entre as próximas.
+        """
+        chaves_desejadas = {(caminho, largura, altura) for caminho in caminhos[:self.num_antecipadas]}
+        with self._lock:
+            for chave in list(self._futuros):
+                if chave not in chaves_desejadas:
+                    self._futuros.pop(chave).cancel()
+        for caminho, larg, alt in chaves_desejadas:
+            self.obter(caminho, larg, alt)
+
+    def aguardar_pendentes(self, timeout=None):
+        """Aguarda as preparações já agendadas terminarem (usado pelo simulador, cujo relógio não anda durante a decodificação)."""
+        with self._lock:
+            futuros = list(self._futuros.values())
+        wait(futuros, timeout)
+
+    def resumo_latencias(self):
+        """Retorna um dicionário com as estatísticas de latência de decodificação."""
+        with self._lock:
+            media = self._soma_latencia_ms / self._total_decodificacoes if self._total_decodificacoes else 0.0
+            return {
+                "decodificacoes": self._total_decodificacoes,
+                "latencia_media_ms": round(media, 1),
+                "latencia_max_ms": round(self._max_latencia_ms, 1),
+            }
+
+    def encerrar(self):
+        """Cancela as preparações pendentes e libera as threads de trabalho."""
+        with self._lock:
+            self._futuros.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
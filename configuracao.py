@@ -1,8 +1,13 @@
 # configuracao.py
 import json
-import urllib.request
+import time
+import threading
 import os
 import logging
+import subprocess
+
+import acesso_rede
+import metricas
 
 # Usaremos o logger configurado no script principal
 logger = logging.getLogger(__name__)
@@ -11,18 +16,134 @@ logger = logging.getLogger(__name__)
 # É altamente recomendável que você compile com a URL correta ou use o argumento /configurl.
 URL_CONFIG_PADRAO = "https://raw.githubusercontent.com/ti-fct/ScreenSaver/refs/heads/main/config_remota.json" # Altere para a URL real da sua rede
 
-def carregar_configuracao(url_config_remota=None):
+# Cópia local da última configuração válida (usada offline e para requisições condicionais)
+SUBPASTA_ESTADO_LOCAL = "ProtetorTelaUniversidade"
+NOME_CONFIG_PERSISTIDA = "config_persistida.json"
+TIMEOUT_BUSCA_SEGUNDOS = 10 # Prazo da busca quando não há cópia local
+PRAZO_COM_COPIA_LOCAL_SEGUNDOS = 3 # Prazo da busca quando há cópia local para usar em caso de falha
+SID_USUARIOS = "*S-1-5-32-545" # BUILTIN\Usuários (pelo SID, independente do idioma do Windows)
+
+def obter_pasta_appdata_local():
+    """Retorna o caminho de %LOCALAPPDATA% (com fallback para %USERPROFILE%\\AppData\\Local)."""
+    appdata_local_path = os.getenv('LOCALAPPDATA')
+    if not appdata_local_path:
+        # Fallback se LOCALAPPDATA não estiver definido (muito raro em Windows modernos)
+        appdata_local_path = os.path.join(os.getenv('USERPROFILE', '.'), 'AppData', 'Local')
+        logger.warning(f"Variável de ambiente LOCALAPPDATA não encontrada. Usando fallback: {appdata_local_path}")
+    return appdata_local_path
+
+def obter_pasta_dados_maquina():
+    """Retorna o caminho de %ProgramData%, compartilhado por todos os usuários da máquina (ex: servidor de terminal)."""
+    pasta_dados_maquina = os.getenv('PROGRAMDATA') or os.getenv('ALLUSERSPROFILE')
+    if not pasta_dados_maquina:
+        pasta_dados_maquina = obter_pasta_appdata_local()
+        logger.warning(f"Variável de ambiente PROGRAMDATA não encontrada. Cache compartilhado usará: {pasta_dados_maquina}")
+    return pasta_dados_maquina
+
+def preparar_pasta_cache(config):
     """
-    Carrega a configuração de uma URL remota ou de um caminho UNC.
-    Se url_config_remota for um caminho UNC, tenta ler diretamente.
+    Cria a pasta de cache. Com cache_compartilhado_maquina, as subpastas de %ProgramData% só podem ser
+    modificadas por quem as criou: ao criá-la, concede modificação (herdada) ao grupo Usuários, para que as
+    sessões dos demais usuários também gravem no cache. Se a pasta já existia sem essa permissão (criada
+    por outro usuário), registra o erro com o comando que o administrador ou o instalador deve executar.
+    Retorna True se a pasta existe e aceita gravação.
     """
-    if url_config_remota is None:
-        url_config_remota = URL_CONFIG_PADRAO
-        logger.info(f"Nenhuma URL de configuração fornecida, usando padrão: {URL_CONFIG_PADRAO}")
+    pasta_cache = config["pasta_cache_local_completa"]
+    criada = not os.path.isdir(pasta_cache)
+    try:
+        os.makedirs(pasta_cache, exist_ok=True)
+    except OSError as e:
+        logger.error(f"Não foi possível criar a pasta de cache '{pasta_cache}': {e}")
+        return False
+    compartilhada = bool(config.get("cache_compartilhado_maquina"))
+    if criada and compartilhada and os.name == 'nt':
+        _conceder_modificacao_usuarios(pasta_cache)
+    if _pasta_aceita_gravacao(pasta_cache):
+        return True
+    if compartilhada:
+        logger.error(
+            f"A pasta de cache compartilhada '{pasta_cache}' não aceita gravação por este usuário (criada por outro usuário "
+            f"sem permissão para o grupo Usuários). Um administrador deve executar: "
+            f'icacls "{pasta_cache}" /grant {SID_USUARIOS}:(OI)(CI)M'
+        )
+    else:
+        logger.error(f"A pasta de cache '{pasta_cache}' não aceita gravação.")
+    return False
 
-    logger.info(f"Tentando carregar configuração de: {url_config_remota}")
-    config = None
+def _conceder_modificacao_usuarios(pasta):
+    comando = ["icacls", pasta, "/grant", f"{SID_USUARIOS}:(OI)(CI)M"]
+    try:
+        resultado = subprocess.run(
+            comando, capture_output=True, text=True, timeout=30,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0) # Sem janela de console sobre o protetor
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.error(f"Não foi possível conceder ao grupo Usuários permissão na pasta de cache '{pasta}': {e}")
+        return False
+    if resultado.returncode != 0:
+        logger.error(
+            f"Não foi possível conceder ao grupo Usuários permissão na pasta de cache '{pasta}' "
+            f"(icacls {resultado.returncode}): {(resultado.stdout or resultado.stderr).strip()}"
+        )
+        return False
+    logger.info(f"Permissão de modificação concedida ao grupo Usuários na pasta de cache compartilhada '{pasta}'.")
+    return True
+
+def _pasta_aceita_gravacao(pasta):
+    caminho_teste = os.path.join(pasta, f".teste_gravacao.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(caminho_teste, 'w', encoding='utf-8'):
+            pass
+        os.remove(caminho_teste)
+        return True
+    except OSError:
+        return False
+
+def obter_pasta_estado_local():
+    """Pasta onde o protetor guarda seu estado local (configuração persistida, etc.)."""
+    return os.path.join(obter_pasta_appdata_local(), SUBPASTA_ESTADO_LOCAL)
+
+def ler_config_persistida(url_config_remota, pasta_estado=None):
+    """
+    Lê a última configuração válida gravada localmente para esta URL.
+    Retorna o registro {url, config, etag, last_modified, obtida_em} ou None.
+    """
+    caminho = os.path.join(pasta_estado or obter_pasta_estado_local(), NOME_CONFIG_PERSISTIDA)
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            registro = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Configuração persistida inválida em '{caminho}': {e}")
+        return None
+    if not isinstance(registro, dict) or registro.get("url") != url_config_remota or not isinstance(registro.get("config"), dict):
+        return None
+    return registro
+
+def _gravar_config_persistida(registro, pasta_estado):
+    caminho = os.path.join(pasta_estado, NOME_CONFIG_PERSISTIDA)
+    caminho_temp = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(pasta_estado, exist_ok=True)
+        with open(caminho_temp, 'w', encoding='utf-8') as f:
+            json.dump(registro, f, ensure_ascii=False, indent=2)
+        os.replace(caminho_temp, caminho)
+    except OSError as e:
+        logger.warning(f"Não foi possível persistir a configuração em '{caminho}': {e}")
 
+def _buscar_configuracao(url_config_remota, persistida, timeout):
+    """
+    Busca a configuração na origem (UNC ou HTTP/S).
+    Em HTTP/S, envia If-None-Match/If-Modified-Since se houver cópia persistida; uma resposta 304
+    devolve a configuração persistida sem transferir o JSON novamente.
+    Retorna (config, etag, last_modified, nao_modificada).
+    """
+    # Importado aqui: urllib.request é pesado e só é necessário quando a origem é de fato consultada
+    import urllib.request
+    import urllib.error
+    config = None
+    etag = last_modified = None
     try:
         if url_config_remota.startswith('\\\\'): # Caminho UNC
             logger.info(f"Detectado caminho UNC: {url_config_remota}")
@@ -35,16 +156,30 @@ def carregar_configuracao(url_config_remota=None):
                 raise FileNotFoundError(f"Arquivo de configuração não encontrado: {url_config_remota}")
         elif url_config_remota.startswith('http://') or url_config_remota.startswith('https://'): # URL HTTP/S
             logger.info(f"Detectada URL HTTP/S: {url_config_remota}")
-            # Adicionar header para tentar evitar cache de proxy/navegador
-            req = urllib.request.Request(url_config_remota, headers={'Cache-Control': 'no-cache', 'Pragma': 'no-cache'})
-            with urllib.request.urlopen(req, timeout=10) as response:
-                if response.status == 200:
-                    data = response.read().decode('utf-8')
-                    config = json.loads(data)
-                    logger.info("Configuração carregada com sucesso de URL HTTP/S.")
-                else:
-                    logger.error(f"Falha ao carregar configuração. Status: {response.status}")
-                    raise ConnectionError(f"Falha ao carregar configuração. Status: {response.status}")
+            # no-cache obriga proxies a revalidar; os cabeçalhos condicionais tornam a revalidação barata (304)
+            headers = {'Cache-Control': 'no-cache', 'Pragma': 'no-cache'}
+            if persistida:
+                if persistida.get("etag"):
+                    headers['If-None-Match'] = persistida["etag"]
+                if persistida.get("last_modified"):
+                    headers['If-Modified-Since'] = persistida["last_modified"]
+            req = urllib.request.Request(url_config_remota, headers=headers)
+            try:
+                with urllib.request.urlopen(req, timeout=timeout) as response:
+                    if response.status == 200:
+                        data = response.read().decode('utf-8')
+                        config = json.loads(data)
+                        etag = response.headers.get('ETag')
+                        last_modified = response.headers.get('Last-Modified')
+                        logger.info("Configuração carregada com sucesso de URL HTTP/S.")
+                    else:
+                        logger.error(f"Falha ao carregar configuração. Status: {response.status}")
+                        raise ConnectionError(f"Falha ao carregar configuração. Status: {response.status}")
+            except urllib.error.HTTPError as e:
+                if e.code == 304 and persistida:
+                    logger.info("Configuração não modificada (HTTP 304). Usando cópia persistida.")
+                    return persistida["config"], persistida.get("etag"), persistida.get("last_modified"), True
+                raise
         else:
             logger.error(f"Formato de URL/caminho de configuração inválido: {url_config_remota}")
             raise ValueError("Formato de URL/caminho de configuração inválido.")
@@ -58,29 +193,92 @@ def carregar_configuracao(url_config_remota=None):
     except Exception as e:
         logger.error(f"Erro inesperado ao carregar configuração: {e}")
         raise
+    return config, etag, last_modified, False
 
-    if config:
-        # Validações básicas
-        required_keys = ["pasta_imagens_rede", "tempo_exibicao_imagem_segundos", "pasta_cache_local_subpath"]
-        for key in required_keys:
-            if key not in config:
-                msg_erro = f"Chave obrigatória '{key}' não encontrada na configuração."
-                logger.error(msg_erro)
-                raise KeyError(msg_erro)
-        
-        # Construir o caminho completo da pasta de cache
-        appdata_local_path = os.getenv('LOCALAPPDATA')
-        if not appdata_local_path:
-            # Fallback se LOCALAPPDATA não estiver definido (muito raro em Windows modernos)
-            appdata_local_path = os.path.join(os.getenv('USERPROFILE', '.'), 'AppData', 'Local')
-            logger.warning(f"Variável de ambiente LOCALAPPDATA não encontrada. Usando fallback: {appdata_local_path}")
-        
-        config["pasta_cache_local_completa"] = os.path.join(appdata_local_path, config["pasta_cache_local_subpath"])
-        logger.info(f"Caminho completo do cache local definido para: {config['pasta_cache_local_completa']}")
-        
-        logger.info(f"Configuração carregada e processada: {json.dumps(config, indent=2)}")
+def processar_configuracao(config):
+    """Valida as chaves obrigatórias e calcula os caminhos derivados. Retorna uma cópia processada."""
+    config = dict(config)
+    # Validações básicas
+    required_keys = ["pasta_imagens_rede", "tempo_exibicao_imagem_segundos", "pasta_cache_local_subpath"]
+    for key in required_keys:
+        if key not in config:
+            msg_erro = f"Chave obrigatória '{key}' não encontrada na configuração."
+            logger.error(msg_erro)
+            raise KeyError(msg_erro)
+    
+    # Construir o caminho completo da pasta de cache
+    # Com cache_compartilhado_maquina, todos os usuários (sessões de um servidor de terminal) usam o mesmo cache
+    pasta_base_cache = obter_pasta_dados_maquina() if config.get("cache_compartilhado_maquina") else obter_pasta_appdata_local()
+    config["pasta_cache_local_completa"] = os.path.join(pasta_base_cache, config["pasta_cache_local_subpath"])
+    logger.info(f"Caminho completo do cache local definido para: {config['pasta_cache_local_completa']}")
+    
+    logger.info(f"Configuração carregada e processada (versão {config.get('versao_config', 'desconhecida')}).")
+    if logger.isEnabledFor(logging.DEBUG): # Evita serializar a configuração inteira se o nível DEBUG estiver desligado
+        logger.debug(f"Configuração completa: {json.dumps(config, indent=2)}")
     return config
 
+def carregar_configuracao_persistida(url_config_remota=None, pasta_estado=None):
+    """
+    Retorna a última configuração válida persistida para a URL, já processada, sem consultar a origem
+    (usada pelo preview, que não deve depender da rede). Retorna None se não houver cópia local.
+    """
+    persistida = ler_config_persistida(url_config_remota or URL_CONFIG_PADRAO, pasta_estado)
+    if not persistida:
+        return None
+    return processar_configuracao(persistida["config"])
+
+def carregar_configuracao(url_config_remota=None, pasta_estado=None):
+    """
+    Carrega a configuração de uma URL remota ou de um caminho UNC.
+    Se url_config_remota for um caminho UNC, tenta ler diretamente.
+
+    A última configuração válida fica persistida em pasta_estado (padrão: %LOCALAPPDATA%\\ProtetorTelaUniversidade):
+    - dentro de 'ttl_configuracao_segundos' desde a última busca, a origem nem é consultada;
+    - em HTTP/S a busca é condicional (ETag/Last-Modified), e um 304 reutiliza a cópia local;
+    - se a origem falhar ou não responder em PRAZO_COM_COPIA_LOCAL_SEGUNDOS, a cópia local é usada.
+    """
+    if url_config_remota is None:
+        url_config_remota = URL_CONFIG_PADRAO
+        logger.info(f"Nenhuma URL de configuração fornecida, usando padrão: {URL_CONFIG_PADRAO}")
+
+    pasta_estado = pasta_estado or obter_pasta_estado_local()
+    persistida = ler_config_persistida(url_config_remota, pasta_estado)
+
+    if persistida:
+        ttl = persistida["config"].get("ttl_configuracao_segundos", 0) or 0
+        idade = time.time() - persistida.get("obtida_em", 0)
+        if 0 <= idade < ttl:
+            metricas.incrementar("configuracao_dentro_do_ttl")
+            logger.info(f"Usando configuração persistida (obtida há {idade:.0f} s, TTL de {ttl} s). Origem não consultada.")
+            return processar_configuracao(persistida["config"])
+
+    logger.info(f"Tentando carregar configuração de: {url_config_remota}")
+    prazo = PRAZO_COM_COPIA_LOCAL_SEGUNDOS if persistida else TIMEOUT_BUSCA_SEGUNDOS
+    try:
+        with metricas.medir("busca_configuracao"):
+            # Em uma thread auxiliar com prazo, cobrindo também etapas sem timeout próprio (resolução de nomes, caminhos UNC)
+            config, etag, last_modified, nao_modificada = acesso_rede.executar_com_prazo(
+                lambda: _buscar_configuracao(url_config_remota, persistida, prazo), prazo, "busca_configuracao"
+            )
+        config_processada = processar_configuracao(config) if config else None
+    except Exception as e:
+        if not persistida:
+            raise
+        metricas.incrementar("configuracao_falha_usou_persistida")
+        logger.warning(f"Falha ao buscar configuração ({e}). Usando a última configuração válida persistida.")
+        return processar_configuracao(persistida["config"])
+
+    if config_processada:
+        _gravar_config_persistida({
+            "url": url_config_remota, "config": config, "etag": etag,
+            "last_modified": last_modified, "obtida_em": time.time()
+        }, pasta_estado)
+        if nao_modificada:
+            metricas.incrementar("configuracao_nao_modificada")
+        else:
+            logger.info("Configuração persistida localmente para uso offline.")
+    return config_processada
+
 if __name__ == '__main__':
     # Configurar um logger básico para o teste do configuracao.py
     logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
@@ -0,0 +1,113 @@
+# copiador.py
+import os
+import time
+import shutil
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+TAMANHO_BLOCO_COPIA = 1024 * 1024 # 1 MB por leitura/escrita
+SUFIXO_TEMPORARIO = ".tmp" # Arquivos em cópia; não casam com as extensões de imagem
+
+class LimitadorBanda:
+    """
+    Limita a taxa de transferência (bytes/s) somada de todas as threads de cópia.
+    Cada bloco reserva uma janela de tempo proporcional ao seu tamanho; quem estiver
+    adiantado em relação à taxa configurada dorme até o fim da sua janela.
+    """
+
+    def __init__(self, bytes_por_segundo):
+        self.bytes_por_segundo = float(bytes_por_segundo)
+        self._lock = threading.Lock()
+        self._fim_reservado = time.monotonic()
+
+    def consumir(self, num_bytes):
+        with self._lock:
+            agora = time.monotonic()
+            self._fim_reservado = max(self._fim_reservado, agora) + num_bytes / self.bytes_por_segundo
+            espera = self._fim_reservado - agora
+        if espera > 0:
+            time.sleep(espera)
+
+
+class CopiadorArquivos:
+    """
+    Copia arquivos para o cache usando um pool limitado de threads.
+    Cada cópia é gravada em um arquivo temporário no diretório de destino e renomeada
+    atomicamente (os.replace), de modo que um processo interrompido nunca deixe um arquivo truncado
+    com o nome final.
+    """
+
+    def __init__(self, num_copias_simultaneas=4, limite_bytes_por_segundo=None):
+        self.num_copias_simultaneas = max(1, int(num_copias_simultaneas))
+        self.limitador = LimitadorBanda(limite_bytes_por_segundo) if limite_bytes_por_segundo else None
+
+    def copiar_arquivo(self, caminho_origem, caminho_destino):
+        """Copia um arquivo de forma atômica. Retorna o número de bytes copiados."""
+        caminho_temp = f"{caminho_destino}.{os.getpid()}.{threading.get_ident()}{SUFIXO_TEMPORARIO}"
+        try:
+            if self.limitador is None:
+                shutil.copyfile(caminho_origem, caminho_temp)
+                bytes_copiados = os.path.getsize(caminho_temp)
+            else:
+                bytes_copiados = 0
+                with open(caminho_origem, 'rb') as origem, open(caminho_temp, 'wb') as destino:
+                    while True:
+                        bloco = origem.read(TAMANHO_BLOCO_COPIA)
+                        if not bloco:
+                            break
+                        self.limitador.consumir(len(bloco))
+                        destino.write(bloco)
+                        bytes_copiados += len(bloco)
+            shutil.copystat(caminho_origem, caminho_temp) # Preserva a data de modificação (como copy2)
+            os.replace(caminho_temp, caminho_destino)
+            return bytes_copiados
+        except BaseException:
+            try:
+                os.remove(caminho_temp)
+            except OSError:
+                pass
+            raise
+
+    def copiar_lote(self, tarefas, ao_concluir=None, ao_inalterado=None):
+        """
+        Copia uma lista de tarefas (caminho_origem, caminho_destino) em paralelo.
+        Se informado, ao_concluir(caminho_origem, caminho_destino) é chamado para cada cópia bem-sucedida.
+        Uma cópia que retorna None não foi necessária (origem inalterada; ex: HTTP 304): é contada e,
+        se informado, ao_inalterado(caminho_origem, caminho_destino) é chamado.
+        Retorna um dicionário com as estatísticas da sincronização:
+        bytes, arquivos copiados, inalterados, falhas, duração e vazão.
+        """
+        estatisticas = {"arquivos": 0, "bytes": 0, "inalterados": 0, "falhas": 0, "duracao_s": 0.0, "vazao_mb_s": 0.0}
+        if not tarefas:
+            return estatisticas
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.num_copias_simultaneas, thread_name_prefix="CopiaCache") as executor:
+            futuros = {executor.submit(self.copiar_arquivo, origem, destino): (origem, destino) for origem, destino in tarefas}
+            for futuro in as_completed(futuros):
+                origem, destino = futuros[futuro]
+                nome_arquivo = os.path.basename(origem)
+                try:
+                    bytes_copiados = futuro.result()
+                    if bytes_copiados is None:
+                        estatisticas["inalterados"] += 1
+                        if ao_inalterado:
+                            ao_inalterado(origem, destino)
+                        continue
+                    estatisticas["bytes"] += bytes_copiados
+                    estatisticas["arquivos"] += 1
+                    if ao_concluir:
+                        ao_concluir(origem, destino)
+                    logger.info(f"Copiado/Atualizado '{nome_arquivo}' da rede para o cache.")
+                except Exception as e_copy:
+                    estatisticas["falhas"] += 1
+                    logger.error(f"Erro ao copiar '{nome_arquivo}' da rede para o cache: {e_copy}")
+
+        duracao = time.perf_counter() - inicio
+        estatisticas["duracao_s"] = round(duracao, 3)
+        estatisticas["vazao_mb_s"] = round(estatisticas["bytes"] / (1024 * 1024) / duracao, 2) if duracao > 0 else 0.0
+        return estatisticas
@@ -0,0 +1,198 @@
+# lista_reproducao.py
+import os
+import json
+import random
+import logging
+import threading
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+NOME_ARQUIVO_LISTA = "lista_reproducao.json" # Na pasta de estado local (%LOCALAPPDATA%\ProtetorTelaUniversidade)
+VERSAO_LISTA = 1
+
+class ListaReproducao:
+    """
+    Ordem de exibição das imagens como uma "sacola embaralhada": cada rodada é uma permutação de todas
+    as imagens e nenhuma se repete até que todas tenham sido exibidas. A rodada, a posição e a próxima
+    rodada (sorteada com antecedência, para que a antecipação enxergue além do fim da atual) são persistidas,
+    de modo que a apresentação continua de onde parou na ativação seguinte, em uma ordem estável que a
+    sincronização e o prefetcher podem preparar antes.
+
+    As imagens são identificadas pelo nome do arquivo (no cache, o hash do conteúdo). Imagens novas entram
+    em posições sorteadas entre as que ainda não foram exibidas nesta rodada, sem reembaralhar as demais.
+    Usada pela thread do Tkinter; a sincronização apenas consulta as próximas imagens (proximos_nomes).
+    """
+
+    def __init__(self, caminho_arquivo):
+        self.caminho_arquivo = caminho_arquivo
+        self._lock = threading.Lock()
+        self._ordem = [] # Nomes da rodada atual
+        self._seguinte = [] # Nomes da próxima rodada (sorteada quando a antecipação passa do fim da atual)
+        self._posicao = 0 # Próxima imagem a exibir; as anteriores já foram exibidas nesta rodada
+        self._rodada = 0
+        self._caminhos = {} # {nome: caminho} das imagens disponíveis
+        self.resolucao = None # (largura, altura) da última apresentação, usada para aquecer as próximas imagens
+        self._alterada = False
+        self._carregar()
+
+    def _carregar(self):
+        try:
+            with open(self.caminho_arquivo, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Lista de reprodução inválida, será recriada: {e}")
+            return
+        if not isinstance(dados, dict) or dados.get("versao") != VERSAO_LISTA:
+            return
+        try:
+            self._ordem = [str(nome) for nome in dados.get("ordem", [])]
+            self._seguinte = [str(nome) for nome in dados.get("seguinte", [])]
+            self._posicao = min(max(int(dados.get("posicao", 0)), 0), len(self._ordem))
+            self._rodada = int(dados.get("rodada", 0))
+            resolucao = dados.get("resolucao")
+            self.resolucao = (int(resolucao[0]), int(resolucao[1])) if resolucao else None
+        except (TypeError, ValueError, IndexError) as e:
+            logger.warning(f"Lista de reprodução inválida, será recriada: {e}")
+            self._ordem, self._seguinte, self._posicao, self._rodada, self.resolucao = [], [], 0, 0, None
+
+    def salvar(self):
+        """Grava a lista (se alterada) de forma atômica."""
+        with self._lock:
+            if not self._alterada:
+                return
+            dados = {
+                "versao": VERSAO_LISTA, "rodada": self._rodada, "posicao": self._posicao,
+                "resolucao": list(self.resolucao) if self.resolucao else None,
+                "ordem": list(self._ordem), "seguinte": list(self._seguinte),
+            }
+            self._alterada = False
+        caminho_temp = f"{self.caminho_arquivo}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.caminho_arquivo), exist_ok=True)
+            with open(caminho_temp, 'w', encoding='utf-8') as f:
+                json.dump(dados, f, ensure_ascii=False)
+            os.replace(caminho_temp, self.caminho_arquivo)
+        except OSError as e:
+            logger.error(f"Não foi possível gravar a lista de reprodução: {e}")
+
+    def definir_resolucao(self, largura, altura):
+        with self._lock:
+            if self.resolucao != (largura, altura):
+                self.resolucao = (largura, altura)
+                self._alterada = True
+
+    def organizar(self, caminhos_imagens, reservadas=0):
+        """
+        Ajusta a lista às imagens disponíveis: as que sumiram saem (mantendo a posição) e as novas entram
+        em posições sorteadas entre as ainda não exibidas, depois das 'reservadas' seguintes (já antecipadas).
+        Retorna os caminhos na ordem da rodada atual.
+        """
+        with self._lock:
+            self._caminhos = {os.path.basename(caminho): caminho for caminho in caminhos_imagens}
+            exibidas = [nome for nome in self._ordem[:self._posicao] if nome in self._caminhos]
+            pendentes = [nome for nome in self._ordem[self._posicao:] if nome in self._caminhos]
+            conhecidos = set(exibidas) | set(pendentes)
+            novas = [nome for nome in self._caminhos if nome not in conhecidos]
+            removidas = len(self._ordem) - len(exibidas) - len(pendentes)
+            random.shuffle(novas)
+            for nome in novas:
+                pendentes.insert(random.randint(min(reservadas, len(pendentes)), len(pendentes)), nome)
+            seguinte = [nome for nome in self._seguinte if nome in self._caminhos]
+            if novas or removidas or len(seguinte) != len(self._seguinte):
+                self._ordem = exibidas + pendentes
+                self._posicao = len(exibidas)
+                self._seguinte = seguinte
+                self._alterada = True
+            if novas or removidas:
+                logger.info(
+                    f"Lista de reprodução: {len(self._ordem)} imagens ({len(novas)} novas, {removidas} removidas), "
+                    f"rodada {self._rodada}, {self._posicao} já exibidas."
+                )
+            return [self._caminhos[nome] for nome in self._ordem]
+
+    def _iniciar_rodada_se_preciso(self):
+        if self._posicao < len(self._ordem) or not self._caminhos:
+            return
+        self._ordem = self._sortear_seguinte() if not self._seguinte else self._completar(self._seguinte)
+        self._seguinte = []
+        self._posicao = 0
+        self._rodada += 1
+        self._alterada = True
+        logger.debug("Nova rodada da lista de reprodução: %d (%d imagens).", self._rodada, len(self._ordem))
+
+    def _sortear_seguinte(self):
+        """Sorteia uma rodada; a última imagem exibida não abre a rodada seguinte (evita a repetição na virada)."""
+        nomes = list(self._caminhos)
+        random.shuffle(nomes)
+        if len(nomes) > 1 and self._ordem and nomes[0] == self._ordem[-1]:
+            nomes.append(nomes.pop(0))
+        return nomes
+
+    def _completar(self, nomes):
+        """A rodada sorteada com antecedência, sem as imagens que sumiram e com as que entraram depois do sorteio."""
+        presentes = [nome for nome in nomes if nome in self._caminhos]
+        conhecidos = set(presentes)
+        for nome in self._caminhos:
+            if nome not in conhecidos:
+                presentes.insert(random.randint(0, len(presentes)), nome)
+        return presentes
+
+    def atual(self):
+        """Caminho da próxima imagem a exibir (None se não houver imagens)."""
+        with self._lock:
+            self._iniciar_rodada_se_preciso()
+            return self._caminhos[self._ordem[self._posicao]] if self._posicao < len(self._ordem) else None
+
+    def avancar(self):
+        """Marca a imagem atual como exibida."""
+        with self._lock:
+            self._iniciar_rodada_se_preciso()
+            if self._posicao < len(self._ordem):
+                self._posicao += 1
+                self._alterada = True
+
+    def proximos_nomes(self, quantidade):
+        """Nomes das próximas imagens a exibir, a partir da atual, sorteando a próxima rodada se necessário."""
+        with self._lock:
+            nomes = self._ordem[self._posicao:self._posicao + quantidade]
+            if len(nomes) < quantidade and self._caminhos:
+                if not self._seguinte:
+                    self._seguinte = self._sortear_seguinte()
+                    self._alterada = True
+                nomes += self._seguinte[:quantidade - len(nomes)]
+            return nomes
+
+    def proximos(self, quantidade):
+        """Caminhos das 'quantidade' próximas imagens a exibir, a partir da atual (para a antecipação)."""
+        nomes = self.proximos_nomes(quantidade)
+        with self._lock:
+            return [self._caminhos[nome] for nome in nomes if nome in self._caminhos]
+
+    def restantes_nomes(self):
+        """Nomes das imagens ainda não exibidas nesta rodada (protegidas da remoção pelo limite do cache)."""
+        with self._lock:
+            return self._ordem[self._posicao:]
+
+    def remover(self, caminho_imagem):
+        """Retira uma imagem que não pode ser exibida, mantendo a posição das demais."""
+        nome = os.path.basename(caminho_imagem)
+        with self._lock:
+            self._caminhos.pop(nome, None)
+            if nome in self._ordem:
+                if self._ordem.index(nome) < self._posicao:
+                    self._posicao -= 1
+                self._ordem.remove(nome)
+                self._alterada = True
+            if nome in self._seguinte:
+                self._seguinte.remove(nome)
+
+    def resumo(self):
+        with self._lock:
+            return {"imagens": len(self._ordem), "rodada": self._rodada, "posicao": self._posicao}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._caminhos)
@@ -0,0 +1,131 @@
+# manifesto.py
+"""
+Manifesto da pasta de imagens: um único arquivo JSON, publicado junto às imagens, que lista
+nome, tamanho, data de modificação e hash do conteúdo de cada arquivo.
+
+O cliente lê apenas esse arquivo (uma única leitura pela rede) e o compara com o índice de nomes
+do cache local (armazem_cache), em vez de chamar listdir/isfile/getmtime para cada arquivo do compartilhamento.
+
+Uso para gerar/atualizar o manifesto de uma pasta:
+    python manifesto.py <pasta_imagens> [--extensoes .jpg,.jpeg,.png,.gif,.bmp]
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+NOME_MANIFESTO = "manifesto_imagens.json" # Publicado na pasta de imagens da rede
+VERSAO_MANIFESTO = 1
+TOLERANCIA_DESATUALIZACAO_S = 2.0 # Diferença aceita entre a data da pasta e a do manifesto
+EXTENSOES_PADRAO = [".jpg", ".jpeg", ".png", ".gif", ".bmp"]
+
+def calcular_hash_arquivo(caminho_arquivo, tamanho_bloco=1024 * 1024):
+    """Retorna o hash SHA-256 (hexadecimal) do conteúdo do arquivo."""
+    sha256 = hashlib.sha256()
+    with open(caminho_arquivo, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            sha256.update(bloco)
+    return sha256.hexdigest()
+
+def _gravar_json_atomico(caminho, dados):
+    caminho_temp = f"{caminho}.{os.getpid()}.tmp"
+    with open(caminho_temp, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False, indent=1)
+    os.replace(caminho_temp, caminho)
+
+def gerar_manifesto(pasta_imagens, extensoes=None):
+    """
+    Gera (ou atualiza) o manifesto da pasta. O hash só é recalculado para arquivos cujo
+    tamanho ou data de modificação mudou desde o manifesto anterior.
+    Retorna o dicionário do manifesto gravado.
+    """
+    extensoes = extensoes or EXTENSOES_PADRAO
+    anterior = (carregar_manifesto(pasta_imagens, verificar_atualizacao=False) or {}).get("arquivos", {})
+    arquivos = {}
+    hashes_recalculados = 0
+
+    for entrada in os.scandir(pasta_imagens):
+        if not entrada.is_file() or not any(entrada.name.lower().endswith(ext) for ext in extensoes):
+            continue
+        info = entrada.stat()
+        registro_anterior = anterior.get(entrada.name)
+        if registro_anterior and registro_anterior.get("tamanho") == info.st_size and registro_anterior.get("mtime") == info.st_mtime:
+            hash_conteudo = registro_anterior["hash"]
+        else:
+            hash_conteudo = calcular_hash_arquivo(entrada.path)
+            hashes_recalculados += 1
+        arquivos[entrada.name] = {"tamanho": info.st_size, "mtime": info.st_mtime, "hash": hash_conteudo}
+
+    manifesto = {"versao": VERSAO_MANIFESTO, "gerado_em": time.time(), "arquivos": arquivos}
+    _gravar_json_atomico(os.path.join(pasta_imagens, NOME_MANIFESTO), manifesto)
+    logger.info(f"Manifesto gerado em '{pasta_imagens}': {len(arquivos)} arquivos ({hashes_recalculados} hashes recalculados).")
+    return manifesto
+
+def carregar_manifesto(pasta_imagens, verificar_atualizacao=True):
+    """
+    Lê o manifesto da pasta de imagens. Retorna None se ele não existir, for inválido ou,
+    com verificar_atualizacao, se a pasta tiver sido alterada depois dele (arquivos adicionados
+    ou removidos sem regenerar o manifesto) — nesses casos o chamador deve listar a pasta.
+    """
+    caminho_manifesto = os.path.join(pasta_imagens, NOME_MANIFESTO)
+    try:
+        with open(caminho_manifesto, 'r', encoding='utf-8') as f:
+            manifesto = json.load(f)
+        if verificar_atualizacao:
+            mtime_manifesto = os.path.getmtime(caminho_manifesto)
+            if os.path.getmtime(pasta_imagens) > mtime_manifesto + TOLERANCIA_DESATUALIZACAO_S:
+                logger.warning(f"Manifesto '{caminho_manifesto}' é mais antigo que a pasta. Ignorando-o.")
+                return None
+    except FileNotFoundError:
+        logger.debug(f"Manifesto não encontrado em '{pasta_imagens}'.")
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Não foi possível ler o manifesto '{caminho_manifesto}': {e}")
+        return None
+
+    if not formato_valido(manifesto):
+        logger.warning(f"Manifesto '{caminho_manifesto}' com formato não suportado. Ignorando-o.")
+        return None
+    return manifesto
+
+def formato_valido(manifesto):
+    """True se o dicionário tem o formato de manifesto suportado (também usado pela listagem HTTP)."""
+    return isinstance(manifesto, dict) and manifesto.get("versao") == VERSAO_MANIFESTO and isinstance(manifesto.get("arquivos"), dict)
+
+def planejar_sincronizacao(manifesto, indice_nomes, extensoes):
+    """
+    Compara o manifesto da rede com o índice de nomes do cache local ({nome: {hash, ...}}).
+    Retorna (arquivos_rede, nomes_a_copiar), em que arquivos_rede é {nome: registro_do_manifesto}
+    filtrado pelas extensões e nomes_a_copiar são os arquivos novos ou alterados.
+    Registros sem hash (ex: listagem HTTP mínima) são comparados pela data de modificação.
+    """
+    arquivos_rede = {
+        nome: registro for nome, registro in manifesto["arquivos"].items()
+        if any(nome.lower().endswith(ext) for ext in extensoes)
+    }
+    nomes_a_copiar = []
+    for nome, registro in arquivos_rede.items():
+        registro_cache = indice_nomes.get(nome) or {}
+        if registro.get("hash"):
+            alterado = registro_cache.get("hash") != registro["hash"]
+        else:
+            alterado = not registro_cache or registro.get("mtime") is None or registro_cache.get("mtime") != registro["mtime"]
+        if alterado:
+            nomes_a_copiar.append(nome)
+    return arquivos_rede, nomes_a_copiar
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+    if len(sys.argv) < 2:
+        print(f"Uso: python {os.path.basename(__file__)} <pasta_imagens> [--extensoes .jpg,.png,...]")
+        sys.exit(1)
+    extensoes_cli = None
+    if "--extensoes" in sys.argv[2:]:
+        extensoes_cli = [ext.strip().lower() for ext in sys.argv[sys.argv.index("--extensoes") + 1].split(",") if ext.strip()]
+    gerar_manifesto(sys.argv[1], extensoes_cli)
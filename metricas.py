@@ -0,0 +1,138 @@
+# metricas.py
+"""
+Instrumentação leve por fases (temporizadores, contadores e valores), agregada em memória
+e gravada como JSON ao sair e, opcionalmente, em intervalos regulares.
+
+Quando desativada, medir() devolve um contexto nulo compartilhado e as demais funções
+retornam imediatamente, de modo que o custo nos pontos instrumentados é desprezível.
+"""
+import os
+import json
+import time
+import socket
+import logging
+import threading
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+ATIVO = True
+_lock = threading.Lock()
+_temporizadores = {} # {nome: [n, total_ms, min_ms, max_ms]}
+_contadores = {} # {nome: valor}
+_valores = {} # {nome: último valor}
+_INSTANTE_CRIACAO = time.time()
+
+def configurar(ativo):
+    """Ativa ou desativa a coleta."""
+    global ATIVO
+    ATIVO = bool(ativo)
+
+def registrar_tempo(nome, duracao_ms):
+    if not ATIVO:
+        return
+    with _lock:
+        registro = _temporizadores.get(nome)
+        if registro is None:
+            _temporizadores[nome] = [1, duracao_ms, duracao_ms, duracao_ms]
+        else:
+            registro[0] += 1
+            registro[1] += duracao_ms
+            registro[2] = min(registro[2], duracao_ms)
+            registro[3] = max(registro[3], duracao_ms)
+
+def incrementar(nome, valor=1):
+    if not ATIVO:
+        return
+    with _lock:
+        _contadores[nome] = _contadores.get(nome, 0) + valor
+
+def definir(nome, valor):
+    if not ATIVO:
+        return
+    with _lock:
+        _valores[nome] = valor
+
+
+class _Medicao:
+    __slots__ = ("nome", "inicio")
+
+    def __init__(self, nome):
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registrar_tempo(self.nome, (time.perf_counter() - self.inicio) * 1000)
+        return False
+
+
+class _MedicaoNula:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_MEDICAO_NULA = _MedicaoNula()
+
+def medir(nome):
+    """Context manager que registra a duração do bloco no temporizador 'nome'."""
+    return _Medicao(nome) if ATIVO else _MEDICAO_NULA
+
+def resumo():
+    """Retorna as métricas agregadas como dicionário serializável em JSON."""
+    with _lock:
+        temporizadores = {
+            nome: {
+                "n": n, "total_ms": round(total, 2), "media_ms": round(total / n, 2),
+                "min_ms": round(minimo, 2), "max_ms": round(maximo, 2),
+            }
+            for nome, (n, total, minimo, maximo) in sorted(_temporizadores.items())
+        }
+        return {"temporizadores": temporizadores, "contadores": dict(sorted(_contadores.items())), "valores": dict(sorted(_valores.items()))}
+
+def gravar_json(caminho_arquivo, extras=None):
+    """Grava o resumo (com identificação da máquina e do processo) de forma atômica."""
+    if not ATIVO or not caminho_arquivo:
+        return
+    dados = {
+        "maquina": socket.gethostname(), "pid": os.getpid(),
+        "inicio_processo": _INSTANTE_CRIACAO, "gravado_em": time.time(),
+    }
+    dados.update(extras or {})
+    dados.update(resumo())
+    caminho_temp = f"{caminho_arquivo}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(caminho_arquivo) or ".", exist_ok=True)
+        with open(caminho_temp, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, indent=2)
+        os.replace(caminho_temp, caminho_arquivo)
+    except OSError as e:
+        logger.warning(f"Não foi possível gravar as métricas em '{caminho_arquivo}': {e}")
+
+
+class GravadorPeriodico:
+    """Grava as métricas a cada 'intervalo_segundos' em uma thread de fundo."""
+
+    def __init__(self, caminho_arquivo, intervalo_segundos, extras=None):
+        self.caminho_arquivo = caminho_arquivo
+        self.intervalo_segundos = intervalo_segundos
+        self.extras = extras
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name="GravadorMetricas", daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo_segundos):
+            gravar_json(self.caminho_arquivo, self.extras)
+
+    def parar(self):
+        self._parar.set()
@@ -0,0 +1,247 @@
+# monitor_pasta.py
+import os
+import sys
+import time
+import ctypes
+import logging
+
+import manifesto
+import acesso_rede
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+ESPERA_ACOMODACAO_S = 2.0 # Após uma notificação, aguarda a pasta parar de mudar (cópias em andamento)
+ESPERA_ACOMODACAO_MAXIMA_S = 30.0
+
+# inotify (Linux)
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+MASCARA_INOTIFY = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+# FindFirstChangeNotification (Windows)
+FILE_NOTIFY_CHANGE_FILE_NAME = 0x001
+FILE_NOTIFY_CHANGE_SIZE = 0x008
+FILE_NOTIFY_CHANGE_LAST_WRITE = 0x010
+WAIT_OBJECT_0 = 0x000
+
+class _NotificacaoInotify:
+    """Eventos da pasta via inotify (libc, por ctypes). Em montagens de rede, só enxerga alterações feitas pela própria máquina."""
+
+    def __init__(self, pasta):
+        import select
+        self._select = select
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falhou")
+        if libc.inotify_add_watch(self._fd, os.fsencode(pasta), MASCARA_INOTIFY) < 0:
+            erro = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(erro, f"inotify_add_watch falhou para '{pasta}'")
+
+    def aguardar(self, timeout_s):
+        prontos, _, _ = self._select.select([self._fd], [], [], timeout_s)
+        if not prontos:
+            return False
+        try:
+            while os.read(self._fd, 64 * 1024): # Descarta os eventos: interessa apenas que houve mudança
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def fechar(self):
+        os.close(self._fd)
+
+
+class _NotificacaoWindows:
+    """Eventos da pasta via FindFirstChangeNotificationW (funciona também em compartilhamentos SMB)."""
+
+    def __init__(self, pasta):
+        import ctypes.wintypes
+        self._kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        self._kernel32.FindFirstChangeNotificationW.restype = ctypes.wintypes.HANDLE
+        self._kernel32.FindFirstChangeNotificationW.argtypes = [ctypes.wintypes.LPCWSTR, ctypes.wintypes.BOOL, ctypes.wintypes.DWORD]
+        self._kernel32.WaitForSingleObject.argtypes = [ctypes.wintypes.HANDLE, ctypes.wintypes.DWORD]
+        self._kernel32.FindNextChangeNotification.argtypes = [ctypes.wintypes.HANDLE]
+        self._kernel32.FindCloseChangeNotification.argtypes = [ctypes.wintypes.HANDLE]
+        self._handle = self._kernel32.FindFirstChangeNotificationW(
+            pasta, False, FILE_NOTIFY_CHANGE_FILE_NAME | FILE_NOTIFY_CHANGE_SIZE | FILE_NOTIFY_CHANGE_LAST_WRITE
+        )
+        if not self._handle or self._handle == ctypes.wintypes.HANDLE(-1).value: # INVALID_HANDLE_VALUE
+            raise OSError(ctypes.get_last_error(), f"FindFirstChangeNotificationW falhou para '{pasta}'")
+
+    def aguardar(self, timeout_s):
+        resultado = self._kernel32.WaitForSingleObject(self._handle, int(timeout_s * 1000))
+        if resultado != WAIT_OBJECT_0:
+            return False
+        self._kernel32.FindNextChangeNotification(self._handle) # Rearma para a próxima mudança
+        return True
+
+    def fechar(self):
+        self._kernel32.FindCloseChangeNotification(self._handle)
+
+
+class MonitorPasta:
+    """
+    Detecta alterações na pasta de imagens para a ressincronização durante a sessão.
+    Usa notificações do sistema operacional quando disponíveis e, como alternativa (e complemento,
+    já que notificações em pastas de rede não são garantidas), compara uma assinatura barata da pasta:
+    data de modificação do diretório e do manifesto e, sem manifesto, a listagem {nome: (tamanho, mtime)}
+    das imagens. A data do diretório não muda quando um arquivo é sobrescrito no lugar (NTFS/SMB/CIFS),
+    por isso a listagem é comparada arquivo a arquivo; ela vem de uma única enumeração da pasta (os.scandir,
+    que no Windows já traz tamanho e data sem um stat por arquivo). Os nomes alterados e a listagem são
+    entregues à sincronização (alteracoes), que não precisa listar a pasta de novo.
+
+    A criação não acessa a pasta: a primeira verificar_assinatura registra a assinatura inicial e ativa as
+    notificações. Com prazo_s, todo acesso à pasta (stat, abertura das notificações) roda com prazo
+    (acesso_rede.executar_com_prazo), para que um servidor que não responde não trave a thread de sincronização.
+    """
+
+    def __init__(self, pasta, usar_notificacoes=True, prazo_s=None, extensoes=None):
+        self.pasta = pasta
+        self.usar_notificacoes = usar_notificacoes
+        self.prazo_s = prazo_s
+        self.extensoes = tuple(ext.lower() for ext in extensoes) if extensoes else None
+        self.nomes_alterados = None # Nomes criados, alterados ou removidos na última verificação (None: sem listagem)
+        self._notificacao = None
+        self._assinatura = None
+        self._assinatura_registrada = False
+
+    def _com_prazo(self, funcao, nome_operacao):
+        """Executa um acesso à pasta com o prazo do monitor; lança TimeoutError se ele vencer."""
+        if not self.prazo_s:
+            return funcao()
+        return acesso_rede.executar_com_prazo(funcao, self.prazo_s, nome_operacao)
+
+    def _iniciar_notificacoes(self):
+        try:
+            if sys.platform == "win32":
+                # Abrir o handle de notificação acessa o compartilhamento: também tem prazo
+                # (se vencer, o handle aberto tardiamente pela thread abandonada não é usado)
+                self._notificacao = self._com_prazo(lambda: _NotificacaoWindows(self.pasta), "notificacao_pasta_rede")
+            elif sys.platform.startswith("linux"):
+                self._notificacao = self._com_prazo(lambda: _NotificacaoInotify(self.pasta), "notificacao_pasta_rede")
+        except (OSError, AttributeError) as e: # Inclui TimeoutError
+            logger.info(f"Notificações de alteração indisponíveis para '{self.pasta}' ({e}). Usando comparação periódica.")
+            self._notificacao = None
+        if self._notificacao:
+            logger.info(f"Monitorando alterações em '{self.pasta}' por notificações do sistema.")
+
+    @property
+    def usa_notificacoes(self):
+        return self._notificacao is not None
+
+    @property
+    def acessivel(self):
+        """True se a última verificação encontrou a pasta."""
+        return self._assinatura is not None
+
+    def assinatura(self):
+        """
+        Retorna (mtime da pasta, mtime e tamanho do manifesto, listagem das imagens ou None se houver manifesto)
+        ou None se a pasta estiver inacessível. Lança TimeoutError se a pasta não responder no prazo.
+        """
+        return self._com_prazo(self._ler_assinatura, "assinatura_pasta_rede")
+
+    def _ler_assinatura(self):
+        try:
+            info_pasta = os.stat(self.pasta)
+        except OSError:
+            return None
+        try:
+            info_manifesto = os.stat(os.path.join(self.pasta, manifesto.NOME_MANIFESTO))
+            dados_manifesto = (info_manifesto.st_mtime_ns, info_manifesto.st_size)
+        except OSError:
+            dados_manifesto = None
+        listagem = None
+        if dados_manifesto is None: # Com manifesto, a sincronização lê apenas ele
+            try:
+                listagem = self._listar_imagens()
+            except OSError:
+                return None
+        return (info_pasta.st_mtime_ns, dados_manifesto, listagem)
+
+    def _listar_imagens(self):
+        """{nome: (tamanho, mtime)} das imagens da pasta, em uma única enumeração."""
+        listagem = {}
+        with os.scandir(self.pasta) as entradas:
+            for entrada in entradas:
+                if self.extensoes and not entrada.name.lower().endswith(self.extensoes):
+                    continue
+                try:
+                    if entrada.is_file():
+                        info = entrada.stat()
+                        listagem[entrada.name] = (info.st_size, info.st_mtime)
+                except OSError:
+                    continue # Removido durante a enumeração
+        return listagem
+
+    @staticmethod
+    def _comparar_listagens(anterior, atual):
+        """Nomes criados, removidos ou com tamanho/data diferentes entre duas listagens."""
+        return {nome for nome in anterior.keys() | atual.keys() if anterior.get(nome) != atual.get(nome)}
+
+    def alteracoes(self):
+        """
+        (listagem atual, nomes alterados na última verificação) para a sincronização incremental,
+        ou None se não houver base de comparação (manifesto, pasta inacessível, primeira verificação).
+        """
+        if self.nomes_alterados is None or not self._assinatura or self._assinatura[2] is None:
+            return None
+        return dict(self._assinatura[2]), set(self.nomes_alterados)
+
+    def aguardar_mudanca(self, timeout_s):
+        """
+        Aguarda até timeout_s segundos por uma notificação. Retorna True se houve notificação
+        (após a pasta se acomodar); sem notificações disponíveis, apenas espera e retorna False.
+        """
+        if not self._notificacao:
+            time.sleep(timeout_s)
+            return False
+        try:
+            if not self._notificacao.aguardar(timeout_s):
+                return False
+            limite = time.monotonic() + ESPERA_ACOMODACAO_MAXIMA_S
+            while time.monotonic() < limite and self._notificacao.aguardar(ESPERA_ACOMODACAO_S):
+                pass
+            return True
+        except OSError as e:
+            logger.warning(f"Falha nas notificações de '{self.pasta}' ({e}). Usando comparação periódica.")
+            self.fechar()
+            return False
+
+    def verificar_assinatura(self):
+        """
+        Retorna True se a assinatura da pasta mudou desde a última verificação (inclui a pasta voltar a ficar acessível).
+        A primeira chamada apenas registra a assinatura inicial. Lança TimeoutError se a pasta não responder no prazo
+        (a assinatura anterior é mantida).
+        """
+        assinatura_atual = self.assinatura()
+        mudou = self._assinatura_registrada and assinatura_atual != self._assinatura
+        listagem_anterior = self._assinatura[2] if self._assinatura else None
+        listagem_atual = assinatura_atual[2] if assinatura_atual else None
+        if self._assinatura_registrada and listagem_anterior is not None and listagem_atual is not None:
+            self.nomes_alterados = self._comparar_listagens(listagem_anterior, listagem_atual)
+        else:
+            self.nomes_alterados = None
+        if self._assinatura is None and assinatura_atual is not None and self.usar_notificacoes and not self._notificacao:
+            self._iniciar_notificacoes() # Pasta acessível (pela primeira vez ou de novo): tenta as notificações
+        self._assinatura = assinatura_atual
+        self._assinatura_registrada = True
+        return mudou and assinatura_atual is not None
+
+    def fechar(self):
+        if self._notificacao:
+            try:
+                self._notificacao.fechar()
+            except OSError:
+                pass
+            self._notificacao = None
@@ -0,0 +1,335 @@
+# origem_http.py
+import os
+import json
+import queue
+import hashlib
+import logging
+import threading
+import urllib.parse
+
+import manifesto
+import copiador
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+NOME_ESTADO_HTTP = "origem_http.json" # Na raiz da pasta de cache: ETags da listagem e dos arquivos baixados
+SUBPASTA_PARCIAIS = "_parciais_http" # Downloads interrompidos, retomados com Range (fora de _entrada, que é limpa a cada sincronização)
+SUFIXO_PARCIAL = ".parcial"
+SUFIXO_VALIDADOR = ".validador" # ETag (ou Last-Modified) da resposta que originou o arquivo parcial
+TIMEOUT_HTTP_S = 30
+TAMANHO_BLOCO_DOWNLOAD = 256 * 1024
+MAX_CONEXOES_OCIOSAS = 8 # Conexões persistentes (keep-alive) guardadas para reutilização
+
+def eh_url_http(origem):
+    """True se a pasta de imagens configurada é uma URL HTTP/S em vez de um caminho UNC/local."""
+    return isinstance(origem, str) and origem.lower().startswith(("http://", "https://"))
+
+
+class OrigemHttp:
+    """
+    Pasta de imagens servida por HTTP(S). A listagem é o manifesto (mesmo formato de manifesto.py)
+    publicado em <url>/manifesto_imagens.json, buscado de forma condicional (If-None-Match): sem
+    mudanças, o servidor responde 304 e a listagem gravada é reutilizada.
+
+    Cada arquivo já baixado guarda a ETag da resposta; se o manifesto não trouxer o hash (e o arquivo
+    precisar ser conferido), o download é condicional e custa apenas um 304. Downloads interrompidos
+    ficam em _parciais_http e são retomados com Range + If-Range. As conexões são persistentes e
+    reaproveitadas entre os downloads (e entre sincronizações, enquanto o objeto existir).
+    """
+
+    def __init__(self, url_base, pasta_cache, url_listagem=None, timeout_s=TIMEOUT_HTTP_S):
+        self.url_base = url_base.rstrip("/") + "/"
+        self.url_listagem = url_listagem or urllib.parse.urljoin(self.url_base, manifesto.NOME_MANIFESTO)
+        self.timeout_s = timeout_s
+        self.caminho_estado = os.path.join(pasta_cache, NOME_ESTADO_HTTP)
+        self.pasta_parciais = os.path.join(pasta_cache, SUBPASTA_PARCIAIS)
+        self._lock = threading.Lock()
+        self._conexoes_ociosas = {} # {(esquema, host): LifoQueue de conexões}
+        self._estado = {"url_listagem": self.url_listagem, "etag_listagem": None, "listagem": None, "etags": {}}
+        self._carregar_estado()
+
+    # --- Estado persistido ---
+    def _carregar_estado(self):
+        try:
+            with open(self.caminho_estado, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Estado da origem HTTP inválido, será recriado: {e}")
+            return
+        if not isinstance(dados, dict) or dados.get("url_listagem") != self.url_listagem:
+            return # Outra origem: as ETags gravadas não valem para esta
+        if manifesto.formato_valido(dados.get("listagem")):
+            self._estado["etag_listagem"] = dados.get("etag_listagem")
+            self._estado["listagem"] = dados["listagem"]
+        if isinstance(dados.get("etags"), dict):
+            self._estado["etags"] = dados["etags"]
+
+    def salvar_estado(self, nomes_existentes=None):
+        """Grava o estado de forma atômica; com nomes_existentes, esquece as ETags dos demais arquivos."""
+        with self._lock:
+            if nomes_existentes is not None:
+                self._estado["etags"] = {nome: etag for nome, etag in self._estado["etags"].items() if nome in nomes_existentes}
+            dados = json.dumps(self._estado, ensure_ascii=False)
+        caminho_temp = f"{self.caminho_estado}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(caminho_temp, 'w', encoding='utf-8') as f:
+                f.write(dados)
+            os.replace(caminho_temp, self.caminho_estado)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar o estado da origem HTTP: {e}")
+
+    # --- Conexões persistentes ---
+    def _nova_conexao(self, esquema, host):
+        # Importado aqui: http.client só é necessário quando a origem das imagens é HTTP
+        import http.client
+        classe = http.client.HTTPSConnection if esquema == "https" else http.client.HTTPConnection
+        return classe(host, timeout=self.timeout_s)
+
+    def _obter_conexao(self, esquema, host):
+        """Retorna (conexao, reaproveitada)."""
+        with self._lock:
+            ociosas = self._conexoes_ociosas.setdefault((esquema, host), queue.LifoQueue())
+        try:
+            return ociosas.get_nowait(), True
+        except queue.Empty:
+            return self._nova_conexao(esquema, host), False
+
+    def _devolver_conexao(self, esquema, host, conexao, resposta):
+        """Guarda a conexão para reutilização se a resposta foi lida até o fim e o servidor a mantém aberta."""
+        if resposta.will_close or not resposta.isclosed():
+            conexao.close()
+            return
+        ociosas = self._conexoes_ociosas[(esquema, host)]
+        if ociosas.qsize() >= MAX_CONEXOES_OCIOSAS:
+            conexao.close()
+            return
+        ociosas.put(conexao)
+
+    def fechar(self):
+        with self._lock:
+            filas = list(self._conexoes_ociosas.values())
+            self._conexoes_ociosas = {}
+        for ociosas in filas:
+            while not ociosas.empty():
+                ociosas.get_nowait().close()
+
+    def _requisitar(self, url, cabecalhos, ao_receber):
+        """
+        Faz um GET em url e chama ao_receber(resposta), que deve consumir o corpo; retorna o resultado dele.
+        Uma conexão reaproveitada que o servidor já fechou (keep-alive expirado) é refeita uma vez.
+        """
+        import http.client
+        partes = urllib.parse.urlsplit(url)
+        esquema, host = partes.scheme.lower(), partes.netloc
+        caminho = urllib.parse.urlunsplit(("", "", partes.path or "/", partes.query, ""))
+        while True:
+            conexao, reaproveitada = self._obter_conexao(esquema, host)
+            try:
+                conexao.request("GET", caminho, headers=cabecalhos)
+                resposta = conexao.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conexao.close()
+                if reaproveitada:
+                    continue
+                raise
+            except (OSError, http.client.HTTPException):
+                conexao.close()
+                raise
+            try:
+                resultado = ao_receber(resposta)
+            except BaseException:
+                conexao.close()
+                raise
+            self._devolver_conexao(esquema, host, conexao, resposta)
+            return resultado
+
+    # --- Listagem e downloads ---
+    def url_arquivo(self, nome_arquivo):
+        return urllib.parse.urljoin(self.url_base, urllib.parse.quote(nome_arquivo))
+
+    def obter_listagem(self):
+        """
+        Busca o manifesto da origem (condicional). Retorna o dicionário do manifesto;
+        lança OSError se a origem falhar ou responder algo que não seja um manifesto válido.
+        """
+        import http.client
+        with self._lock:
+            etag_anterior = self._estado["etag_listagem"]
+            listagem_anterior = self._estado["listagem"]
+        cabecalhos = {"If-None-Match": etag_anterior} if etag_anterior and listagem_anterior else {}
+
+        def receber(resposta):
+            corpo = resposta.read()
+            if resposta.status == 304:
+                return None
+            if resposta.status != 200:
+                raise OSError(f"HTTP {resposta.status} ao buscar a listagem '{self.url_listagem}'")
+            return corpo, resposta.getheader("ETag")
+
+        try:
+            resultado = self._requisitar(self.url_listagem, cabecalhos, receber)
+        except http.client.HTTPException as e:
+            raise OSError(f"Falha HTTP ao buscar a listagem '{self.url_listagem}': {e}") from e
+        if resultado is None:
+            logger.info("Listagem da origem HTTP não modificada (304). Usando a listagem gravada.")
+            return listagem_anterior
+        corpo, etag = resultado
+        try:
+            listagem = json.loads(corpo.decode('utf-8'))
+        except ValueError as e:
+            raise OSError(f"Listagem '{self.url_listagem}' não é um JSON válido: {e}") from e
+        if not manifesto.formato_valido(listagem):
+            raise OSError(f"Listagem '{self.url_listagem}' com formato não suportado")
+        with self._lock:
+            self._estado["etag_listagem"] = etag
+            self._estado["listagem"] = listagem
+        return listagem
+
+    def _caminho_parcial(self, nome_arquivo):
+        chave = hashlib.sha1(nome_arquivo.encode('utf-8')).hexdigest()[:20]
+        return os.path.join(self.pasta_parciais, chave + SUFIXO_PARCIAL)
+
+    def baixar(self, nome_arquivo, caminho_destino, condicional=False, limitador=None):
+        """
+        Baixa o arquivo para caminho_destino (gravado por completo antes da renomeação atômica).
+        Com condicional, envia a ETag do download anterior: retorna None se o servidor responder 304
+        (o conteúdo no cache continua válido). Caso contrário, retorna o número de bytes recebidos nesta chamada.
+        Em caso de falha, o que já foi recebido fica guardado e o próximo download continua de onde parou.
+        """
+        import http.client
+        os.makedirs(self.pasta_parciais, exist_ok=True)
+        caminho_parcial = self._caminho_parcial(nome_arquivo)
+        caminho_validador = caminho_parcial + SUFIXO_VALIDADOR
+        with self._lock:
+            etag_anterior = self._estado["etags"].get(nome_arquivo)
+
+        ja_recebidos = 0
+        validador_parcial = None
+        try:
+            ja_recebidos = os.path.getsize(caminho_parcial)
+            with open(caminho_validador, 'r', encoding='utf-8') as f:
+                validador_parcial = f.read().strip()
+        except OSError:
+            ja_recebidos = 0
+        cabecalhos = {}
+        if ja_recebidos and validador_parcial:
+            # If-Range: se o arquivo mudou desde o download parcial, o servidor envia tudo de novo (200)
+            cabecalhos["Range"] = f"bytes={ja_recebidos}-"
+            cabecalhos["If-Range"] = validador_parcial
+        elif condicional and etag_anterior:
+            cabecalhos["If-None-Match"] = etag_anterior
+
+        def receber(resposta):
+            if resposta.status == 304:
+                resposta.read()
+                return None, None
+            if resposta.status == 416: # Parcial inválido (ex: arquivo encolheu): recomeça na próxima tentativa
+                resposta.read()
+                self._descartar_parcial(caminho_parcial)
+                raise OSError(f"HTTP 416 ao retomar '{nome_arquivo}'; o download será refeito")
+            if resposta.status == 206 and _inicio_content_range(resposta.getheader("Content-Range")) == ja_recebidos:
+                modo, inicio = 'ab', ja_recebidos
+            elif resposta.status == 200:
+                modo, inicio = 'wb', 0
+            elif resposta.status == 206: # Intervalo diferente do pedido: o parcial não serve, recomeça na próxima tentativa
+                resposta.read()
+                self._descartar_parcial(caminho_parcial)
+                raise OSError(f"HTTP 206 com intervalo inesperado ao retomar '{nome_arquivo}'; o download será refeito")
+            else:
+                resposta.read()
+                raise OSError(f"HTTP {resposta.status} ao baixar '{nome_arquivo}'")
+            validador = resposta.getheader("ETag") or resposta.getheader("Last-Modified")
+            if modo == 'wb':
+                if validador:
+                    with open(caminho_validador, 'w', encoding='utf-8') as f:
+                        f.write(validador)
+                else:
+                    _remover_se_existir(caminho_validador) # Sem validador, o parcial não pode ser retomado com segurança
+            tamanho_total = resposta.getheader("Content-Length")
+            recebidos = 0
+            with open(caminho_parcial, modo) as destino:
+                while True:
+                    bloco = resposta.read(TAMANHO_BLOCO_DOWNLOAD)
+                    if not bloco:
+                        break
+                    if limitador:
+                        limitador.consumir(len(bloco))
+                    destino.write(bloco)
+                    recebidos += len(bloco)
+            if tamanho_total is not None and recebidos != int(tamanho_total):
+                raise OSError(f"Download de '{nome_arquivo}' incompleto ({recebidos} de {tamanho_total} bytes)")
+            if inicio:
+                logger.info(f"Download de '{nome_arquivo}' retomado a partir do byte {inicio}.")
+            return recebidos, resposta.getheader("ETag")
+
+        try:
+            recebidos, etag = self._requisitar(self.url_arquivo(nome_arquivo), cabecalhos, receber)
+        except http.client.HTTPException as e:
+            raise OSError(f"Falha HTTP ao baixar '{nome_arquivo}': {e}") from e
+        except BaseException:
+            if not os.path.exists(caminho_validador):
+                self._descartar_parcial(caminho_parcial)
+            raise
+        if recebidos is None:
+            return None
+        os.replace(caminho_parcial, caminho_destino)
+        _remover_se_existir(caminho_validador)
+        with self._lock:
+            if etag:
+                self._estado["etags"][nome_arquivo] = etag
+            else:
+                self._estado["etags"].pop(nome_arquivo, None)
+        return recebidos
+
+    def _descartar_parcial(self, caminho_parcial):
+        _remover_se_existir(caminho_parcial)
+        _remover_se_existir(caminho_parcial + SUFIXO_VALIDADOR)
+
+    def limpar_parciais(self, nomes_pendentes):
+        """Remove downloads parciais de arquivos que não estão mais pendentes (removidos da origem ou já concluídos)."""
+        manter = {os.path.basename(self._caminho_parcial(nome)) for nome in nomes_pendentes}
+        try:
+            entradas = os.listdir(self.pasta_parciais)
+        except OSError:
+            return
+        for nome_entrada in entradas:
+            if nome_entrada.endswith(SUFIXO_PARCIAL) and nome_entrada not in manter:
+                self._descartar_parcial(os.path.join(self.pasta_parciais, nome_entrada))
+
+
+class BaixadorHttp(copiador.CopiadorArquivos):
+    """
+    CopiadorArquivos cuja origem é uma OrigemHttp: mesmas tarefas (url, caminho_destino), mesmo pool
+    limitado (downloads simultâneos), limite de banda e estatísticas de copiar_lote. Para os nomes em
+    nomes_em_cache o download é condicional, e um 304 conta como "inalterado".
+    """
+
+    def __init__(self, origem, nomes_em_cache=(), num_downloads_simultaneos=3, limite_bytes_por_segundo=None):
+        super().__init__(num_downloads_simultaneos, limite_bytes_por_segundo)
+        self.origem = origem
+        self.nomes_em_cache = set(nomes_em_cache)
+
+    def copiar_arquivo(self, caminho_origem, caminho_destino):
+        nome_arquivo = urllib.parse.unquote(caminho_origem.rsplit("/", 1)[-1])
+        return self.origem.baixar(
+            nome_arquivo, caminho_destino,
+            condicional=nome_arquivo in self.nomes_em_cache, limitador=self.limitador
+        )
+
+
+def _inicio_content_range(valor):
+    """Primeiro byte de um cabeçalho 'Content-Range: bytes INICIO-FIM/TOTAL' (ou None)."""
+    try:
+        unidade, intervalo = valor.split(" ", 1)
+        return int(intervalo.split("-", 1)[0]) if unidade.strip().lower() == "bytes" else None
+    except (AttributeError, ValueError):
+        return None
+
+def _remover_se_existir(caminho):
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
@@ -0,0 +1,254 @@
+# pacote_pixels.py
+import os
+import glob
+import json
+import mmap
+import logging
+import threading
+
+from PIL import Image # pip install Pillow
+
+import metricas
+import carregador_imagens
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+SUBPASTA_PACOTE = "_pacote_pixels" # Na pasta de cache: <largura>x<altura>.json (índice) e <largura>x<altura>.<geracao>.pack
+VERSAO_INDICE = 1
+ALINHAMENTO_BYTES = mmap.PAGESIZE # Cada imagem começa em uma página nova: lê-la não puxa páginas das vizinhas
+FRACAO_OBSOLETA_COMPACTACAO = 0.5 # Acima disso do arquivo ocupado por imagens que saíram, o pacote é regravado
+
+def _identidade(caminho_imagem):
+    """Identifica a versão do arquivo (nome, tamanho e data de modificação), como no cache redimensionado."""
+    info = os.stat(caminho_imagem)
+    return f"{os.path.basename(caminho_imagem)}_{info.st_size}_{info.st_mtime_ns}"
+
+def _modo_pacote(img_pil):
+    """RGBA para imagens com transparência, RGBX para as demais: modos que o Pillow mapeia sem cópia (frombuffer)."""
+    possui_alfa = img_pil.mode in ("RGBA", "LA", "PA") or (img_pil.mode == "P" and "transparency" in img_pil.info)
+    return "RGBA" if possui_alfa else "RGBX"
+
+def resolucoes_registradas(pasta_cache):
+    """Resoluções (largura, altura) para as quais algum protetor pediu um pacote nesta pasta de cache."""
+    resolucoes = []
+    for caminho_indice in glob.glob(os.path.join(pasta_cache, SUBPASTA_PACOTE, "*x*.json")):
+        try:
+            largura, altura = os.path.basename(caminho_indice)[:-len(".json")].split("x")
+            resolucoes.append((int(largura), int(altura)))
+        except ValueError:
+            continue
+    return resolucoes
+
+
+class PacotePixels:
+    """
+    Pacote com as imagens do cache já no formato de exibição (pixels crus na resolução da tela),
+    para máquinas com CPU fraca: a apresentação mapeia o arquivo em memória (mmap) e monta cada imagem
+    diretamente sobre o trecho mapeado (Image.frombuffer), sem decodificar nem copiar os pixels.
+
+    O arquivo de dados só cresce (novas imagens são acrescentadas ao final) e o índice, gravado de
+    forma atômica depois dos dados, aponta para os trechos válidos. Quando muitas imagens saíram do
+    cache, o pacote é regravado em uma nova geração; a anterior é apagada quando ninguém mais a mapeia
+    (no Windows, um arquivo mapeado não pode ser removido). Gravado apenas pela sincronização,
+    com a trava da pasta de cache; lido por qualquer instância.
+    """
+
+    def __init__(self, pasta_cache, largura, altura):
+        self.largura = largura
+        self.altura = altura
+        self.pasta = os.path.join(pasta_cache, SUBPASTA_PACOTE)
+        self.caminho_indice = os.path.join(self.pasta, f"{largura}x{altura}.json")
+        self._lock = threading.Lock()
+        self._indice = None
+        self._mtime_indice = None
+        self._mapa = None # (nome do arquivo de dados, mmap)
+        self.acertos = 0
+        self.faltas = 0
+
+    # --- Índice ---
+    def _indice_vazio(self):
+        return {"versao": VERSAO_INDICE, "largura": self.largura, "altura": self.altura, "geracao": 0, "arquivo": None, "entradas": {}}
+
+    def _ler_indice(self):
+        try:
+            with open(self.caminho_indice, 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+        except FileNotFoundError:
+            return self._indice_vazio()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Índice do pacote de pixels inválido, será recriado: {e}")
+            return self._indice_vazio()
+        if not isinstance(indice, dict) or indice.get("versao") != VERSAO_INDICE or not isinstance(indice.get("entradas"), dict):
+            return self._indice_vazio()
+        return indice
+
+    def _gravar_indice(self, indice):
+        caminho_temp = f"{self.caminho_indice}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(caminho_temp, 'w', encoding='utf-8') as f:
+            json.dump(indice, f)
+        os.replace(caminho_temp, self.caminho_indice)
+
+    def registrar(self):
+        """Pede à sincronização um pacote nesta resolução (cria o índice vazio, se ainda não existir)."""
+        try:
+            os.makedirs(self.pasta, exist_ok=True)
+            descritor = os.open(self.caminho_indice, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return
+        except OSError as e:
+            logger.warning(f"Não foi possível registrar o pacote de pixels {self.largura}x{self.altura}: {e}")
+            return
+        with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+            json.dump(self._indice_vazio(), f)
+        logger.info(f"Pacote de pixels {self.largura}x{self.altura} registrado; será montado na próxima sincronização.")
+
+    # --- Leitura (apresentação) ---
+    def _atualizar_indice(self):
+        """Relê o índice se ele mudou (gravado pela sincronização, nesta ou em outra instância)."""
+        try:
+            mtime_indice = os.stat(self.caminho_indice).st_mtime_ns
+        except OSError:
+            self._indice, self._mtime_indice = None, None
+            return
+        if mtime_indice != self._mtime_indice:
+            self._indice = self._ler_indice()
+            self._mtime_indice = mtime_indice
+
+    def _atualizar_mapa(self, tamanho_minimo):
+        """(Re)mapeia o arquivo de dados do índice se ele for outro ou tiver crescido além do mapa atual."""
+        nome_arquivo = self._indice["arquivo"]
+        if self._mapa and self._mapa[0] == nome_arquivo and len(self._mapa[1]) >= tamanho_minimo:
+            return
+        # O mapa anterior não é fechado explicitamente: imagens ainda em exibição podem apontar para ele
+        with open(os.path.join(self.pasta, nome_arquivo), 'rb') as f:
+            self._mapa = (nome_arquivo, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def obter(self, caminho_imagem):
+        """
+        Retorna a imagem PIL (somente leitura) montada sobre o pacote mapeado, ou None se ela não estiver no pacote.
+        Os pixels não são copiados: a imagem mantém o mapeamento vivo enquanto existir.
+        """
+        try:
+            identidade = _identidade(caminho_imagem)
+        except OSError:
+            return None
+        with self._lock:
+            try:
+                self._atualizar_indice()
+                entrada = self._indice["entradas"].get(identidade) if self._indice else None
+                if entrada:
+                    offset, largura, altura, modo = entrada
+                    tamanho = largura * altura * 4
+                    self._atualizar_mapa(offset + tamanho)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Não foi possível mapear o pacote de pixels {self.largura}x{self.altura}: {e}")
+                entrada = None
+            if not entrada or not self._mapa or len(self._mapa[1]) < offset + tamanho:
+                self.faltas += 1
+                return None
+            self.acertos += 1
+            trecho = memoryview(self._mapa[1])[offset:offset + tamanho]
+        with metricas.medir("leitura_pacote_pixels"):
+            return Image.frombuffer(modo, (largura, altura), trecho, "raw", modo, 0, 1)
+
+    # --- Gravação (sincronização) ---
+    def atualizar(self, caminhos_imagens, cache_redimensionado=None, limite_bytes=None):
+        """
+        Acrescenta ao pacote as imagens de caminhos_imagens que ainda não estão nele (partindo das versões
+        redimensionadas em disco, quando existirem) e esquece as que saíram. Regrava o pacote em uma nova
+        geração quando a parte obsoleta passa de FRACAO_OBSOLETA_COMPACTACAO. Retorna o número de imagens acrescentadas.
+        """
+        os.makedirs(self.pasta, exist_ok=True)
+        indice = self._ler_indice()
+        entradas_antigas = indice["entradas"]
+        identidades = {}
+        for caminho_imagem in caminhos_imagens:
+            try:
+                identidades[_identidade(caminho_imagem)] = caminho_imagem
+            except OSError:
+                continue
+        mantidas = {identidade: entrada for identidade, entrada in entradas_antigas.items() if identidade in identidades}
+        arquivo_atual = os.path.join(self.pasta, indice["arquivo"]) if indice.get("arquivo") else None
+        try:
+            tamanho_atual = os.path.getsize(arquivo_atual) if arquivo_atual else 0
+        except OSError:
+            tamanho_atual, mantidas = 0, {}
+        bytes_mantidos = sum(_tamanho_alinhado(entrada[1] * entrada[2] * 4) for entrada in mantidas.values())
+        compactar = tamanho_atual and (tamanho_atual - bytes_mantidos) > tamanho_atual * FRACAO_OBSOLETA_COMPACTACAO
+
+        if compactar or not arquivo_atual:
+            indice["geracao"] += 1
+            indice["arquivo"] = f"{self.largura}x{self.altura}.{indice['geracao']}.pack"
+        arquivo_destino = os.path.join(self.pasta, indice["arquivo"])
+        novas_entradas = {}
+        acrescentadas = 0
+        with open(arquivo_destino, 'ab' if arquivo_destino == arquivo_atual else 'wb') as destino:
+            posicao = destino.seek(0, os.SEEK_END)
+            if arquivo_destino != arquivo_atual and mantidas:
+                # Nova geração: copia as imagens que continuam no cache, sem decodificá-las de novo
+                with open(arquivo_atual, 'rb') as origem:
+                    for identidade, (offset, largura, altura, modo) in mantidas.items():
+                        origem.seek(offset)
+                        novas_entradas[identidade] = [posicao, largura, altura, modo]
+                        posicao = _escrever_alinhado(destino, posicao, origem.read(largura * altura * 4))
+            else:
+                novas_entradas.update(mantidas)
+            for identidade, caminho_imagem in identidades.items():
+                if identidade in novas_entradas:
+                    continue
+                if limite_bytes and posicao >= limite_bytes:
+                    logger.info(f"Pacote de pixels {self.largura}x{self.altura} atingiu o limite; as demais imagens usam o caminho normal.")
+                    break
+                try:
+                    img_pil = carregador_imagens.preparar_imagem(caminho_imagem, self.largura, self.altura, cache_redimensionado)
+                    modo = _modo_pacote(img_pil)
+                    pixels = img_pil.convert(modo).tobytes("raw", modo)
+                except Exception as e:
+                    logger.debug("Imagem '%s' não incluída no pacote de pixels: %s", caminho_imagem, e)
+                    continue
+                inicio = posicao
+                posicao = _escrever_alinhado(destino, posicao, pixels)
+                novas_entradas[identidade] = [inicio, img_pil.size[0], img_pil.size[1], modo]
+                acrescentadas += 1
+            destino.flush()
+            os.fsync(destino.fileno()) # Os dados precisam estar no disco antes do índice que aponta para eles
+
+        indice["entradas"] = novas_entradas
+        self._gravar_indice(indice)
+        self._remover_geracoes_antigas(indice["arquivo"])
+        if acrescentadas or len(novas_entradas) != len(entradas_antigas):
+            logger.info(
+                f"Pacote de pixels {self.largura}x{self.altura}: {len(novas_entradas)} imagens "
+                f"({acrescentadas} acrescentadas{', compactado' if compactar else ''}), {posicao} bytes."
+            )
+        return acrescentadas
+
+    def _remover_geracoes_antigas(self, arquivo_atual):
+        for caminho_pacote in glob.glob(os.path.join(self.pasta, f"{self.largura}x{self.altura}.*.pack")):
+            if os.path.basename(caminho_pacote) == arquivo_atual:
+                continue
+            try:
+                os.remove(caminho_pacote)
+            except OSError:
+                pass # Ainda mapeado por outra instância (Windows): tentado de novo na próxima atualização
+
+    def resumo(self):
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                "acertos": self.acertos, "faltas": self.faltas,
+                "taxa_acertos": round(self.acertos / consultas, 3) if consultas else None,
+            }
+
+
+def _tamanho_alinhado(num_bytes):
+    return -(-num_bytes // ALINHAMENTO_BYTES) * ALINHAMENTO_BYTES
+
+def _escrever_alinhado(destino, posicao, dados):
+    """Grava os dados na posição (já alinhada) e completa até a próxima página. Retorna a nova posição."""
+    destino.write(dados)
+    preenchimento = _tamanho_alinhado(len(dados)) - len(dados)
+    if preenchimento:
+        destino.write(b"\0" * preenchimento)
+    return posicao + len(dados) + preenchimento
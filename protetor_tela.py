@@ -1,62 +1,356 @@
 # protetor_tela.py
-import tkinter as tk
-from PIL import Image, ImageTk # pip install Pillow
+import time
+INSTANTE_INICIO = time.perf_counter() # Referência para medir as importações e o tempo até a primeira imagem
 import os
 import sys
-import random
-import time
+import json
+import functools
 import logging
 import ctypes # Para obter dimensões da tela e interagir com o preview do Windows
-import shutil # Para cópia de arquivos (cache)
+import threading # Para a sincronização em segundo plano
+import queue
+import atexit
+import logging.handlers
 
 # Importar nosso módulo de configuração
 import configuracao
+import cache_redimensionado
+import copiador
+import manifesto
+import armazem_cache
+import quarentena
+import monitor_pasta
+import acesso_rede
+import trava_cache
+import origem_http
+import lista_reproducao
+import metricas
+
+# tkinter e Pillow (e os módulos que dependem deles) só são importados nos modos que abrem janela (/s e /p),
+# em importar_modulos_graficos(); o modo /c e as ferramentas auxiliares não pagam esse custo
+tk = None
+ImageTk = None
+carregador_imagens = None
+animacao_gif = None
+transicao = None
+pacote_pixels = None
 
 # Configuração básica de logging
 # É importante que o nome do arquivo de log seja único ou gerenciado para não crescer indefinidamente
 # ou ter problemas de concorrência se várias instâncias rodarem (ex: preview e config ao mesmo tempo).
 # Usar um nome de arquivo com PID pode ser uma opção para depuração, mas um fixo é mais comum.
 log_file_path = os.path.join(os.getenv('TEMP', '.'), 'protetor_tela_uni_cache.log')
+TAMANHO_MAXIMO_LOG_BYTES = 2 * 1024 * 1024 # Ao atingir o tamanho, o log é rotacionado (.log.1, .log.2, ...)
+ARQUIVOS_LOG_MANTIDOS = 3 # Quantos arquivos rotacionados são mantidos além do atual
+TAMANHO_FILA_LOG = 10000 # Registros aguardando gravação; acima disso, novos registros são descartados
+
+class ManipuladorFilaLog(logging.handlers.QueueHandler):
+    """
+    Entrega os registros de log a uma fila em memória, gravada por uma thread própria (QueueListener).
+    Quem registra o log (thread do Tkinter, sincronização, cópia) nunca espera pelo disco:
+    a formatação e a escrita ocorrem na thread de gravação e, com a fila cheia, o registro é descartado.
+    """
+
+    def __init__(self, fila):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def prepare(self, record):
+        return record # Mesma memória do processo: a formatação fica para a thread de gravação
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+FILA_LOG = queue.Queue(maxsize=TAMANHO_FILA_LOG)
+manipuladores_log = [logging.StreamHandler(sys.stdout)] # Para ver logs no console durante o desenvolvimento
+try:
+    manipuladores_log.insert(0, logging.handlers.RotatingFileHandler(
+        log_file_path, mode='a', maxBytes=TAMANHO_MAXIMO_LOG_BYTES, backupCount=ARQUIVOS_LOG_MANTIDOS,
+        encoding='utf-8', delay=True # O arquivo só é aberto (na thread de gravação) no primeiro registro
+    ))
+except OSError as e_log:
+    print(f"Não foi possível preparar o arquivo de log '{log_file_path}': {e_log}", file=sys.stderr)
+for manipulador_log in manipuladores_log:
+    manipulador_log.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(name)s - %(module)s - %(funcName)s - %(message)s'))
+MANIPULADOR_FILA_LOG = ManipuladorFilaLog(FILA_LOG)
 logging.basicConfig(
     level=logging.INFO, # Mude para DEBUG para mais detalhes durante o desenvolvimento
-    format='%(asctime)s - %(levelname)s - %(name)s - %(module)s - %(funcName)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file_path, mode='a', encoding='utf-8'), # 'a' para append
-        logging.StreamHandler(sys.stdout) # Para ver logs no console durante o desenvolvimento
-    ]
+    handlers=[MANIPULADOR_FILA_LOG]
 )
+GRAVADOR_LOG = logging.handlers.QueueListener(FILA_LOG, *manipuladores_log, respect_handler_level=True)
+GRAVADOR_LOG.start()
+atexit.register(GRAVADOR_LOG.stop) # Grava os registros pendentes ao encerrar (inclusive via sys.exit)
 logger = logging.getLogger("ProtetorTelaPrincipal") # Usar um nome específico para o logger principal
+metricas.registrar_tempo("importacao_principal", (time.perf_counter() - INSTANTE_INICIO) * 1000)
 
 # --- Constantes e Configurações Globais ---
 CONFIG = None
 IMAGENS_DISPONIVEIS = [] # Lista de caminhos completos para as imagens a serem exibidas
-INDICE_IMAGEM_ATUAL = 0
+LISTA_REPRODUCAO = None # Ordem de exibição (sacola embaralhada) persistida entre ativações
 JANELA_PRINCIPAL = None
 LABEL_IMAGEM = None
 HANDLE_JANELA_PREVIEW = None
 PROGRAM_NAME = "ProtetorTelaUniversidadeCache"
 MODO_APENAS_TELA_PRETA = False # Flag para indicar que apenas tela preta deve ser mostrada
+ARMAZEM = None # Cache local endereçado por conteúdo, compartilhado entre a apresentação e a sincronização
+QUARENTENA = None # Arquivos de imagem ruins (corrompidos ou acima dos limites), ignorados até mudarem
+ORIGEM_HTTP = None # Origem HTTP(S) das imagens, mantida entre sincronizações para reaproveitar as conexões
+CACHE_REDIMENSIONADO = None # Versões das imagens já redimensionadas para a resolução da tela, persistidas em disco
+PREFETCHER = None # Prepara (decodifica e redimensiona) as próximas imagens em threads de trabalho
+PACOTE_PIXELS = None # Pixels prontos para exibição na resolução da tela, mapeados em memória (opcional, 'usar_pacote_pixels')
+INTERVALO_ESPERA_PREFETCH_MS = 30 # Intervalo para verificar novamente se a imagem já foi preparada
+ANIMACAO_ATUAL = None # GIF animado em reprodução (quadros decodificados sob demanda)
+ID_AGENDAMENTO_ANIMACAO = None
+FILA_RESULTADO_SINCRONIZACAO = queue.Queue() # Lista de imagens produzida pela sincronização em segundo plano
+INTERVALO_VERIFICACAO_SINCRONIZACAO_MS = 500
+THREAD_SINCRONIZACAO = None
+PARAR_RESSINCRONIZACAO = threading.Event() # Encerra o monitoramento da pasta de rede ao fechar o protetor
+PRIMEIRA_IMAGEM_EXIBIDA = False
+IMAGEM_EXIBIDA_PIL = None # Imagem (já redimensionada) em exibição, ponto de partida do crossfade
+TRANSICAO_ATUAL = None # Crossfade em andamento (quadros misturados em uma thread de trabalho)
+DESTINO_TRANSICAO = None # (caminho_imagem, largura, altura) da imagem que o crossfade em andamento revela
+ID_AGENDAMENTO_TRANSICAO = None
+TRANSICOES_RUINS_SEGUIDAS = 0 # Transições em que mais da metade dos quadros se perdeu
+MAX_TRANSICOES_RUINS_SEGUIDAS = 3 # A partir daqui o crossfade é desativado (corte seco) até o fim da sessão
+TRANSICAO_DESATIVADA = False
+ESTATISTICAS_TRANSICAO = {"transicoes": 0, "quadros_exibidos": 0, "quadros_perdidos": 0, "interrompidas": 0}
+MODO_PREVIEW = False # /p: sem sincronização com a rede, exibindo apenas miniaturas persistidas
+LIMITE_MEMORIA_PREVIEW_BYTES = 4 * 1024 * 1024 # Miniaturas prontas mantidas em memória no preview
+EXIBIR_RELATORIO_TEMPOS = False # Argumento /tempos: imprime o relatório de inicialização em JSON (e, em /c, não abre o diálogo)
+NOME_ARQUIVO_METRICAS = "metricas.json" # Gravado na pasta de estado local (%LOCALAPPDATA%\ProtetorTelaUniversidade)
+CAMINHO_ARQUIVO_METRICAS = None
+GRAVADOR_METRICAS = None # Gravação periódica das métricas (opcional, 'intervalo_metricas_segundos')
+
+# --- Inicialização ---
+def importar_modulos_graficos():
+    """Importa tkinter e Pillow (e os módulos de exibição que dependem deles) sob demanda."""
+    global tk, ImageTk, carregador_imagens, animacao_gif, transicao, pacote_pixels
+    if tk is not None:
+        return
+    with metricas.medir("importacao_modulos_graficos"):
+        import tkinter as tk
+        from PIL import ImageTk # pip install Pillow
+        import carregador_imagens
+        import animacao_gif
+        import transicao
+        import pacote_pixels
+
+def relatorio_tempos_inicializacao(modo):
+    """
+    Registra no log (e, com /tempos, imprime em JSON) quanto tempo o modo levou para ficar pronto,
+    separando as importações das demais fases medidas até aqui.
+    """
+    relatorio = {
+        "modo": modo,
+        "pronto_ms": round((time.perf_counter() - INSTANTE_INICIO) * 1000, 1),
+        "fases_ms": {nome: registro["total_ms"] for nome, registro in metricas.resumo()["temporizadores"].items()},
+        "modulos_graficos_importados": tk is not None,
+    }
+    logger.info(f"Tempos de inicialização: {relatorio}")
+    if EXIBIR_RELATORIO_TEMPOS and sys.stdout:
+        print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    return relatorio
 
 # --- Funções de Cache e Carregamento de Imagens ---
-def sincronizar_cache_e_carregar_imagens():
+def obter_armazem(config):
+    """Retorna o armazém do cache em uso pela apresentação ou cria um para a pasta de cache da configuração."""
+    if ARMAZEM:
+        return ARMAZEM
+    limite_mb = config.get("limite_cache_mb", 0)
+    return armazem_cache.ArmazemCache(
+        config["pasta_cache_local_completa"],
+        limite_bytes=int(limite_mb * 1024 * 1024) if limite_mb else None,
+        ao_remover_objeto=CACHE_REDIMENSIONADO.remover_versoes if CACHE_REDIMENSIONADO else None
+    )
+
+def obter_quarentena(config):
+    """Retorna a quarentena em uso pela apresentação ou carrega a da pasta de cache da configuração."""
+    if QUARENTENA:
+        return QUARENTENA
+    return quarentena.Quarentena(config["pasta_cache_local_completa"])
+
+def obter_lista_reproducao(pasta_estado=None):
     """
-    Tenta sincronizar imagens da rede para o cache local.
-    Carrega a lista de imagens da rede (se disponível) ou do cache.
-    Define MODO_APENAS_TELA_PRETA se nenhuma imagem for encontrada.
-    Retorna True se imagens foram carregadas, False caso contrário.
+    Retorna a lista de reprodução em uso, carregando-a sob demanda da pasta de estado local
+    (ou de pasta_estado; ex: benchmark) quando nenhuma apresentação a criou ainda.
     """
-    global IMAGENS_DISPONIVEIS, MODO_APENAS_TELA_PRETA, CONFIG
-    IMAGENS_DISPONIVEIS = []
-    MODO_APENAS_TELA_PRETA = False # Reseta o estado
+    global LISTA_REPRODUCAO
+    if LISTA_REPRODUCAO is None:
+        LISTA_REPRODUCAO = lista_reproducao.ListaReproducao(
+            os.path.join(pasta_estado or configuracao.obter_pasta_estado_local(), lista_reproducao.NOME_ARQUIVO_LISTA)
+        )
+    return LISTA_REPRODUCAO
 
-    if not CONFIG:
-        logger.error("Configuração não disponível. Impossível sincronizar cache ou carregar imagens.")
-        MODO_APENAS_TELA_PRETA = True
-        return False
+def configurar_limites_imagem(config):
+    """Aplica os limites de pixels e de tamanho de arquivo da configuração ao carregador de imagens."""
+    importar_modulos_graficos()
+    limite_mb = config.get("limite_tamanho_arquivo_mb")
+    carregador_imagens.configurar_limites(
+        limite_pixels=config.get("limite_pixels_imagem"),
+        limite_bytes_arquivo=int(limite_mb * 1024 * 1024) if limite_mb else None
+    )
+
+def listar_imagens_cache(config):
+    """
+    Lista as imagens já presentes no cache local, sem acessar a rede.
+    Retorna a lista (embaralhada) de caminhos completos; vazia se o cache não existir ou estiver vazio.
+    """
+    pasta_cache = config["pasta_cache_local_completa"]
+    extensoes = config.get("extensoes_permitidas", [".jpg", ".jpeg", ".png", ".gif", ".bmp"])
+    imagens = []
+    if not os.path.isdir(pasta_cache):
+        return imagens
+    try:
+        with metricas.medir("varredura_cache"):
+            imagens = obter_armazem(config).listar_caminhos()
+            # Imagens ainda no formato antigo (raiz do cache), até serem migradas pela próxima sincronização
+            for nome_arquivo in os.listdir(pasta_cache):
+                if any(nome_arquivo.lower().endswith(ext) for ext in extensoes):
+                    caminho_completo = os.path.join(pasta_cache, nome_arquivo)
+                    if os.path.isfile(caminho_completo):
+                        imagens.append(caminho_completo)
+            quarentena_imagens = obter_quarentena(config)
+            if len(quarentena_imagens):
+                imagens = [caminho for caminho in imagens if not quarentena_imagens.contem_caminho(caminho)]
+        if imagens:
+            logger.info(f"Carregadas {len(imagens)} imagens do cache.")
+        else:
+            logger.warning(f"Nenhuma imagem encontrada no cache: '{pasta_cache}'.")
+    except Exception as e:
+        logger.error(f"Erro ao listar imagens do cache '{pasta_cache}': {e}")
+        imagens = [] # Garante que está vazia se houver erro
+    return imagens
 
-    pasta_rede = CONFIG["pasta_imagens_rede"]
-    pasta_cache = CONFIG["pasta_cache_local_completa"]
-    extensoes = CONFIG.get("extensoes_permitidas", [".jpg", ".jpeg", ".png", ".gif", ".bmp"])
+def listar_pasta_rede(config, nomes_cache, alteracoes=None):
+    """
+    Lista a pasta de rede (ou lê o manifesto) e compara com o índice de nomes do cache.
+    Com alteracoes (listagem, nomes alterados) do monitor da pasta, usa essa listagem sem acessar a rede
+    e só planeja a cópia dos nomes alterados (e dos que ainda faltam ou estão desatualizados no índice).
+    Retorna ({nome: caminho na rede}, {nome: registro}, [nomes a copiar]). Chamada com prazo (acesso_rede).
+    """
+    pasta_rede = config["pasta_imagens_rede"]
+    extensoes = config.get("extensoes_permitidas", [".jpg", ".jpeg", ".png", ".gif", ".bmp"])
+    arquivos_rede = {} # {nome_arquivo: caminho_completo}
+    registros = {} # {nome_arquivo: {tamanho, mtime[, hash]}}
+    nomes_copiar = []
+    if alteracoes is not None:
+        listagem, nomes_alterados = alteracoes
+        metricas.incrementar("listagem_incremental")
+        for nome_arquivo, (tamanho, mtime) in listagem.items():
+            arquivos_rede[nome_arquivo] = os.path.join(pasta_rede, nome_arquivo)
+            registros[nome_arquivo] = {"tamanho": tamanho, "mtime": mtime}
+            registro_cache = nomes_cache.get(nome_arquivo)
+            # O índice é consultado em memória: cópias que falharam antes são refeitas sem acessar a rede
+            if nome_arquivo in nomes_alterados or not registro_cache or registro_cache.get("mtime") != mtime:
+                nomes_copiar.append(nome_arquivo)
+        logger.info(
+            f"Listagem incremental: {len(arquivos_rede)} arquivos de imagem na rede, "
+            f"{len(nomes_alterados)} alterados, {len(nomes_copiar)} a copiar."
+        )
+        return arquivos_rede, registros, nomes_copiar
+
+    # Com manifesto: uma única leitura pela rede substitui listdir/isfile/getmtime por arquivo
+    manifesto_rede = manifesto.carregar_manifesto(pasta_rede) if config.get("usar_manifesto", True) else None
+    if manifesto_rede is not None:
+        metricas.incrementar("listagem_por_manifesto")
+        registros, nomes_copiar = manifesto.planejar_sincronizacao(manifesto_rede, nomes_cache, extensoes)
+        arquivos_rede = {nome: os.path.join(pasta_rede, nome) for nome in registros}
+        logger.info(f"Manifesto encontrado: {len(arquivos_rede)} arquivos de imagem na rede, {len(nomes_copiar)} a copiar.")
+        return arquivos_rede, registros, nomes_copiar
+
+    # Listar arquivos da rede
+    for nome_arquivo in os.listdir(pasta_rede):
+        if any(nome_arquivo.lower().endswith(ext) for ext in extensoes):
+            caminho_origem = os.path.join(pasta_rede, nome_arquivo)
+            if os.path.isfile(caminho_origem):
+                arquivos_rede[nome_arquivo] = caminho_origem
+
+    logger.info(f"Encontrados {len(arquivos_rede)} arquivos de imagem na rede.")
+
+    # Sincronizar: copiar da rede para o cache se necessário
+    for nome_arquivo, caminho_origem in arquivos_rede.items():
+        registro_cache = nomes_cache.get(nome_arquivo)
+        try:
+            mtime_origem = os.path.getmtime(caminho_origem)
+        except OSError as e_mtime:
+            logger.warning(f"Não foi possível verificar data de modificação para '{nome_arquivo}': {e_mtime}. Copiando por segurança.")
+            mtime_origem = None
+        registros[nome_arquivo] = {"mtime": mtime_origem}
+        if not registro_cache:
+            logger.debug("Arquivo '%s' não está no cache. Copiando.", nome_arquivo)
+            nomes_copiar.append(nome_arquivo)
+        elif mtime_origem is None or registro_cache.get("mtime") != mtime_origem:
+            # Compara data de modificação registrada para decidir se atualiza o cache
+            logger.debug("Arquivo '%s' na rede foi alterado. Atualizando cache.", nome_arquivo)
+            nomes_copiar.append(nome_arquivo)
+    return arquivos_rede, registros, nomes_copiar
+
+def obter_origem_http(config):
+    """Retorna a origem HTTP(S) da pasta de imagens configurada, criando-a na primeira sincronização."""
+    global ORIGEM_HTTP
+    url_base = config["pasta_imagens_rede"]
+    pasta_cache = config["pasta_cache_local_completa"]
+    if ORIGEM_HTTP is None or ORIGEM_HTTP.url_base != url_base.rstrip("/") + "/" or ORIGEM_HTTP.pasta_parciais != os.path.join(pasta_cache, origem_http.SUBPASTA_PARCIAIS):
+        if ORIGEM_HTTP:
+            ORIGEM_HTTP.fechar()
+        ORIGEM_HTTP = origem_http.OrigemHttp(url_base, pasta_cache, url_listagem=config.get("url_listagem_imagens"))
+    return ORIGEM_HTTP
+
+def listar_origem_http(config, nomes_cache):
+    """
+    Equivalente a listar_pasta_rede para uma pasta de imagens servida por HTTP(S): a listagem é o manifesto
+    publicado pelo servidor, buscado de forma condicional. Chamada com prazo (acesso_rede).
+    """
+    extensoes = config.get("extensoes_permitidas", [".jpg", ".jpeg", ".png", ".gif", ".bmp"])
+    origem = obter_origem_http(config)
+    manifesto_rede = origem.obter_listagem()
+    metricas.incrementar("listagem_http")
+    registros, nomes_copiar = manifesto.planejar_sincronizacao(manifesto_rede, nomes_cache, extensoes)
+    arquivos_rede = {nome: origem.url_arquivo(nome) for nome in registros}
+    logger.info(f"Listagem HTTP: {len(arquivos_rede)} arquivos de imagem na origem, {len(nomes_copiar)} a verificar/baixar.")
+    return arquivos_rede, registros, nomes_copiar
+
+def sincronizar_cache(config, prazo_espera_outra_instancia_s=None, alteracoes=None):
+    """
+    Sincroniza o cache com a rede se esta instância obtiver a trava da pasta de cache; se outra instância
+    (ex: /p e /s juntos, ou outro usuário com o cache da máquina) já estiver sincronizando, aguarda até
+    prazo_espera_outra_instancia_s pelo resultado dela e usa o índice gravado, sem acessar a rede.
+    Retorna a lista de caminhos das imagens (a ordem de exibição é da LISTA_REPRODUCAO); vazia se nenhuma imagem for encontrada.
+    """
+    pasta_cache = config["pasta_cache_local_completa"]
+    configuracao.preparar_pasta_cache(config) # Falhas são registradas; sincronizar_cache_exclusivo segue com a rede
+    trava = trava_cache.TravaSincronizacao(pasta_cache)
+    if not trava.tentar_adquirir():
+        if prazo_espera_outra_instancia_s is None:
+            prazo_espera_outra_instancia_s = config.get("prazo_espera_sincronizacao_segundos", 120)
+        logger.info(f"Outra instância ({trava.descricao_dono()}) está sincronizando o cache. Aguardando o resultado.")
+        metricas.incrementar("sincronizacao_por_outra_instancia")
+        if not trava.aguardar_liberacao(prazo_espera_outra_instancia_s):
+            logger.warning("A sincronização da outra instância não terminou no prazo. Usando o cache como está.")
+        obter_armazem(config).recarregar_indice()
+        return listar_imagens_cache(config)
+    try:
+        obter_armazem(config).recarregar_indice() # Incorpora o que outras instâncias gravaram desde o carregamento
+        return sincronizar_cache_exclusivo(config, alteracoes)
+    finally:
+        trava.liberar()
+
+def sincronizar_cache_exclusivo(config, alteracoes=None):
+    """
+    Tenta sincronizar imagens da rede para o cache local e monta a lista de imagens
+    do cache (complementada pela rede, se disponível). Não altera o estado global, podendo rodar em outra thread.
+    alteracoes: (listagem, nomes alterados) do monitor da pasta, para a ressincronização incremental.
+    Deve ser chamada com a trava da pasta de cache (ver sincronizar_cache).
+    Retorna a lista de caminhos das imagens (a ordem de exibição é da LISTA_REPRODUCAO); vazia se nenhuma imagem for encontrada.
+    """
+    pasta_rede = config["pasta_imagens_rede"]
+    pasta_cache = config["pasta_cache_local_completa"]
+    extensoes = config.get("extensoes_permitidas", [".jpg", ".jpeg", ".png", ".gif", ".bmp"])
+    origem_e_http = origem_http.eh_url_http(pasta_rede)
+    imagens = []
 
     # 1. Garantir que a pasta de cache exista
     try:
@@ -66,90 +360,315 @@ def sincronizar_cache_e_carregar_imagens():
         logger.error(f"Não foi possível criar a pasta de cache '{pasta_cache}': {e}. Cache não será usado efetivamente.")
         # Se não puder criar o cache, o comportamento dependerá da disponibilidade da rede.
 
+    armazem = obter_armazem(config)
+    armazem.migrar_arquivos_soltos(extensoes)
+    armazem.limpar_entrada()
+    quarentena_imagens = obter_quarentena(config)
+    configurar_limites_imagem(config)
+    nomes_recusados = set() # Arquivos da rede em quarentena ou recusados pela validação do cabeçalho
+
     # 2. Tentar acessar a rede e sincronizar com o cache
     rede_acessivel = False
     arquivos_rede_dict = {} # {nome_arquivo: caminho_completo}
 
-    logger.info(f"Tentando acessar pasta de rede: '{pasta_rede}'")
-    if os.path.isdir(pasta_rede):
+    # A sondagem e a listagem rodam com prazo fora desta thread: um servidor UNC que não responde
+    # bloquearia por dezenas de segundos. Após uma falha, o disjuntor evita a rede durante a espera.
+    disjuntor = acesso_rede.DisjuntorRede(
+        pasta_cache, pasta_rede,
+        espera_inicial_s=config.get("espera_disjuntor_rede_segundos", 300)
+    )
+    pasta_rede_acessivel = False
+    latencia_sondagem_ms = None
+    if not disjuntor.permite_tentativa():
+        logger.warning(
+            f"Pasta de rede '{pasta_rede}' falhou recentemente ({disjuntor.resumo()['motivo']}). "
+            f"Usando apenas o cache por mais {disjuntor.segundos_restantes():.0f} s."
+        )
+        metricas.incrementar("sondagem_rede_evitada")
+    elif origem_e_http:
+        # Em HTTP(S), a própria listagem (condicional e com prazo) faz o papel da sondagem
+        pasta_rede_acessivel = True
+    else:
+        logger.info(f"Tentando acessar pasta de rede: '{pasta_rede}'")
+        try:
+            with metricas.medir("sondagem_rede"):
+                pasta_rede_acessivel, latencia_sondagem_ms = acesso_rede.sondar_pasta(
+                    pasta_rede, config.get("prazo_sondagem_rede_segundos", 5)
+                )
+            logger.info(f"Sondagem da pasta de rede: {latencia_sondagem_ms:.0f} ms.")
+            if not pasta_rede_acessivel:
+                disjuntor.registrar_falha("pasta inacessível ou não é um diretório")
+        except OSError as e: # Inclui TimeoutError (prazo da sondagem vencido)
+            disjuntor.registrar_falha(e)
+    metricas.definir("disjuntor_rede", disjuntor.estado())
+
+    if pasta_rede_acessivel:
         rede_acessivel = True
         logger.info(f"Pasta de rede '{pasta_rede}' acessível.")
         try:
-            # Listar arquivos da rede
-            for nome_arquivo in os.listdir(pasta_rede):
-                if any(nome_arquivo.lower().endswith(ext) for ext in extensoes):
-                    caminho_origem = os.path.join(pasta_rede, nome_arquivo)
-                    if os.path.isfile(caminho_origem):
-                        arquivos_rede_dict[nome_arquivo] = caminho_origem
-            
-            logger.info(f"Encontrados {len(arquivos_rede_dict)} arquivos de imagem na rede.")
+            nomes_cache = armazem.nomes()
+            listar = listar_origem_http if origem_e_http else functools.partial(listar_pasta_rede, alteracoes=alteracoes)
+            inicio_listagem = time.perf_counter()
+            try:
+                arquivos_rede_dict, registros_rede, nomes_a_copiar = acesso_rede.executar_com_prazo(
+                    lambda: listar(config, nomes_cache), config.get("prazo_listagem_rede_segundos", 60), "listagem_rede"
+                )
+            except OSError as e: # Inclui TimeoutError
+                disjuntor.registrar_falha(e)
+                raise
+            duracao_listagem_ms = (time.perf_counter() - inicio_listagem) * 1000
+            metricas.registrar_tempo("listagem_rede", duracao_listagem_ms)
+            disjuntor.registrar_sucesso(latencia_sondagem_ms if latencia_sondagem_ms is not None else duracao_listagem_ms)
 
-            # Sincronizar: copiar da rede para o cache se necessário
-            arquivos_cache_existentes = {f for f in os.listdir(pasta_cache) if os.path.isfile(os.path.join(pasta_cache, f))}
-            
-            for nome_arquivo, caminho_origem in arquivos_rede_dict.items():
-                caminho_destino_cache = os.path.join(pasta_cache, nome_arquivo)
-                copiar = False
-                if nome_arquivo not in arquivos_cache_existentes:
-                    copiar = True
-                    logger.debug(f"Arquivo '{nome_arquivo}' não está no cache. Copiando.")
-                else:
-                    # Compara data de modificação para decidir se atualiza o cache
-                    try:
-                        if os.path.getmtime(caminho_origem) > os.path.getmtime(caminho_destino_cache):
-                            copiar = True
-                            logger.debug(f"Arquivo '{nome_arquivo}' na rede é mais novo. Atualizando cache.")
-                    except FileNotFoundError: # Arquivo no cache pode ter sido removido externamente
-                        copiar = True
-                        logger.debug(f"Arquivo '{nome_arquivo}' não encontrado no cache (FileNotFound). Copiando.")
-                    except OSError as e_mtime:
-                        logger.warning(f"Não foi possível verificar data de modificação para '{nome_arquivo}': {e_mtime}. Copiando por segurança.")
-                        copiar = True 
-                
-                if copiar:
-                    try:
-                        shutil.copy2(caminho_origem, caminho_destino_cache) # copy2 preserva metadados
-                        logger.info(f"Copiado/Atualizado '{nome_arquivo}' da rede para o cache.")
-                    except Exception as e_copy:
-                        logger.error(f"Erro ao copiar '{nome_arquivo}' da rede para o cache: {e_copy}")
-            
-            # Limpar cache: remover arquivos do cache que não existem mais na rede
-            arquivos_para_remover_do_cache = arquivos_cache_existentes - set(arquivos_rede_dict.keys())
-            for nome_arquivo_obsoleto in arquivos_para_remover_do_cache:
-                try:
-                    os.remove(os.path.join(pasta_cache, nome_arquivo_obsoleto))
-                    logger.info(f"Removido '{nome_arquivo_obsoleto}' do cache (não existe mais na rede).")
-                except Exception as e_remove:
-                    logger.error(f"Erro ao remover '{nome_arquivo_obsoleto}' do cache: {e_remove}")
+            # Limpar cache: remover do índice os nomes que não existem mais na rede
+            for nome_arquivo_obsoleto in set(nomes_cache) - set(arquivos_rede_dict):
+                armazem.remover_nome(nome_arquivo_obsoleto)
+                logger.info(f"Removido '{nome_arquivo_obsoleto}' do cache (não existe mais na rede).")
+            armazem.acrescentar_protegidos(obter_lista_reproducao().restantes_nomes()) # Remoção pelo limite só entre as já exibidas
+            armazem.coletar_orfaos()
+            armazem.aplicar_limite()
+
+            # Conteúdo já armazenado (mesmo hash com outro nome) não é copiado de novo;
+            # os demais só são copiados se couberem no limite do cache (removendo os exibidos há mais tempo).
+            tarefas_copia = [] # [(caminho_origem, caminho_entrada)]
+            registros_por_destino = {}
+            # Em HTTP, o espaço é reservado só quando um corpo (200) chega para as entradas sem tamanho no manifesto
+            # e para as já no cache, revalidadas com If-None-Match: um 304 não ocupa espaço nem remove outras (LRU)
+            nomes_reserva_ao_receber = set()
+            for nome_arquivo in nomes_a_copiar:
+                registro = registros_rede[nome_arquivo]
+                if registro.get("hash") and armazem.possui_objeto(registro["hash"]):
+                    armazem.associar_nome(nome_arquivo, registro)
+                    logger.debug("Arquivo '%s' já está no cache com outro nome. Nenhuma cópia necessária.", nome_arquivo)
+                    continue
+                caminho_origem = arquivos_rede_dict[nome_arquivo]
+                tamanho = registro.get("tamanho")
+                if origem_e_http and (tamanho is None or nome_arquivo in nomes_cache):
+                    tamanho = 0
+                    nomes_reserva_ao_receber.add(nome_arquivo)
+                elif tamanho is None:
+                    tamanho = os.path.getsize(caminho_origem)
+                    registro["tamanho"] = tamanho
+                # Arquivos ruins são recusados pelo cabeçalho antes de ocupar banda e espaço no cache
+                # (em HTTP, o cabeçalho só é conferido depois do download, em importar_copia_no_armazem)
+                identidade = quarentena_imagens.identidade(nome_arquivo, registro.get("mtime"))
+                if quarentena_imagens.contem(identidade):
+                    nomes_recusados.add(nome_arquivo)
+                    continue
+                motivo_recusa = None if origem_e_http else carregador_imagens.validar_cabecalho(caminho_origem, tamanho)
+                if motivo_recusa:
+                    quarentena_imagens.registrar(identidade, nome_arquivo, motivo_recusa)
+                    nomes_recusados.add(nome_arquivo)
+                    continue
+                if not armazem.reservar_espaco(tamanho):
+                    if origem_e_http:
+                        logger.warning(f"Sem espaço no limite do cache para '{nome_arquivo}'. Não será exibido (origem HTTP).")
+                    else:
+                        logger.warning(f"Sem espaço no limite do cache para '{nome_arquivo}'. Será exibido direto da rede.")
+                    continue
+                caminho_entrada = armazem.caminho_entrada(nome_arquivo)
+                registros_por_destino[caminho_entrada] = (nome_arquivo, registro)
+                tarefas_copia.append((caminho_origem, caminho_entrada))
+
+            nomes_importados = set()
+            def importar_copia_no_armazem(caminho_origem, caminho_destino):
+                nome_copiado, registro = registros_por_destino[caminho_destino]
+                if origem_e_http:
+                    motivo = carregador_imagens.validar_cabecalho(caminho_destino, os.path.getsize(caminho_destino))
+                    if motivo:
+                        os.remove(caminho_destino)
+                        identidade_copia = quarentena_imagens.identidade(nome_copiado, registro.get("mtime"))
+                        quarentena_imagens.registrar(identidade_copia, nome_copiado, motivo)
+                        nomes_recusados.add(nome_copiado)
+                        return
+                if nome_copiado in nomes_reserva_ao_receber:
+                    registro["tamanho"] = os.path.getsize(caminho_destino)
+                    if not armazem.reservar_espaco(registro["tamanho"]):
+                        os.remove(caminho_destino)
+                        logger.warning(f"Sem espaço no limite do cache para '{nome_copiado}'. Não será exibido (origem HTTP).")
+                        return
+                armazem.importar_arquivo(caminho_destino, nome_copiado, registro)
+                nomes_importados.add(nome_copiado)
+
+            def confirmar_inalterado_no_armazem(caminho_origem, caminho_destino):
+                nome_inalterado, registro = registros_por_destino[caminho_destino]
+                armazem.confirmar_nome(nome_inalterado, registro)
+                nomes_importados.add(nome_inalterado)
+
+            # Cópias em paralelo, atômicas (arquivo temporário + renomeação) e com limite de banda opcional
+            limite_kb_s = config.get("limite_banda_kb_por_segundo", 0)
+            limite_bytes_s = limite_kb_s * 1024 if limite_kb_s else None
+            if origem_e_http:
+                # Downloads condicionais (304 para o que não mudou) e retomáveis, em conexões persistentes
+                copiador_cache = origem_http.BaixadorHttp(
+                    obter_origem_http(config), nomes_em_cache=nomes_cache,
+                    num_downloads_simultaneos=config.get("downloads_simultaneos", 3),
+                    limite_bytes_por_segundo=limite_bytes_s
+                )
+            else:
+                copiador_cache = copiador.CopiadorArquivos(
+                    num_copias_simultaneas=config.get("copias_simultaneas", 4),
+                    limite_bytes_por_segundo=limite_bytes_s
+                )
+            estatisticas_copia = copiador_cache.copiar_lote(
+                tarefas_copia, ao_concluir=importar_copia_no_armazem, ao_inalterado=confirmar_inalterado_no_armazem
+            )
+            armazem.liberar_reservas()
+            if origem_e_http:
+                metricas.incrementar("downloads_inalterados", estatisticas_copia["inalterados"])
+                origem_atual = obter_origem_http(config)
+                origem_atual.limpar_parciais({nome for nome, _ in registros_por_destino.values()} - nomes_importados)
+                origem_atual.salvar_estado(nomes_existentes=set(arquivos_rede_dict))
+            logger.info(f"Estatísticas da cópia para o cache: {estatisticas_copia}")
+            if tarefas_copia:
+                metricas.registrar_tempo("copia_lote", estatisticas_copia["duracao_s"] * 1000)
+            metricas.incrementar("copia_arquivos", estatisticas_copia["arquivos"])
+            metricas.incrementar("copia_bytes", estatisticas_copia["bytes"])
+            metricas.incrementar("copia_falhas", estatisticas_copia["falhas"])
 
         except Exception as e:
             logger.error(f"Erro durante a listagem ou sincronização de arquivos da rede: {e}")
             rede_acessivel = False # Considera rede inacessível se houver erro na sincronização
-    else:
-        logger.warning(f"Pasta de rede '{pasta_rede}' não está acessível ou não é um diretório.")
+        finally:
+            armazem.salvar_indice()
 
     # 3. Carregar lista de imagens a serem exibidas
     if rede_acessivel:
-        logger.info("Usando imagens diretamente da pasta de rede.")
-        IMAGENS_DISPONIVEIS = list(arquivos_rede_dict.values())
+        # Cada conteúdo aparece uma única vez; o que não coube no cache é exibido direto da rede
+        imagens = []
+        caminhos_vistos = set()
+        identidades_atuais = set() # Para esquecer da quarentena arquivos que sumiram ou mudaram
+        for nome_arquivo, caminho_rede in arquivos_rede_dict.items():
+            identidade_rede = quarentena_imagens.identidade(nome_arquivo, registros_rede.get(nome_arquivo, {}).get("mtime"))
+            identidades_atuais.add(identidade_rede)
+            if nome_arquivo in nomes_recusados:
+                continue
+            caminho_imagem = armazem.caminho_por_nome(nome_arquivo)
+            if caminho_imagem:
+                try:
+                    identidade_imagem = quarentena_imagens.identidade_do_caminho(caminho_imagem)
+                except OSError:
+                    continue
+            elif origem_e_http:
+                continue # Uma URL não é exibida diretamente: só o que já está no cache
+            else:
+                caminho_imagem, identidade_imagem = caminho_rede, identidade_rede
+            identidades_atuais.add(identidade_imagem)
+            if caminho_imagem not in caminhos_vistos and not quarentena_imagens.contem(identidade_imagem):
+                caminhos_vistos.add(caminho_imagem)
+                imagens.append(caminho_imagem)
+        quarentena_imagens.limpar_obsoletos(identidades_atuais)
+        logger.info(
+            f"Usando imagens sincronizadas: {len(imagens)} imagens ({armazem.tamanho_total()} bytes no cache, "
+            f"{len(quarentena_imagens)} arquivos em quarentena)."
+        )
     elif os.path.isdir(pasta_cache): # Se rede não acessível, tentar usar o cache
         logger.info(f"Rede indisponível. Tentando usar imagens da pasta de cache '{pasta_cache}'.")
+        imagens = listar_imagens_cache(config)
+
+    # 4. Miniaturas para o preview (/p), que não sincroniza e não decodifica os originais em tamanho real
+    if imagens and config.get("gerar_miniaturas", True):
+        caminhos_cache = [caminho for caminho in imagens if caminho.startswith(armazem.pasta_objetos)]
+        ruins = gerar_miniaturas_cache(config, caminhos_cache, quarentena_imagens)
+        imagens = [caminho for caminho in imagens if caminho not in ruins]
+
+    # 5. Pacotes de pixels prontos para exibição, nas resoluções registradas pelas apresentações
+    if imagens and config.get("usar_pacote_pixels", False):
+        atualizar_pacotes_pixels(config, [caminho for caminho in imagens if caminho.startswith(armazem.pasta_objetos)])
+
+    # 6. Versões redimensionadas das próximas imagens da lista de reprodução, prontas para a próxima ativação
+    if imagens and config.get("usar_cache_redimensionado", True) and config.get("imagens_aquecidas", 5) > 0:
+        aquecer_proximas_imagens(config, imagens, quarentena_imagens)
+    quarentena_imagens.salvar()
+    return imagens
+
+def gerar_miniaturas_cache(config, caminhos_imagens, quarentena_imagens):
+    """
+    Gera as miniaturas que faltam para as imagens do cache local. Roda na thread de sincronização.
+    Imagens que não puderem ser decodificadas vão para a quarentena; retorna o conjunto desses caminhos.
+    """
+    importar_modulos_graficos()
+    cache_miniaturas = cache_redimensionado.CacheRedimensionado(config["pasta_cache_local_completa"])
+    ruins = set()
+    def ao_falhar(caminho_imagem, erro):
+        quarentena_imagens.registrar_caminho(caminho_imagem, erro)
+        ruins.add(caminho_imagem)
+    with metricas.medir("geracao_miniaturas"):
+        geradas = carregador_imagens.gerar_miniaturas(caminhos_imagens, cache_miniaturas, ao_falhar=ao_falhar)
+    if geradas:
+        metricas.incrementar("miniaturas_geradas", geradas)
+        logger.info(f"{geradas} miniaturas geradas para o preview.")
+    return ruins
+
+def atualizar_pacotes_pixels(config, caminhos_imagens):
+    """Atualiza (de forma incremental) o pacote de pixels de cada resolução registrada. Roda na thread de sincronização."""
+    importar_modulos_graficos()
+    pasta_cache = config["pasta_cache_local_completa"]
+    limite_mb = config.get("limite_pacote_pixels_mb", 2048)
+    cache_versoes = cache_redimensionado.CacheRedimensionado(pasta_cache) if config.get("usar_cache_redimensionado", True) else None
+    for largura, altura in pacote_pixels.resolucoes_registradas(pasta_cache):
         try:
-            for nome_arquivo in os.listdir(pasta_cache):
-                if any(nome_arquivo.lower().endswith(ext) for ext in extensoes):
-                    caminho_completo = os.path.join(pasta_cache, nome_arquivo)
-                    if os.path.isfile(caminho_completo):
-                        IMAGENS_DISPONIVEIS.append(caminho_completo)
-            if IMAGENS_DISPONIVEIS:
-                 logger.info(f"Carregadas {len(IMAGENS_DISPONIVEIS)} imagens do cache.")
-            else:
-                logger.warning(f"Nenhuma imagem encontrada no cache: '{pasta_cache}'.")
-        except Exception as e:
-            logger.error(f"Erro ao listar imagens do cache '{pasta_cache}': {e}")
-            IMAGENS_DISPONIVEIS = [] # Garante que está vazia se houver erro
-    
+            with metricas.medir("atualizacao_pacote_pixels"):
+                acrescentadas = pacote_pixels.PacotePixels(pasta_cache, largura, altura).atualizar(
+                    caminhos_imagens, cache_versoes, limite_bytes=int(limite_mb * 1024 * 1024) if limite_mb else None
+                )
+            metricas.incrementar("pacote_pixels_acrescentadas", acrescentadas)
+        except OSError as e:
+            logger.warning(f"Não foi possível atualizar o pacote de pixels {largura}x{altura}: {e}")
+
+def aquecer_proximas_imagens(config, imagens, quarentena_imagens):
+    """
+    Decodifica e redimensiona, para o cache de versões redimensionadas, as próximas imagens da lista de reprodução
+    na resolução da última apresentação. Roda na thread de sincronização; a primeira troca da próxima ativação
+    (e as seguintes) apenas leem a versão pronta.
+    """
+    lista = obter_lista_reproducao()
+    if not lista.resolucao:
+        return # Nenhuma apresentação registrou a resolução da tela ainda
+    largura, altura = lista.resolucao
+    caminhos_por_nome = {os.path.basename(caminho): caminho for caminho in imagens}
+    proximas = [caminhos_por_nome[nome] for nome in lista.proximos_nomes(config.get("imagens_aquecidas", 5)) if nome in caminhos_por_nome]
+    importar_modulos_graficos()
+    cache_versoes = cache_redimensionado.CacheRedimensionado(config["pasta_cache_local_completa"])
+    aquecidas = 0
+    with metricas.medir("aquecimento_proximas_imagens"):
+        for caminho_imagem in proximas:
+            if cache_versoes.obter(caminho_imagem, largura, altura):
+                continue
+            try:
+                carregador_imagens.preparar_imagem(caminho_imagem, largura, altura, cache_redimensionado=cache_versoes)
+                aquecidas += 1
+            except FileNotFoundError:
+                continue # Removida durante a sincronização: sai da lista na próxima
+            except carregador_imagens.ERROS_DECODIFICACAO as e:
+                quarentena_imagens.registrar_caminho(caminho_imagem, e)
+            except OSError as e: # Falha de acesso (ex: antivírus, disco cheio): tentada de novo na próxima sincronização
+                logger.warning(f"Não foi possível aquecer '{caminho_imagem}': {e}")
+    if aquecidas:
+        metricas.incrementar("imagens_aquecidas", aquecidas)
+        logger.info(f"{aquecidas} das próximas imagens preparadas em {largura}x{altura} para a próxima ativação.")
+
+def sincronizar_cache_e_carregar_imagens():
+    """
+    Tenta sincronizar imagens da rede para o cache local.
+    Carrega a lista de imagens da rede (se disponível) ou do cache.
+    Define MODO_APENAS_TELA_PRETA se nenhuma imagem for encontrada.
+    Retorna True se imagens foram carregadas, False caso contrário.
+    """
+    global IMAGENS_DISPONIVEIS, MODO_APENAS_TELA_PRETA, CONFIG
+    IMAGENS_DISPONIVEIS = []
+    MODO_APENAS_TELA_PRETA = False # Reseta o estado
+
+    if not CONFIG:
+        logger.error("Configuração não disponível. Impossível sincronizar cache ou carregar imagens.")
+        MODO_APENAS_TELA_PRETA = True
+        return False
+
+    with metricas.medir("sincronizacao"):
+        # Sem janela aberta ainda: não espera por outra instância que esteja sincronizando (usa o cache como está)
+        IMAGENS_DISPONIVEIS = sincronizar_cache(CONFIG, prazo_espera_outra_instancia_s=0)
+    IMAGENS_DISPONIVEIS = obter_lista_reproducao().organizar(IMAGENS_DISPONIVEIS)
     if IMAGENS_DISPONIVEIS:
-        random.shuffle(IMAGENS_DISPONIVEIS)
         logger.info(f"Total de {len(IMAGENS_DISPONIVEIS)} imagens prontas para exibição.")
         return True
     else:
@@ -157,10 +676,198 @@ def sincronizar_cache_e_carregar_imagens():
         MODO_APENAS_TELA_PRETA = True
         return False
 
+def _sincronizar_e_entregar(config, nome_temporizador="sincronizacao", alteracoes=None):
+    """Executa a sincronização na thread atual (de trabalho) e entrega o resultado à thread do Tkinter."""
+    inicio = time.perf_counter()
+    try:
+        imagens = sincronizar_cache(config, alteracoes=alteracoes)
+    except Exception as e:
+        logger.error(f"Erro na sincronização em segundo plano: {e}", exc_info=True)
+        imagens = None
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    metricas.registrar_tempo(nome_temporizador, duracao_ms)
+    logger.info(f"Sincronização em segundo plano concluída em {duracao_ms:.0f} ms.")
+    FILA_RESULTADO_SINCRONIZACAO.put(imagens)
+
+def _verificar_pasta_rede(monitor, config):
+    """
+    Compara a assinatura da pasta de rede (com prazo) sem tocá-la enquanto o disjuntor estiver aberto.
+    Uma pasta que não responde no prazo abre o disjuntor, como na sondagem. Retorna True se a pasta mudou
+    (ou voltou a responder depois de uma falha).
+    """
+    disjuntor = acesso_rede.DisjuntorRede(
+        config["pasta_cache_local_completa"], config["pasta_imagens_rede"],
+        espera_inicial_s=config.get("espera_disjuntor_rede_segundos", 300)
+    )
+    if not disjuntor.permite_tentativa():
+        metricas.incrementar("verificacao_pasta_rede_evitada")
+        return False
+    try:
+        mudou = monitor.verificar_assinatura()
+    except OSError as e: # Inclui TimeoutError (prazo vencido)
+        disjuntor.registrar_falha(e)
+        return False
+    if disjuntor.estado() == "meio_aberto" and monitor.acessivel:
+        monitor.nomes_alterados = None # Sincronização completa: a anterior usou apenas o cache
+        return True # Voltou a responder após uma falha
+    return mudou
+
+def _executar_sincronizacao_em_segundo_plano(config, sincronizar_agora):
+    """
+    Thread de sincronização: sincroniza uma vez (se pedido) e, durante a sessão, ressincroniza
+    quando a pasta de rede muda. A mudança é detectada por notificação do sistema operacional
+    ou pela assinatura barata da pasta a cada 'intervalo_ressincronizacao_segundos' (0 = desativado).
+    Uma origem HTTP(S) é ressincronizada a cada intervalo: a listagem condicional custa um 304 se nada mudou.
+    """
+    intervalo_s = config.get("intervalo_ressincronizacao_segundos", 300)
+    if origem_http.eh_url_http(config["pasta_imagens_rede"]):
+        if sincronizar_agora:
+            _sincronizar_e_entregar(config)
+        while intervalo_s > 0 and not PARAR_RESSINCRONIZACAO.wait(intervalo_s):
+            metricas.incrementar("ressincronizacoes")
+            _sincronizar_e_entregar(config, "ressincronizacao")
+        return
+    if intervalo_s <= 0:
+        if sincronizar_agora:
+            _sincronizar_e_entregar(config)
+        return
+    # O monitor acessa a pasta com o prazo da listagem e respeitando o disjuntor. A assinatura inicial é
+    # registrada antes da primeira sincronização: o que mudar enquanto ela lista e copia aparece na primeira verificação
+    monitor = monitor_pasta.MonitorPasta(
+        config["pasta_imagens_rede"], usar_notificacoes=config.get("notificacoes_pasta_rede", True),
+        prazo_s=config.get("prazo_listagem_rede_segundos", 60),
+        extensoes=config.get("extensoes_permitidas", [".jpg", ".jpeg", ".png", ".gif", ".bmp"])
+    )
+    try:
+        _verificar_pasta_rede(monitor, config) # Assinatura inicial (uma falha abre o disjuntor: a sincronização usa o cache)
+        if sincronizar_agora:
+            _sincronizar_e_entregar(config)
+        while not PARAR_RESSINCRONIZACAO.is_set():
+            prazo = time.monotonic() + intervalo_s
+            notificado = False
+            while not notificado and not PARAR_RESSINCRONIZACAO.is_set():
+                restante_s = prazo - time.monotonic()
+                if restante_s <= 0:
+                    break
+                notificado = monitor.aguardar_mudanca(min(restante_s, 1.0)) # Fatias curtas para encerrar rapidamente
+            if PARAR_RESSINCRONIZACAO.is_set():
+                break
+            assinatura_mudou = _verificar_pasta_rede(monitor, config)
+            if not (notificado or assinatura_mudou):
+                continue
+            logger.info(f"Alteração detectada na pasta de rede ({'notificação' if notificado else 'assinatura da pasta'}). Ressincronizando.")
+            metricas.incrementar("ressincronizacoes")
+            _sincronizar_e_entregar(config, "ressincronizacao", alteracoes=monitor.alteracoes())
+    finally:
+        monitor.fechar()
+
+def iniciar_sincronizacao_em_segundo_plano(sincronizar_agora=True):
+    """Dispara a sincronização com a rede (e o monitoramento da pasta) sem bloquear a exibição das imagens."""
+    global THREAD_SINCRONIZACAO
+    THREAD_SINCRONIZACAO = threading.Thread(
+        target=_executar_sincronizacao_em_segundo_plano, args=(CONFIG, sincronizar_agora),
+        name="SincronizacaoCache", daemon=True
+    )
+    THREAD_SINCRONIZACAO.start()
+    JANELA_PRINCIPAL.after(INTERVALO_VERIFICACAO_SINCRONIZACAO_MS, verificar_resultado_sincronizacao)
+
+def verificar_resultado_sincronizacao():
+    """Roda na thread do Tkinter: aplica cada lista sincronizada quando ela estiver disponível."""
+    if not JANELA_PRINCIPAL:
+        return
+    try:
+        novas_imagens = FILA_RESULTADO_SINCRONIZACAO.get_nowait()
+    except queue.Empty:
+        if not THREAD_SINCRONIZACAO.is_alive() and FILA_RESULTADO_SINCRONIZACAO.empty():
+            return # Thread encerrada (sem monitoramento da pasta): não virão novas listas
+        novas_imagens = None
+    if novas_imagens is not None: # None: nada novo ou falha na sincronização (mantém a lista atual)
+        aplicar_nova_lista_imagens(novas_imagens)
+    JANELA_PRINCIPAL.after(INTERVALO_VERIFICACAO_SINCRONIZACAO_MS, verificar_resultado_sincronizacao)
+
+def aplicar_nova_lista_imagens(novas_imagens):
+    """
+    Troca a lista de imagens da apresentação em andamento sem reiniciá-la: a lista de reprodução mantém
+    a ordem e a posição das imagens que continuam disponíveis (identificadas pelo nome do arquivo),
+    retira as removidas e sorteia a posição das novas entre as que ainda não foram exibidas nesta rodada.
+    """
+    global IMAGENS_DISPONIVEIS, MODO_APENAS_TELA_PRETA
+
+    nomes_anteriores = {os.path.basename(caminho) for caminho in IMAGENS_DISPONIVEIS}
+    novos_nomes = {os.path.basename(caminho) for caminho in novas_imagens}
+    if set(novas_imagens) == set(IMAGENS_DISPONIVEIS):
+        logger.debug("Sincronização sem alterações na lista de imagens.")
+        return
+
+    # As próximas imagens já antecipadas mantêm o lugar; as novas entram depois delas
+    reservadas = PREFETCHER.num_antecipadas if PREFETCHER else 0
+    IMAGENS_DISPONIVEIS = LISTA_REPRODUCAO.organizar(novas_imagens, reservadas=reservadas)
+    LISTA_REPRODUCAO.salvar()
+    logger.info(
+        f"Lista de imagens atualizada: {len(IMAGENS_DISPONIVEIS)} imagens "
+        f"({len(novos_nomes - nomes_anteriores)} novas, {len(nomes_anteriores - novos_nomes)} removidas)."
+    )
+
+    estava_sem_imagens = MODO_APENAS_TELA_PRETA
+    MODO_APENAS_TELA_PRETA = not IMAGENS_DISPONIVEIS
+    if estava_sem_imagens and IMAGENS_DISPONIVEIS:
+        logger.info("Imagens disponíveis após a sincronização. Iniciando exibição.")
+        mostrar_proxima_imagem()
+    elif MODO_APENAS_TELA_PRETA:
+        mostrar_proxima_imagem() # Limpa a imagem atual e mantém a tela preta
+
 # --- Funções Auxiliares ---
+def gravar_metricas():
+    """Grava as métricas de fases (e os resumos dos caches) no arquivo JSON de métricas."""
+    if not CAMINHO_ARQUIVO_METRICAS or not metricas.ATIVO:
+        return
+    resumos = {}
+    if PREFETCHER:
+        resumos["prefetch"] = PREFETCHER.resumo_latencias()
+        if PREFETCHER.cache_memoria:
+            resumos["cache_memoria"] = PREFETCHER.cache_memoria.resumo()
+    if CACHE_REDIMENSIONADO:
+        resumos["cache_redimensionado"] = CACHE_REDIMENSIONADO.resumo()
+    if LISTA_REPRODUCAO:
+        resumos["lista_reproducao"] = LISTA_REPRODUCAO.resumo()
+    if PACOTE_PIXELS:
+        resumos["pacote_pixels"] = PACOTE_PIXELS.resumo()
+    if ESTATISTICAS_TRANSICAO["transicoes"]:
+        resumos["transicoes"] = dict(ESTATISTICAS_TRANSICAO, desativada=TRANSICAO_DESATIVADA)
+    metricas.definir("imagens_disponiveis", len(IMAGENS_DISPONIVEIS))
+    metricas.gravar_json(CAMINHO_ARQUIVO_METRICAS, {
+        "programa": PROGRAM_NAME,
+        "versao_config": CONFIG.get("versao_config") if CONFIG else None,
+        "resumos": resumos,
+    })
+
 def fechar_protetor(event=None):
     """Fecha a janela do protetor de tela."""
-    global JANELA_PRINCIPAL
+    global JANELA_PRINCIPAL, PREFETCHER
+    parar_transicao()
+    parar_animacao()
+    PARAR_RESSINCRONIZACAO.set()
+    if GRAVADOR_METRICAS:
+        GRAVADOR_METRICAS.parar()
+    gravar_metricas()
+    if ESTATISTICAS_TRANSICAO["transicoes"]:
+        logger.info(f"Estatísticas das transições suaves: {ESTATISTICAS_TRANSICAO} (desativadas: {TRANSICAO_DESATIVADA}).")
+    if MANIPULADOR_FILA_LOG.descartados:
+        logger.warning(f"{MANIPULADOR_FILA_LOG.descartados} registros de log descartados (fila de gravação cheia).")
+    if PREFETCHER:
+        logger.info(f"Estatísticas de decodificação em segundo plano: {PREFETCHER.resumo_latencias()}")
+        if PREFETCHER.cache_memoria:
+            logger.info(f"Estatísticas do cache de imagens em memória: {PREFETCHER.cache_memoria.resumo()}")
+        if CACHE_REDIMENSIONADO:
+            descricao_cache = "das miniaturas do preview" if MODO_PREVIEW else "de versões redimensionadas"
+            logger.info(f"Estatísticas do cache {descricao_cache}: {CACHE_REDIMENSIONADO.resumo()}")
+        if PACOTE_PIXELS:
+            logger.info(f"Estatísticas do pacote de pixels: {PACOTE_PIXELS.resumo()}")
+        PREFETCHER.encerrar()
+        PREFETCHER = None
+    if CONFIG and not MODO_PREVIEW: # O preview não escreve no cache nem avança a lista de reprodução
+        LISTA_REPRODUCAO.salvar()
+        salvar_estado_cache()
     if JANELA_PRINCIPAL:
         logger.info("Fechando protetor de tela.")
         JANELA_PRINCIPAL.quit()
@@ -168,9 +875,210 @@ def fechar_protetor(event=None):
         JANELA_PRINCIPAL = None
         sys.exit(0) # Encerra o script Python
 
+def salvar_estado_cache():
+    """
+    Grava o índice do cache (com os instantes de exibição usados na remoção LRU) e a quarentena,
+    apenas com a trava da pasta de cache: se outra instância estiver sincronizando, ela é a dona do índice.
+    """
+    trava = trava_cache.TravaSincronizacao(CONFIG["pasta_cache_local_completa"])
+    if not trava.tentar_adquirir():
+        logger.info(f"Índice do cache não gravado ao sair: outra instância ({trava.descricao_dono()}) está sincronizando.")
+        return
+    try:
+        if ARMAZEM:
+            ARMAZEM.recarregar_indice() # Mantém o que outras instâncias gravaram, com os instantes de exibição desta
+            ARMAZEM.salvar_indice()
+        if QUARENTENA:
+            QUARENTENA.salvar()
+    finally:
+        trava.liberar()
+
+def parar_animacao():
+    """Interrompe a animação em andamento (se houver) e libera seus quadros."""
+    global ANIMACAO_ATUAL, ID_AGENDAMENTO_ANIMACAO
+    if ID_AGENDAMENTO_ANIMACAO and JANELA_PRINCIPAL:
+        JANELA_PRINCIPAL.after_cancel(ID_AGENDAMENTO_ANIMACAO)
+    ID_AGENDAMENTO_ANIMACAO = None
+    if ANIMACAO_ATUAL:
+        ANIMACAO_ATUAL.encerrar()
+        ANIMACAO_ATUAL = None
+
+def iniciar_animacao(caminho_imagem, largura, altura):
+    """Inicia a reprodução de um GIF cujo primeiro quadro acabou de ser exibido."""
+    global ANIMACAO_ATUAL, ID_AGENDAMENTO_ANIMACAO
+    parar_animacao()
+    ANIMACAO_ATUAL = animacao_gif.AnimacaoGif(
+        caminho_imagem, largura, altura,
+        limite_bytes_quadros=CONFIG.get("limite_memoria_gif_mb", 64) * 1024 * 1024
+    )
+    ID_AGENDAMENTO_ANIMACAO = JANELA_PRINCIPAL.after(INTERVALO_ESPERA_PREFETCH_MS, verificar_abertura_animacao)
+
+def verificar_abertura_animacao():
+    """Aguarda (sem bloquear) a abertura do GIF e agenda o segundo quadro após a duração do primeiro."""
+    global ID_AGENDAMENTO_ANIMACAO
+    animacao = ANIMACAO_ATUAL
+    if animacao is None or not JANELA_PRINCIPAL:
+        return
+    if not animacao.futuro_abertura.done():
+        ID_AGENDAMENTO_ANIMACAO = JANELA_PRINCIPAL.after(INTERVALO_ESPERA_PREFETCH_MS, verificar_abertura_animacao)
+        return
+    try:
+        animacao.numero_quadros, duracao_primeiro_quadro = animacao.futuro_abertura.result()
+    except Exception as e:
+        logger.error(f"Erro ao abrir animação '{animacao.caminho_imagem}': {e}")
+        parar_animacao()
+        return
+    if animacao.numero_quadros <= 1: # GIF estático: nada a animar
+        parar_animacao()
+        return
+    logger.debug("Reproduzindo GIF animado '%s' (%d quadros).", os.path.basename(animacao.caminho_imagem), animacao.numero_quadros)
+    animacao.futuro_quadro(animacao.indice_proximo) # Prepara o segundo quadro durante a exibição do primeiro
+    ID_AGENDAMENTO_ANIMACAO = JANELA_PRINCIPAL.after(duracao_primeiro_quadro, avancar_quadro_animacao)
+
+def avancar_quadro_animacao():
+    """Exibe o próximo quadro da animação, se já estiver pronto, e agenda o seguinte conforme sua duração."""
+    global ID_AGENDAMENTO_ANIMACAO
+    animacao = ANIMACAO_ATUAL
+    if animacao is None or not JANELA_PRINCIPAL or not LABEL_IMAGEM:
+        return
+    futuro = animacao.futuro_quadro(animacao.indice_proximo)
+    if not futuro.done():
+        # Quadro atrasado: verifica de novo em breve, sem bloquear o loop de eventos
+        if not animacao.aguardando_quadro:
+            animacao.quadros_atrasados += 1
+            animacao.aguardando_quadro = True
+        ID_AGENDAMENTO_ANIMACAO = JANELA_PRINCIPAL.after(INTERVALO_ESPERA_PREFETCH_MS, avancar_quadro_animacao)
+        return
+    animacao.aguardando_quadro = False
+    try:
+        quadro, duracao_ms = futuro.result()
+    except Exception as e:
+        logger.error(f"Erro ao decodificar quadro {animacao.indice_proximo} de '{animacao.caminho_imagem}': {e}")
+        parar_animacao()
+        return
+
+    img_tk = ImageTk.PhotoImage(quadro)
+    LABEL_IMAGEM.configure(image=img_tk)
+    LABEL_IMAGEM.image = img_tk # Manter referência para evitar garbage collection
+
+    animacao.indice_proximo = (animacao.indice_proximo + 1) % animacao.numero_quadros
+    animacao.futuro_quadro(animacao.indice_proximo)
+    ID_AGENDAMENTO_ANIMACAO = JANELA_PRINCIPAL.after(duracao_ms, avancar_quadro_animacao)
+
+def transicao_suave_ativa():
+    return CONFIG.get("transicao_suave", False) and not MODO_PREVIEW and not TRANSICAO_DESATIVADA
+
+def periodo_quadro_transicao_s():
+    return 1.0 / max(1, CONFIG.get("quadros_por_segundo_transicao", 30))
+
+def exibir_imagem(img_pil, caminho_imagem, largura, altura):
+    """Troca a imagem do Label de uma vez (corte seco) e inicia a animação, se for um GIF."""
+    img_tk = ImageTk.PhotoImage(img_pil)
+    LABEL_IMAGEM.configure(image=img_tk, bg='black') # Garante bg preto caso a imagem tenha alfa
+    LABEL_IMAGEM.image = img_tk # Manter referência para evitar garbage collection
+    if caminho_imagem.lower().endswith(".gif") and not MODO_PREVIEW: # O preview mostra só a miniatura
+        iniciar_animacao(caminho_imagem, largura, altura)
+
+def parar_transicao():
+    """Interrompe o crossfade em andamento (se houver), sem exibir a imagem final."""
+    global TRANSICAO_ATUAL, ID_AGENDAMENTO_TRANSICAO
+    if ID_AGENDAMENTO_TRANSICAO and JANELA_PRINCIPAL:
+        JANELA_PRINCIPAL.after_cancel(ID_AGENDAMENTO_TRANSICAO)
+    ID_AGENDAMENTO_TRANSICAO = None
+    if TRANSICAO_ATUAL:
+        ESTATISTICAS_TRANSICAO["interrompidas"] += 1
+        TRANSICAO_ATUAL.encerrar()
+        TRANSICAO_ATUAL = None
+
+def iniciar_transicao(img_anterior, img_nova, caminho_imagem, largura, altura):
+    """Inicia o crossfade da imagem exibida para a nova, no ritmo de 'quadros_por_segundo_transicao'."""
+    global TRANSICAO_ATUAL, DESTINO_TRANSICAO, ID_AGENDAMENTO_TRANSICAO
+    periodo_s = periodo_quadro_transicao_s()
+    num_quadros = max(1, round(CONFIG.get("duracao_transicao_ms", 600) / 1000 / periodo_s))
+    TRANSICAO_ATUAL = transicao.TransicaoSuave(img_anterior, img_nova, num_quadros)
+    DESTINO_TRANSICAO = (caminho_imagem, largura, altura)
+    TRANSICAO_ATUAL.futuro_quadro(1) # Começa a misturar os primeiros quadros já
+    TRANSICAO_ATUAL.instante_inicio = time.perf_counter()
+    ID_AGENDAMENTO_TRANSICAO = JANELA_PRINCIPAL.after(max(1, int(periodo_s * 1000)), avancar_quadro_transicao)
+
+def avancar_quadro_transicao():
+    """
+    Relógio de quadros do crossfade (thread do Tkinter): exibe o quadro previsto para o instante atual,
+    se já estiver pronto. Quadros não prontos a tempo são pulados e contados como perdidos; se mais da
+    metade se perder, a transição termina em corte seco.
+    """
+    global ID_AGENDAMENTO_TRANSICAO
+    atual = TRANSICAO_ATUAL
+    if atual is None or not JANELA_PRINCIPAL or not LABEL_IMAGEM:
+        return
+    periodo_s = periodo_quadro_transicao_s()
+    indice = max(1, int((time.perf_counter() - atual.instante_inicio) / periodo_s))
+    if indice >= atual.num_quadros:
+        finalizar_transicao()
+        return
+
+    futuro = atual.futuro_quadro(indice)
+    # Um tique adiantado (arredondamento do after) encontra o quadro já na tela e não o repete
+    if indice > atual.indice_exibido and futuro.done():
+        if futuro.exception() is not None: # Erro ao misturar: termina com a imagem final
+            logger.error(f"Erro ao preparar quadro da transição: {futuro.exception()}")
+            finalizar_transicao()
+            return
+        img_tk = ImageTk.PhotoImage(futuro.result())
+        LABEL_IMAGEM.configure(image=img_tk)
+        LABEL_IMAGEM.image = img_tk
+        atual.quadros_exibidos += 1
+        atual.indice_exibido = indice
+    if max(indice - 1, atual.indice_exibido) - atual.quadros_exibidos > (atual.num_quadros - 1) / 2: # Não acompanha o relógio
+        finalizar_transicao()
+        return
+
+    # Próximo tique no instante do quadro seguinte, medido desde o início (sem acumular atrasos)
+    proximo_tique_s = atual.instante_inicio + (indice + 1) * periodo_s - time.perf_counter()
+    ID_AGENDAMENTO_TRANSICAO = JANELA_PRINCIPAL.after(max(1, int(proximo_tique_s * 1000)), avancar_quadro_transicao)
+
+def finalizar_transicao():
+    """Exibe a imagem final do crossfade, contabiliza os quadros e desativa as transições se a máquina não acompanhar."""
+    global TRANSICAO_ATUAL, ID_AGENDAMENTO_TRANSICAO, TRANSICOES_RUINS_SEGUIDAS, TRANSICAO_DESATIVADA
+    atual = TRANSICAO_ATUAL
+    TRANSICAO_ATUAL = None
+    ID_AGENDAMENTO_TRANSICAO = None
+    atual.encerrar()
+    quadros_perdidos = atual.quadros_perdidos = (atual.num_quadros - 1) - atual.quadros_exibidos
+    ESTATISTICAS_TRANSICAO["transicoes"] += 1
+    ESTATISTICAS_TRANSICAO["quadros_exibidos"] += atual.quadros_exibidos
+    ESTATISTICAS_TRANSICAO["quadros_perdidos"] += quadros_perdidos
+    metricas.incrementar("transicao_quadros_exibidos", atual.quadros_exibidos)
+    metricas.incrementar("transicao_quadros_perdidos", quadros_perdidos)
+    metricas.registrar_tempo("transicao", (time.perf_counter() - atual.instante_inicio) * 1000)
+
+    exibir_imagem(atual.img_nova, *DESTINO_TRANSICAO)
+
+    if quadros_perdidos > (atual.num_quadros - 1) / 2:
+        TRANSICOES_RUINS_SEGUIDAS += 1
+        logger.debug("Transição com %d de %d quadros perdidos.", quadros_perdidos, atual.num_quadros - 1)
+        if TRANSICOES_RUINS_SEGUIDAS >= MAX_TRANSICOES_RUINS_SEGUIDAS:
+            TRANSICAO_DESATIVADA = True
+            logger.warning(f"Transições suaves desativadas: {TRANSICOES_RUINS_SEGUIDAS} seguidas sem acompanhar o relógio de quadros. Usando corte seco.")
+    else:
+        TRANSICOES_RUINS_SEGUIDAS = 0
+
+def remover_imagem_da_lista(caminho_imagem):
+    """Retira da apresentação uma imagem que não pode ser exibida e passa para a próxima (ou fica preto)."""
+    global MODO_APENAS_TELA_PRETA
+    IMAGENS_DISPONIVEIS.remove(caminho_imagem) # Remove da lista
+    LISTA_REPRODUCAO.remover(caminho_imagem) # A lista de reprodução segue para a próxima imagem
+    if not IMAGENS_DISPONIVEIS:
+        logger.warning("Nenhuma imagem válida restante na lista.")
+        MODO_APENAS_TELA_PRETA = True
+        mostrar_proxima_imagem() # Chamada para limpar a imagem atual e ficar preto
+        return
+    JANELA_PRINCIPAL.after(100, mostrar_proxima_imagem) # Tenta a próxima imagem
+
 def mostrar_proxima_imagem():
     """Exibe a próxima imagem ou mantém a tela preta."""
-    global INDICE_IMAGEM_ATUAL, LABEL_IMAGEM, JANELA_PRINCIPAL, CONFIG, MODO_APENAS_TELA_PRETA
+    global LABEL_IMAGEM, JANELA_PRINCIPAL, CONFIG, MODO_APENAS_TELA_PRETA, PRIMEIRA_IMAGEM_EXIBIDA
+    global IMAGEM_EXIBIDA_PIL
 
     if not JANELA_PRINCIPAL or not CONFIG:
         logger.warning("Tentativa de mostrar imagem sem janela principal ou configuração carregada.")
@@ -180,6 +1088,9 @@ def mostrar_proxima_imagem():
     
     if MODO_APENAS_TELA_PRETA or not IMAGENS_DISPONIVEIS:
         logger.debug("Modo tela preta ou sem imagens. Nenhuma imagem será exibida.")
+        parar_transicao()
+        parar_animacao()
+        IMAGEM_EXIBIDA_PIL = None
         if LABEL_IMAGEM: # Garante que a label esteja configurada para preto (sem imagem)
             LABEL_IMAGEM.configure(image=None, bg='black')
             LABEL_IMAGEM.image = None # Limpar referência
@@ -188,44 +1099,80 @@ def mostrar_proxima_imagem():
         return
 
     # Se chegamos aqui, há imagens para mostrar
-    caminho_imagem = IMAGENS_DISPONIVEIS[INDICE_IMAGEM_ATUAL]
-    INDICE_IMAGEM_ATUAL = (INDICE_IMAGEM_ATUAL + 1) % len(IMAGENS_DISPONIVEIS)
+    caminho_imagem = LISTA_REPRODUCAO.atual()
 
-    try:
-        logger.debug(f"Carregando imagem: {caminho_imagem}")
-        img_pil = Image.open(caminho_imagem)
+    largura_tela = JANELA_PRINCIPAL.winfo_width()
+    altura_tela = JANELA_PRINCIPAL.winfo_height()
 
-        largura_tela = JANELA_PRINCIPAL.winfo_width()
-        altura_tela = JANELA_PRINCIPAL.winfo_height()
+    if largura_tela <= 1 or altura_tela <= 1: # Janela ainda não renderizada
+        logger.debug("Dimensões da janela ainda não disponíveis, tentando novamente em 100ms.")
+        JANELA_PRINCIPAL.after(100, mostrar_proxima_imagem)
+        return
 
-        if largura_tela <= 1 or altura_tela <= 1: # Janela ainda não renderizada
-            logger.debug("Dimensões da janela ainda não disponíveis, tentando novamente em 100ms.")
-            JANELA_PRINCIPAL.after(100, mostrar_proxima_imagem)
-            return
+    # A decodificação e o redimensionamento ocorrem nas threads do prefetcher.
+    # Se a imagem ainda não estiver pronta, verifica novamente em breve sem bloquear o loop de eventos.
+    futuro_imagem = PREFETCHER.obter(caminho_imagem, largura_tela, altura_tela)
+    if not futuro_imagem.done():
+        metricas.incrementar("espera_prefetch")
+        JANELA_PRINCIPAL.after(INTERVALO_ESPERA_PREFETCH_MS, mostrar_proxima_imagem)
+        return
+    PREFETCHER.consumir(caminho_imagem, largura_tela, altura_tela)
 
-        # Redimensionar imagem para caber na tela, mantendo a proporção
-        img_pil.thumbnail((largura_tela, altura_tela), Image.Resampling.LANCZOS)
-        img_tk = ImageTk.PhotoImage(img_pil)
+    LISTA_REPRODUCAO.avancar()
+    # Agenda a preparação das próximas imagens enquanto a atual é exibida
+    proximas_imagens = LISTA_REPRODUCAO.proximos(min(PREFETCHER.num_antecipadas, len(IMAGENS_DISPONIVEIS)))
+    PREFETCHER.antecipar(proximas_imagens, largura_tela, altura_tela)
+    if ARMAZEM:
+        # A imagem atual, as próximas e as demais ainda não exibidas nesta rodada não podem ser removidas
+        # pelo limite de tamanho do cache: a remoção LRU recai sobre as já exibidas
+        ARMAZEM.definir_protegidos([caminho_imagem] + proximas_imagens + LISTA_REPRODUCAO.restantes_nomes())
+        ARMAZEM.registrar_exibicao(caminho_imagem)
+
+    try:
+        img_pil = futuro_imagem.result() # Já concluído: relança exceções da decodificação
+        inicio_troca = time.perf_counter()
 
         if LABEL_IMAGEM is None: # Deveria ter sido criado em iniciar_protetor_tela
             logger.error("LABEL_IMAGEM não foi inicializado. Criando agora.")
             LABEL_IMAGEM = tk.Label(JANELA_PRINCIPAL, background='black')
             LABEL_IMAGEM.pack(expand=True, fill=tk.BOTH)
         
-        LABEL_IMAGEM.configure(image=img_tk, bg='black') # Garante bg preto caso a imagem tenha alfa
-        LABEL_IMAGEM.image = img_tk # Manter referência para evitar garbage collection
+        parar_transicao() # Uma transição ainda em andamento é abandonada
+        parar_animacao() # A animação da imagem anterior (se houver) termina na troca
+        imagem_anterior = IMAGEM_EXIBIDA_PIL
+        IMAGEM_EXIBIDA_PIL = img_pil
+        if imagem_anterior is not None and transicao_suave_ativa():
+            iniciar_transicao(imagem_anterior, img_pil, caminho_imagem, largura_tela, altura_tela)
+        else:
+            exibir_imagem(img_pil, caminho_imagem, largura_tela, altura_tela)
 
-        logger.debug(f"Imagem '{os.path.basename(caminho_imagem)}' exibida.")
+        if len(QUARENTENA):
+            QUARENTENA.liberar_caminho(caminho_imagem) # Decodificou: se estava em quarentena, a espera venceu e ela saiu
+        duracao_troca_ms = (time.perf_counter() - inicio_troca) * 1000
+        metricas.registrar_tempo("exibicao", duracao_troca_ms)
+        metricas.incrementar("imagens_exibidas")
+        if not PRIMEIRA_IMAGEM_EXIBIDA:
+            PRIMEIRA_IMAGEM_EXIBIDA = True
+            tempo_primeira_imagem_ms = (time.perf_counter() - INSTANTE_INICIO) * 1000
+            metricas.definir("tempo_primeira_imagem_ms", round(tempo_primeira_imagem_ms, 1))
+            logger.info(f"Tempo até a primeira imagem{' (preview)' if MODO_PREVIEW else ''}: {tempo_primeira_imagem_ms:.0f} ms.")
+        logger.debug("Imagem '%s' exibida (troca na thread principal: %.1f ms).", os.path.basename(caminho_imagem), duracao_troca_ms)
 
     except FileNotFoundError:
         logger.error(f"Arquivo de imagem não encontrado (sumiu?): {caminho_imagem}")
-        IMAGENS_DISPONIVEIS.pop(IMAGENS_DISPONIVEIS.index(caminho_imagem)) # Remove da lista
-        if not IMAGENS_DISPONIVEIS:
-            logger.warning("Nenhuma imagem válida restante após FileNotFoundError.")
-            MODO_APENAS_TELA_PRETA = True
-            mostrar_proxima_imagem() # Chamada para limpar a imagem atual e ficar preto
-            return
-        JANELA_PRINCIPAL.after(100, mostrar_proxima_imagem) # Tenta a próxima imagem
+        remover_imagem_da_lista(caminho_imagem)
+        return
+    except carregador_imagens.ImagemGrandeDemais as e:
+        # Preview: original grande demais para gerar a miniatura dentro do limite de memória (aguarda a próxima sincronização)
+        logger.info(f"Miniatura indisponível no preview, imagem ignorada: {e}")
+        metricas.incrementar("preview_imagens_ignoradas")
+        JANELA_PRINCIPAL.after(INTERVALO_ESPERA_PREFETCH_MS, mostrar_proxima_imagem)
+        return
+    except carregador_imagens.ERROS_DECODIFICACAO as e:
+        # Arquivo corrompido, truncado ou acima dos limites: não é tentado de novo até mudar (ou a espera vencer)
+        QUARENTENA.registrar_caminho(caminho_imagem, e)
+        metricas.incrementar("imagens_em_quarentena")
+        remover_imagem_da_lista(caminho_imagem)
         return
     except Exception as e:
         logger.error(f"Erro ao carregar ou exibir imagem '{caminho_imagem}': {e}", exc_info=True)
@@ -240,27 +1187,70 @@ def mostrar_proxima_imagem():
     JANELA_PRINCIPAL.after(tempo_exibicao_ms, mostrar_proxima_imagem)
 
 
-def iniciar_protetor_tela(modo_preview=False, handle_janela_pai_preview=None, url_config_remota=None):
-    """Inicia a janela principal do protetor de tela."""
-    global JANELA_PRINCIPAL, CONFIG, HANDLE_JANELA_PREVIEW, MODO_APENAS_TELA_PRETA, LABEL_IMAGEM
+def iniciar_protetor_tela(modo_preview=False, handle_janela_pai_preview=None, url_config_remota=None, config=None):
+    """
+    Inicia a janela principal do protetor de tela.
+    Com config (ex: simulador), usa essa configuração em vez de buscá-la na origem.
+    """
+    global JANELA_PRINCIPAL, CONFIG, HANDLE_JANELA_PREVIEW, MODO_APENAS_TELA_PRETA, LABEL_IMAGEM, PREFETCHER, CACHE_REDIMENSIONADO
+    global IMAGENS_DISPONIVEIS, ARMAZEM, CAMINHO_ARQUIVO_METRICAS, GRAVADOR_METRICAS, MODO_PREVIEW, QUARENTENA, PACOTE_PIXELS
+    global LISTA_REPRODUCAO
 
     logger.info(f"Iniciando protetor de tela. Modo preview: {modo_preview}, Handle pai: {handle_janela_pai_preview}")
+    MODO_PREVIEW = modo_preview
+    importar_modulos_graficos()
     
-    if url_config_remota:
+    if config is not None:
+        logger.info("Configuração fornecida pelo chamador; a origem não será consultada.")
+    elif url_config_remota:
         logger.info(f"URL de configuração fornecida: {url_config_remota}")
     else:
         logger.info(f"URL de configuração não fornecida, usando padrão de configuracao.py: {configuracao.URL_CONFIG_PADRAO}")
 
 
     try:
-        CONFIG = configuracao.carregar_configuracao(url_config_remota)
+        with metricas.medir("carregamento_configuracao"):
+            # O preview usa a configuração persistida, sem consultar a origem; a rede só é usada se não houver cópia local
+            if config is not None:
+                CONFIG = configuracao.processar_configuracao(config)
+            else:
+                CONFIG = configuracao.carregar_configuracao_persistida(url_config_remota) if modo_preview else None
+                CONFIG = CONFIG or configuracao.carregar_configuracao(url_config_remota)
     except Exception as e:
         logger.critical(f"Falha CRÍTICA ao carregar configuração: {e}. Protetor de tela usará tela preta.", exc_info=True)
         MODO_APENAS_TELA_PRETA = True
         # Não retorna, continua para criar a janela preta.
-    
-    if CONFIG: # Se a config carregou, tentar sincronizar e carregar imagens
-        sincronizar_cache_e_carregar_imagens() # Define MODO_APENAS_TELA_PRETA se falhar
+
+    # As métricas ficam ativas até aqui para medir a própria busca da configuração
+    metricas.configurar(CONFIG.get("metricas_ativas", True) if CONFIG else True)
+    nome_arquivo_metricas = f"preview_{NOME_ARQUIVO_METRICAS}" if modo_preview else NOME_ARQUIVO_METRICAS
+    CAMINHO_ARQUIVO_METRICAS = os.path.join(configuracao.obter_pasta_estado_local(), nome_arquivo_metricas)
+    intervalo_metricas = CONFIG.get("intervalo_metricas_segundos", 0) if CONFIG else 0
+    if metricas.ATIVO and intervalo_metricas > 0:
+        GRAVADOR_METRICAS = metricas.GravadorPeriodico(CAMINHO_ARQUIVO_METRICAS, intervalo_metricas).iniciar()
+
+    # O preview segue a ordem persistida (mostra o que a próxima ativação vai exibir), mas não a grava
+    LISTA_REPRODUCAO = None # Relida do disco: continua de onde a última ativação parou
+    obter_lista_reproducao()
+    sincronizacao_em_segundo_plano = bool(CONFIG) and not modo_preview and CONFIG.get("sincronizacao_em_segundo_plano", True)
+    if CONFIG:
+        configurar_limites_imagem(CONFIG)
+        QUARENTENA = obter_quarentena(CONFIG)
+    if CONFIG and modo_preview:
+        # Preview: nada de sincronização nem de escrita no índice do cache; apenas miniaturas do que já está em cache
+        CACHE_REDIMENSIONADO = cache_redimensionado.CacheRedimensionado(CONFIG["pasta_cache_local_completa"])
+        IMAGENS_DISPONIVEIS = LISTA_REPRODUCAO.organizar(listar_imagens_cache(CONFIG))
+        MODO_APENAS_TELA_PRETA = not IMAGENS_DISPONIVEIS
+    elif CONFIG: # Se a config carregou, tentar sincronizar e carregar imagens
+        if CONFIG.get("usar_cache_redimensionado", True):
+            CACHE_REDIMENSIONADO = cache_redimensionado.CacheRedimensionado(CONFIG["pasta_cache_local_completa"])
+        ARMAZEM = obter_armazem(CONFIG)
+        if sincronizacao_em_segundo_plano:
+            # Exibe imediatamente o que já está no cache; a rede é sincronizada após a janela abrir
+            IMAGENS_DISPONIVEIS = LISTA_REPRODUCAO.organizar(listar_imagens_cache(CONFIG))
+            MODO_APENAS_TELA_PRETA = not IMAGENS_DISPONIVEIS
+        else:
+            sincronizar_cache_e_carregar_imagens() # Define MODO_APENAS_TELA_PRETA se falhar
     else: # Se config falhou no try-except, MODO_APENAS_TELA_PRETA já é True
         logger.info("Configuração não pôde ser carregada. MODO_APENAS_TELA_PRETA ativado.")
 
@@ -274,6 +1264,7 @@ def iniciar_protetor_tela(modo_preview=False, handle_janela_pai_preview=None, ur
         HANDLE_JANELA_PREVIEW = handle_janela_pai_preview
         logger.info(f"Configurando para modo preview com handle: {HANDLE_JANELA_PREVIEW}")
         try:
+            import ctypes.wintypes # Tipos do Win32, necessários apenas no preview
             JANELA_PRINCIPAL.update_idletasks() # Garante que a janela Tkinter existe e tem um HWND
             hwnd_tkinter = JANELA_PRINCIPAL.winfo_id()
             
@@ -320,6 +1311,31 @@ def iniciar_protetor_tela(modo_preview=False, handle_janela_pai_preview=None, ur
     LABEL_IMAGEM = tk.Label(JANELA_PRINCIPAL, background='black')
     LABEL_IMAGEM.pack(expand=True, fill=tk.BOTH)
 
+    if CONFIG and modo_preview:
+        PREFETCHER = carregador_imagens.PrefetcherImagens(
+            num_antecipadas=1, num_threads=1, cache_redimensionado=CACHE_REDIMENSIONADO,
+            cache_memoria=carregador_imagens.CacheMemoriaImagens(LIMITE_MEMORIA_PREVIEW_BYTES),
+            preparar=carregador_imagens.preparar_miniatura
+        )
+    elif CONFIG:
+        # Resolução em que a sincronização prepara as próximas imagens para a próxima ativação
+        LISTA_REPRODUCAO.definir_resolucao(JANELA_PRINCIPAL.winfo_screenwidth(), JANELA_PRINCIPAL.winfo_screenheight())
+        if CONFIG.get("usar_pacote_pixels", False):
+            # Em tela cheia, a área de exibição é a tela inteira; a sincronização monta o pacote nessa resolução
+            PACOTE_PIXELS = pacote_pixels.PacotePixels(
+                CONFIG["pasta_cache_local_completa"], JANELA_PRINCIPAL.winfo_screenwidth(), JANELA_PRINCIPAL.winfo_screenheight()
+            )
+            PACOTE_PIXELS.registrar()
+        PREFETCHER = carregador_imagens.PrefetcherImagens(
+            num_antecipadas=CONFIG.get("imagens_antecipadas", 3),
+            num_threads=CONFIG.get("threads_prefetch", 2),
+            cache_redimensionado=CACHE_REDIMENSIONADO,
+            cache_memoria=carregador_imagens.CacheMemoriaImagens(
+                CONFIG.get("limite_memoria_imagens_mb", 200) * 1024 * 1024
+            ),
+            pacote_pixels=PACOTE_PIXELS
+        )
+
     if MODO_APENAS_TELA_PRETA or not IMAGENS_DISPONIVEIS:
         logger.info("Protetor iniciado em modo tela preta (sem imagens para exibir).")
         # Nenhuma ação adicional necessária, a label já está preta e vazia.
@@ -327,64 +1343,107 @@ def iniciar_protetor_tela(modo_preview=False, handle_janela_pai_preview=None, ur
         logger.info("Protetor iniciado com imagens. Exibindo a primeira.")
         mostrar_proxima_imagem()
 
+    if sincronizacao_em_segundo_plano:
+        iniciar_sincronizacao_em_segundo_plano()
+    elif CONFIG and not modo_preview and CONFIG.get("intervalo_ressincronizacao_segundos", 300) > 0:
+        iniciar_sincronizacao_em_segundo_plano(sincronizar_agora=False) # Já sincronizou: apenas monitora a pasta de rede
+
+    relatorio_tempos_inicializacao("/p" if modo_preview else "/s")
     JANELA_PRINCIPAL.mainloop()
+    gravar_metricas()
     logger.info("Loop principal do Tkinter encerrado. Protetor de tela finalizado.")
 
 
 def mostrar_configuracao_dialogo(url_config_remota_param=None):
-    """Exibe uma janela simples de 'configuração' (mais informativa)."""
+    """
+    Exibe uma janela simples de 'configuração' (mais informativa).
+    Usa apenas o estado local (configuração persistida e índice do cache), sem acessar a rede
+    nem importar tkinter/Pillow, para abrir instantaneamente.
+    """
     # Não usar a CONFIG global aqui, pois esta função pode ser chamada
     # independentemente do protetor estar rodando em modo /s ou /p.
-    # Carrega a configuração apenas para exibir as informações.
     logger.info("Modo configuração (/c) solicitado.")
     
     temp_config_data = None
+    obtida_em = None
     config_url_usada = url_config_remota_param or configuracao.URL_CONFIG_PADRAO
     
     try:
-        temp_config_data = configuracao.carregar_configuracao(config_url_usada)
+        persistida = configuracao.ler_config_persistida(config_url_usada)
+        if persistida:
+            temp_config_data = configuracao.processar_configuracao(persistida["config"])
+            obtida_em = persistida.get("obtida_em")
     except Exception as e:
-        logger.error(f"Erro ao carregar configuração para tela de info: {e}", exc_info=True)
+        logger.error(f"Erro ao ler configuração local para tela de info: {e}", exc_info=True)
         msg_erro = (
-            f"Erro ao carregar configuração de:\n'{config_url_usada}'\n\n"
+            f"Erro ao ler a configuração salva localmente para:\n'{config_url_usada}'\n\n"
             f"Detalhes: {str(e)}\n\n"
             f"Verifique o arquivo de log para mais informações:\n{log_file_path}"
         )
-        ctypes.windll.user32.MessageBoxW(0, msg_erro, f"{PROGRAM_NAME} - Erro de Configuração", 0x10) # MB_ICONERROR
+        if not EXIBIR_RELATORIO_TEMPOS:
+            ctypes.windll.user32.MessageBoxW(0, msg_erro, f"{PROGRAM_NAME} - Erro de Configuração", 0x10) # MB_ICONERROR
         return
 
     if not temp_config_data:
         msg_erro = (
-            f"Não foi possível carregar a configuração de:\n'{config_url_usada}'.\n\n"
+            f"Ainda não há configuração salva localmente para:\n'{config_url_usada}'.\n\n"
+            f"Ela é obtida da rede na primeira execução do protetor de tela (/s).\n"
             f"Verifique se a URL está correta e acessível, e se o arquivo JSON é válido.\n\n"
             f"Log: {log_file_path}"
         )
-        ctypes.windll.user32.MessageBoxW(0, msg_erro, f"{PROGRAM_NAME} - Erro de Configuração", 0x10)
+        relatorio_tempos_inicializacao("/c")
+        if not EXIBIR_RELATORIO_TEMPOS:
+            ctypes.windll.user32.MessageBoxW(0, msg_erro, f"{PROGRAM_NAME} - Configuração", 0x30) # MB_ICONWARNING
         return
 
+    # Resumo do cache lido do índice local (nenhum arquivo de imagem é aberto)
+    try:
+        armazem = armazem_cache.ArmazemCache(temp_config_data["pasta_cache_local_completa"])
+        resumo_cache = f"{len(armazem.nomes())} imagens ({armazem.tamanho_total() / (1024 * 1024):.1f} MB)"
+    except Exception as e:
+        logger.warning(f"Não foi possível ler o índice do cache: {e}")
+        resumo_cache = "Indisponível"
+    resumo_disjuntor = acesso_rede.DisjuntorRede(
+        temp_config_data["pasta_cache_local_completa"], temp_config_data["pasta_imagens_rede"]
+    ).resumo()
+    if resumo_disjuntor["estado"] == "aberto":
+        estado_rede = f"Usando apenas o cache por mais {resumo_disjuntor['segundos_restantes']} s (falha: {resumo_disjuntor['motivo']})"
+    elif resumo_disjuntor["estado"] == "meio_aberto":
+        estado_rede = f"Falhou na última tentativa ({resumo_disjuntor['motivo']}); será testada na próxima execução"
+    else:
+        latencia = resumo_disjuntor["latencia_ms"]
+        estado_rede = f"OK (sondagem em {latencia:.0f} ms)" if latencia is not None else "Ainda não testado"
+    data_obtencao = time.strftime("%d/%m/%Y %H:%M", time.localtime(obtida_em)) if obtida_em else "Desconhecida"
+
     info_msg = (
         f"{PROGRAM_NAME}\n(Com Cache, Sem Atualização Automática)\n\n"
         f"Versão da Configuração: {temp_config_data.get('versao_config', 'Desconhecida')}\n"
         f"URL de Configuração: {config_url_usada}\n"
+        f"Configuração obtida em: {data_obtencao}\n"
         f"Pasta de Imagens Remota: {temp_config_data.get('pasta_imagens_rede', 'Não configurada')}\n"
         f"Pasta de Cache Local: {temp_config_data.get('pasta_cache_local_completa', 'Não configurada')}\n"
+        f"Imagens no Cache: {resumo_cache}\n"
+        f"Acesso à Pasta de Rede: {estado_rede}\n"
         f"Tempo por Imagem: {temp_config_data.get('tempo_exibicao_imagem_segundos', 'N/A')} segundos\n\n"
         f"Este protetor de tela busca imagens de uma pasta de rede e as armazena em cache local.\n"
         f"Se a rede estiver indisponível, imagens do cache serão usadas.\n"
         f"Se não houver imagens ou a configuração falhar, uma tela preta será exibida.\n\n"
         f"Arquivo de log: {log_file_path}"
     )
-    ctypes.windll.user32.MessageBoxW(0, info_msg, f"{PROGRAM_NAME} - Informações", 0x40) # MB_ICONINFORMATION
+    relatorio_tempos_inicializacao("/c")
+    if not EXIBIR_RELATORIO_TEMPOS:
+        ctypes.windll.user32.MessageBoxW(0, info_msg, f"{PROGRAM_NAME} - Informações", 0x40) # MB_ICONINFORMATION
 
 
 def main():
+    global EXIBIR_RELATORIO_TEMPOS
     logger.info(f"'{PROGRAM_NAME}' iniciado com argumentos: {sys.argv}")
     
     # Argumento customizado para URL de configuração: /configurl:<URL_OU_CAMINHO_UNC>
     url_config_arg_cmd = None
     args_para_processar = list(sys.argv[1:]) # Copia para poder modificar
 
-    # Extrai /configurl se presente
+    # Extrai /configurl e /tempos se presentes
     temp_args = []
     for arg in args_para_processar:
         if arg.lower().startswith("/configurl:"):
@@ -393,12 +1452,14 @@ def main():
                 logger.info(f"URL de configuração fornecida por argumento de linha de comando: {url_config_arg_cmd}")
             except IndexError:
                 logger.warning(f"Argumento /configurl malformado: {arg}")
+        elif arg.lower() == "/tempos":
+            EXIBIR_RELATORIO_TEMPOS = True
         else:
             temp_args.append(arg)
     args_para_processar = temp_args
 
 
-    # O primeiro argumento restante (após remover /configurl) define o modo
+    # O primeiro argumento restante (após remover /configurl e /tempos) define o modo
     modo_arg_principal = args_para_processar[0].lower() if args_para_processar else "/s" # Padrão para /s
 
     if modo_arg_principal == "/s":
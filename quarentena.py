@@ -0,0 +1,115 @@
+# quarentena.py
+import os
+import json
+import time
+import logging
+import threading
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+NOME_ARQUIVO_QUARENTENA = "quarentena.json" # Na raiz da pasta de cache
+VERSAO_QUARENTENA = 1
+ESPERA_INICIAL_S = 60 * 60 # Primeira nova tentativa uma hora após a falha
+ESPERA_MAXIMA_S = 7 * 24 * 60 * 60 # A espera dobra a cada falha, até uma semana
+
+class Quarentena:
+    """
+    Registro persistido de arquivos de imagem que falharam (corrompidos, truncados, acima dos limites
+    de pixels/tamanho). Cada arquivo é identificado por nome + data de modificação: no cache, o nome
+    já é o hash do conteúdo; na rede, a data muda quando o arquivo é substituído. Assim, um arquivo
+    ruim é ignorado nas próximas execuções até mudar, ou até sua espera (que dobra a cada falha) vencer.
+    """
+
+    def __init__(self, pasta_cache):
+        self.caminho_arquivo = os.path.join(pasta_cache, NOME_ARQUIVO_QUARENTENA)
+        self._lock = threading.Lock()
+        self._registros = {} # {identidade: {"nome", "motivo", "falhas", "proxima_tentativa"}}
+        self._alterada = False
+        self._carregar()
+
+    @staticmethod
+    def identidade(nome_arquivo, mtime):
+        return f"{nome_arquivo}|{mtime}"
+
+    @classmethod
+    def identidade_do_caminho(cls, caminho_arquivo):
+        return cls.identidade(os.path.basename(caminho_arquivo), os.path.getmtime(caminho_arquivo))
+
+    def _carregar(self):
+        try:
+            with open(self.caminho_arquivo, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Quarentena inválida, será recriada: {e}")
+            return
+        if isinstance(dados, dict) and dados.get("versao") == VERSAO_QUARENTENA:
+            self._registros = dados.get("arquivos", {})
+
+    def salvar(self):
+        """Grava a quarentena (se alterada) de forma atômica."""
+        with self._lock:
+            if not self._alterada:
+                return
+            dados = {"versao": VERSAO_QUARENTENA, "arquivos": {i: dict(r) for i, r in self._registros.items()}}
+            self._alterada = False
+        caminho_temp = f"{self.caminho_arquivo}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(caminho_temp, 'w', encoding='utf-8') as f:
+                json.dump(dados, f, ensure_ascii=False, indent=1)
+            os.replace(caminho_temp, self.caminho_arquivo)
+        except OSError as e:
+            logger.error(f"Não foi possível gravar a quarentena de imagens: {e}")
+
+    def contem(self, identidade):
+        """True se o arquivo está em quarentena e sua espera ainda não venceu."""
+        with self._lock:
+            registro = self._registros.get(identidade)
+            return bool(registro) and time.time() < registro["proxima_tentativa"]
+
+    def contem_caminho(self, caminho_arquivo):
+        try:
+            return self.contem(self.identidade_do_caminho(caminho_arquivo))
+        except OSError:
+            return False
+
+    def registrar(self, identidade, nome_arquivo, motivo):
+        """Coloca (ou mantém) o arquivo em quarentena, dobrando a espera a cada nova falha."""
+        with self._lock:
+            registro = self._registros.get(identidade) or {"nome": nome_arquivo, "falhas": 0}
+            registro["falhas"] += 1
+            registro["motivo"] = str(motivo)[:300]
+            espera = min(ESPERA_INICIAL_S * 2 ** (registro["falhas"] - 1), ESPERA_MAXIMA_S)
+            registro["proxima_tentativa"] = time.time() + espera
+            self._registros[identidade] = registro
+            self._alterada = True
+        logger.warning(f"Imagem '{nome_arquivo}' em quarentena ({registro['falhas']}ª falha, nova tentativa em {espera / 3600:.1f} h): {motivo}")
+
+    def registrar_caminho(self, caminho_arquivo, motivo):
+        try:
+            self.registrar(self.identidade_do_caminho(caminho_arquivo), os.path.basename(caminho_arquivo), motivo)
+        except OSError:
+            pass # O arquivo sumiu: não há o que colocar em quarentena
+
+    def liberar_caminho(self, caminho_arquivo):
+        """Remove o arquivo da quarentena após uma decodificação bem-sucedida (ex: espera vencida)."""
+        nome_arquivo = os.path.basename(caminho_arquivo)
+        with self._lock:
+            identidades = [i for i, r in self._registros.items() if r["nome"] == nome_arquivo]
+            for identidade in identidades:
+                del self._registros[identidade]
+            self._alterada = self._alterada or bool(identidades)
+
+    def limpar_obsoletos(self, identidades_atuais):
+        """Esquece os registros de arquivos que não existem mais (ou mudaram)."""
+        with self._lock:
+            obsoletas = [i for i in self._registros if i not in identidades_atuais]
+            for identidade in obsoletas:
+                del self._registros[identidade]
+            self._alterada = self._alterada or bool(obsoletas)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._registros)
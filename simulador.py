@@ -0,0 +1,293 @@
+# simulador.py
+"""
+Simulador sem tela do protetor de tela, com relógio virtual, para testes de longa duração (soak).
+
+Executa o mesmo iniciar_protetor_tela / mostrar_proxima_imagem (prefetch, caches, quarentena, GIFs,
+pacote de pixels) sobre uma janela virtual: os after() do Tkinter entram em uma fila ordenada por um
+relógio virtual, que salta direto para o próximo evento. O tempo de decodificação não conta no relógio
+(as threads de prefetch terminam antes de cada evento), de modo que uma noite inteira roda em segundos.
+Nenhum display é necessário (tkinter não é importado) e as imagens não são desenhadas.
+
+O resultado é um JSON com trocas, decodificações, taxas de acerto dos caches, pico de memória e o
+crescimento de memória (RSS e objetos Python) por ciclo completo da lista, para detectar vazamentos.
+
+Exemplos:
+    python simulador.py --horas 12 --quantidade 40
+    python simulador.py --horas 24 --config minha_config.json --saida soak.json
+"""
+import gc
+import os
+import sys
+import json
+import time
+import heapq
+import types
+import shutil
+import logging
+import argparse
+import itertools
+import statistics
+import tempfile
+
+import protetor_tela
+import metricas
+
+class RelogioVirtual:
+    """Fila de eventos (after) ordenada por um relógio virtual em milissegundos."""
+
+    def __init__(self):
+        self.agora_ms = 0
+        self._eventos = [] # heap de (instante_ms, sequência, id, função, argumentos)
+        self._sequencia = itertools.count()
+        self._cancelados = set()
+        self.executados = 0
+        self.erros = 0
+
+    def agendar(self, atraso_ms, funcao, argumentos):
+        sequencia = next(self._sequencia)
+        id_evento = f"after#{sequencia}"
+        heapq.heappush(self._eventos, (self.agora_ms + max(0, int(atraso_ms)), sequencia, id_evento, funcao, argumentos))
+        return id_evento
+
+    def cancelar(self, id_evento):
+        self._cancelados.add(id_evento)
+
+    def executar(self, duracao_ms, antes_do_evento=None, depois_do_evento=None):
+        """Executa os eventos até duracao_ms (virtuais) ou até a fila esvaziar."""
+        while self._eventos and self._eventos[0][0] <= duracao_ms:
+            instante_ms, _, id_evento, funcao, argumentos = heapq.heappop(self._eventos)
+            if id_evento in self._cancelados:
+                self._cancelados.discard(id_evento)
+                continue
+            if antes_do_evento:
+                antes_do_evento()
+            self.agora_ms = instante_ms
+            try:
+                funcao(*argumentos)
+            except SystemExit:
+                return
+            except Exception as e: # Como no Tkinter: o erro de um callback não encerra o loop
+                self.erros += 1
+                logging.getLogger(__name__).error(f"Erro em evento agendado ({getattr(funcao, '__name__', funcao)}): {e}", exc_info=True)
+            self.executados += 1
+            if depois_do_evento:
+                depois_do_evento()
+        self.agora_ms = max(self.agora_ms, duracao_ms)
+
+
+class JanelaVirtual:
+    """Substitui tk.Tk: só o que o protetor usa, com after() no relógio virtual e mainloop() limitado à duração simulada."""
+
+    def __init__(self, relogio, largura, altura, duracao_ms, antes_do_evento=None, depois_do_evento=None):
+        self._relogio = relogio
+        self._largura = largura
+        self._altura = altura
+        self._duracao_ms = duracao_ms
+        self._antes_do_evento = antes_do_evento
+        self._depois_do_evento = depois_do_evento
+
+    def after(self, atraso_ms, funcao, *argumentos):
+        return self._relogio.agendar(atraso_ms, funcao, argumentos)
+
+    def after_cancel(self, id_evento):
+        self._relogio.cancelar(id_evento)
+
+    def mainloop(self):
+        self._relogio.executar(self._duracao_ms, self._antes_do_evento, self._depois_do_evento)
+
+    def winfo_width(self):
+        return self._largura
+
+    def winfo_height(self):
+        return self._altura
+
+    winfo_screenwidth = winfo_width
+    winfo_screenheight = winfo_height
+
+    def winfo_id(self):
+        return 0
+
+    def _ignorar(self, *args, **kwargs):
+        return None
+
+    title = configure = attributes = bind = resizable = update_idletasks = quit = destroy = _ignorar
+
+
+class LabelNulo:
+    def __init__(self, *args, **kwargs):
+        self.image = None
+
+    def configure(self, image=None, **kwargs):
+        self.image = image
+
+    def pack(self, *args, **kwargs):
+        pass
+
+
+class FotoNula:
+    """Substitui ImageTk.PhotoImage: nada é desenhado, mas a imagem é lida por inteiro, como na cópia para o Tk."""
+
+    def __init__(self, img_pil):
+        img_pil.load()
+        self.largura, self.altura = img_pil.size
+
+    def width(self):
+        return self.largura
+
+    def height(self):
+        return self.altura
+
+
+def instalar_exibicao_virtual(relogio, largura, altura, duracao_ms, antes_do_evento=None, depois_do_evento=None):
+    """Faz o protetor usar a janela virtual no lugar do tkinter (importar_modulos_graficos não importará o tkinter)."""
+    import carregador_imagens
+    import animacao_gif
+    import transicao
+    import pacote_pixels
+    protetor_tela.tk = types.SimpleNamespace(
+        Tk=lambda: JanelaVirtual(relogio, largura, altura, duracao_ms, antes_do_evento, depois_do_evento),
+        Label=LabelNulo, BOTH="both"
+    )
+    protetor_tela.ImageTk = types.SimpleNamespace(PhotoImage=FotoNula)
+    protetor_tela.carregador_imagens = carregador_imagens
+    protetor_tela.animacao_gif = animacao_gif
+    protetor_tela.transicao = transicao
+    protetor_tela.pacote_pixels = pacote_pixels
+
+def _memoria_kb(campo):
+    """Campo de /proc/self/status (VmRSS, VmHWM) em KB; None fora do Linux."""
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for linha in f:
+                if linha.startswith(campo + ":"):
+                    return int(linha.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _crescimento_por_ciclo(amostras, campo):
+    """Inclinação (por ciclo) da reta ajustada às amostras, ignorando o primeiro ciclo (caches ainda enchendo)."""
+    pontos = [(amostra["ciclo"], amostra[campo]) for amostra in amostras[1:] if amostra[campo] is not None]
+    if len(pontos) < 2:
+        return None
+    inclinacao, _ = statistics.linear_regression([p[0] for p in pontos], [p[1] for p in pontos])
+    return round(inclinacao, 2)
+
+def simular(config, horas, largura, altura):
+    """Executa uma sessão de 'horas' (virtuais) e retorna o relatório."""
+    relogio = RelogioVirtual()
+    amostras_ciclos = []
+    estado = {"exibidas_no_ultimo_ciclo": 0}
+
+    def aguardar_trabalho_em_segundo_plano():
+        if protetor_tela.PREFETCHER:
+            protetor_tela.PREFETCHER.aguardar_pendentes(timeout=60)
+
+    def registrar_ciclo():
+        total_imagens = len(protetor_tela.IMAGENS_DISPONIVEIS)
+        exibidas = metricas.resumo().get("contadores", {}).get("imagens_exibidas", 0)
+        if not total_imagens or exibidas - estado["exibidas_no_ultimo_ciclo"] < total_imagens:
+            return
+        estado["exibidas_no_ultimo_ciclo"] = exibidas
+        gc.collect()
+        amostras_ciclos.append({
+            "ciclo": len(amostras_ciclos) + 1, "hora_virtual": round(relogio.agora_ms / 3_600_000, 2),
+            "rss_kb": _memoria_kb("VmRSS"), "objetos_python": len(gc.get_objects()),
+        })
+
+    duracao_ms = int(horas * 3_600_000)
+    instalar_exibicao_virtual(relogio, largura, altura, duracao_ms, aguardar_trabalho_em_segundo_plano, registrar_ciclo)
+    inicio = time.perf_counter()
+    protetor_tela.iniciar_protetor_tela(config=config)
+    duracao_real_s = time.perf_counter() - inicio
+    protetor_tela.PARAR_RESSINCRONIZACAO.set()
+
+    resumo_metricas = metricas.resumo()
+    prefetcher = protetor_tela.PREFETCHER
+    relatorio = {
+        "sessao": {
+            "horas_virtuais": round(relogio.agora_ms / 3_600_000, 2), "duracao_real_s": round(duracao_real_s, 2),
+            "eventos": relogio.executados, "erros_eventos": relogio.erros,
+            "imagens_disponiveis": len(protetor_tela.IMAGENS_DISPONIVEIS), "ciclos_completos": len(amostras_ciclos),
+            "resolucao": f"{largura}x{altura}",
+        },
+        "trocas": resumo_metricas.get("contadores", {}).get("imagens_exibidas", 0),
+        "decodificacao": prefetcher.resumo_latencias() if prefetcher else None,
+        "caches": {
+            "memoria": prefetcher.cache_memoria.resumo() if prefetcher and prefetcher.cache_memoria else None,
+            "redimensionado": protetor_tela.CACHE_REDIMENSIONADO.resumo() if protetor_tela.CACHE_REDIMENSIONADO else None,
+            "pacote_pixels": protetor_tela.PACOTE_PIXELS.resumo() if protetor_tela.PACOTE_PIXELS else None,
+        },
+        "lista_reproducao": protetor_tela.LISTA_REPRODUCAO.resumo() if protetor_tela.LISTA_REPRODUCAO else None,
+        "quarentena": len(protetor_tela.QUARENTENA) if protetor_tela.QUARENTENA else 0,
+        "memoria": {
+            "pico_rss_kb": _memoria_kb("VmHWM"),
+            "crescimento_rss_kb_por_ciclo": _crescimento_por_ciclo(amostras_ciclos, "rss_kb"),
+            "crescimento_objetos_por_ciclo": _crescimento_por_ciclo(amostras_ciclos, "objetos_python"),
+            "ciclos": amostras_ciclos,
+        },
+        "metricas_fases": resumo_metricas,
+    }
+    if protetor_tela.LISTA_REPRODUCAO:
+        protetor_tela.LISTA_REPRODUCAO.salvar() # Como ao fechar o protetor: a próxima simulação continua a rodada
+    if prefetcher:
+        prefetcher.encerrar()
+    return relatorio
+
+def executar(argumentos):
+    pasta_trabalho = argumentos.pasta_trabalho or tempfile.mkdtemp(prefix="simulador_protetor_")
+    # O estado local (configuração persistida, métricas) e o cache ficam na pasta de trabalho
+    os.environ["LOCALAPPDATA"] = pasta_trabalho
+    try:
+        if argumentos.config:
+            with open(argumentos.config, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        else:
+            import benchmark # Reaproveita o gerador de acervo sintético
+            pasta_imagens = os.path.join(pasta_trabalho, "rede")
+            benchmark.gerar_acervo(pasta_imagens, argumentos.quantidade, argumentos.largura, argumentos.altura, argumentos.formato)
+            config = {
+                "versao_config": "simulador",
+                "pasta_imagens_rede": pasta_imagens,
+                "pasta_cache_local_subpath": "simulador",
+                "tempo_exibicao_imagem_segundos": argumentos.tempo_exibicao,
+                "extensoes_permitidas": [f".{argumentos.formato}"],
+            }
+        # Sem ressincronização durante a sessão (a rede não faz parte do soak) e sem crossfade,
+        # cujo ritmo de quadros é medido em tempo real e não faria sentido no relógio virtual
+        config = dict(config, sincronizacao_em_segundo_plano=False, intervalo_ressincronizacao_segundos=0, transicao_suave=False)
+        largura_tela, altura_tela = (int(valor) for valor in argumentos.resolucao.lower().split("x"))
+        return simular(config, argumentos.horas, largura_tela, altura_tela)
+    finally:
+        if not argumentos.manter_arquivos:
+            shutil.rmtree(pasta_trabalho, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador sem tela do protetor, com relógio virtual (saída em JSON).")
+    parser.add_argument("--horas", type=float, default=12, help="Duração da sessão simulada (horas virtuais).")
+    parser.add_argument("--config", help="Arquivo JSON de configuração (padrão: acervo sintético gerado na pasta de trabalho).")
+    parser.add_argument("--quantidade", type=int, default=30, help="Número de imagens sintéticas.")
+    parser.add_argument("--largura", type=int, default=3000, help="Largura das imagens geradas.")
+    parser.add_argument("--altura", type=int, default=2000, help="Altura das imagens geradas.")
+    parser.add_argument("--formato", choices=["jpg", "png", "gif", "bmp"], default="jpg")
+    parser.add_argument("--tempo-exibicao", type=float, default=10, help="Segundos por imagem (acervo sintético).")
+    parser.add_argument("--resolucao", default="1920x1080", help="Resolução da tela simulada.")
+    parser.add_argument("--pasta-trabalho", help="Pasta para acervo, cache e estado (padrão: temporária).")
+    parser.add_argument("--manter-arquivos", action="store_true", help="Não apaga a pasta de trabalho ao final.")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: stdout).")
+    argumentos = parser.parse_args()
+
+    # Os logs do protetor não fazem parte da simulação; apenas avisos e erros são mantidos
+    logging.getLogger().setLevel(logging.WARNING)
+
+    resultado = executar(argumentos)
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if argumentos.saida:
+        with open(argumentos.saida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
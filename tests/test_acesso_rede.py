@@ -0,0 +1,74 @@
+# test_acesso_rede.py
+import time
+import threading
+
+import pytest
+
+import acesso_rede
+import monitor_pasta
+
+
+@pytest.fixture
+def pasta_travada():
+    """Verificação que só responde quando o teste libera (simula um servidor UNC que não responde)."""
+    liberar = threading.Event()
+    yield lambda pasta: liberar.wait(10)
+    liberar.set()
+
+
+def test_sondagem_travada_desiste_no_prazo(tmp_path, pasta_travada):
+    inicio = time.monotonic()
+    with pytest.raises(TimeoutError):
+        acesso_rede.sondar_pasta(str(tmp_path), 0.2, verificar=pasta_travada)
+    assert time.monotonic() - inicio < 1.0
+
+
+def test_sondagem_seguinte_falha_imediatamente_enquanto_a_anterior_trava(tmp_path, pasta_travada):
+    with pytest.raises(TimeoutError):
+        acesso_rede.executar_com_prazo(lambda: pasta_travada(tmp_path), 0.1, "teste_pendente")
+    inicio = time.monotonic()
+    with pytest.raises(TimeoutError):
+        acesso_rede.executar_com_prazo(lambda: True, 5, "teste_pendente")
+    assert time.monotonic() - inicio < 0.5
+
+
+def test_sondagem_de_pasta_acessivel(tmp_path):
+    acessivel, latencia_ms = acesso_rede.sondar_pasta(str(tmp_path), 5)
+    assert acessivel
+    assert latencia_ms >= 0
+
+
+def test_disjuntor_abre_apos_falha_e_permite_nova_tentativa_apos_espera(tmp_path):
+    disjuntor = acesso_rede.DisjuntorRede(str(tmp_path), r"\\servidor\imagens", espera_inicial_s=0.3)
+    assert disjuntor.estado() == "fechado"
+
+    disjuntor.registrar_falha("sondagem_rede: sem resposta")
+    assert disjuntor.estado() == "aberto"
+    assert not disjuntor.permite_tentativa()
+    # Persistido: a próxima execução também vai direto ao cache
+    assert not acesso_rede.DisjuntorRede(str(tmp_path), r"\\servidor\imagens").permite_tentativa()
+
+    time.sleep(0.4)
+    assert disjuntor.estado() == "meio_aberto"
+    assert disjuntor.permite_tentativa()
+
+    disjuntor.registrar_sucesso(latencia_ms=12.0)
+    assert disjuntor.estado() == "fechado"
+    assert acesso_rede.DisjuntorRede(str(tmp_path), r"\\servidor\imagens").resumo()["latencia_ms"] == 12.0
+
+
+def test_espera_do_disjuntor_dobra_a_cada_falha_seguida(tmp_path):
+    disjuntor = acesso_rede.DisjuntorRede(str(tmp_path), r"\\servidor\imagens", espera_inicial_s=10)
+    disjuntor.registrar_falha("falha 1")
+    primeira_espera = disjuntor.segundos_restantes()
+    disjuntor.registrar_falha("falha 2")
+    assert disjuntor.segundos_restantes() == pytest.approx(2 * primeira_espera, abs=1)
+
+
+def test_monitor_da_pasta_desiste_no_prazo(tmp_path, pasta_travada):
+    monitor = monitor_pasta.MonitorPasta(str(tmp_path), usar_notificacoes=False, prazo_s=0.2)
+    monitor._ler_assinatura = lambda: pasta_travada(tmp_path)
+    inicio = time.monotonic()
+    with pytest.raises(TimeoutError):
+        monitor.verificar_assinatura()
+    assert time.monotonic() - inicio < 1.0
@@ -0,0 +1,20 @@
+# test_armazem_cache.py
+import os
+
+import armazem_cache
+
+EXTENSOES = [".jpg", ".png"]
+
+
+def test_migracao_remove_so_as_copias_temporarias_de_imagens(tmp_path):
+    temporarios_de_estado = [
+        "indice_cache.json.10.20.tmp", "quarentena.json.10.21.tmp", "disjuntor_rede.json.11.30.tmp",
+        "origem_http.json.10.22.tmp", ".teste_gravacao.12.40.tmp",
+    ]
+    for nome in temporarios_de_estado + ["foto.jpg.10.23.tmp"]:
+        (tmp_path / nome).write_bytes(b"em gravacao")
+
+    armazem_cache.ArmazemCache(str(tmp_path)).migrar_arquivos_soltos(EXTENSOES)
+
+    restantes = sorted(entrada.name for entrada in os.scandir(tmp_path) if entrada.is_file())
+    assert restantes == sorted(temporarios_de_estado)
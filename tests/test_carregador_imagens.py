@@ -0,0 +1,35 @@
+# test_carregador_imagens.py
+import io
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+import carregador_imagens
+
+
+def gravar_jpeg(caminho, truncar_em=None):
+    saida = io.BytesIO()
+    Image.new("RGB", (200, 150), (30, 120, 200)).save(saida, format="JPEG")
+    caminho.write_bytes(saida.getvalue()[:truncar_em])
+
+
+def test_imagem_truncada_e_falha_de_decodificacao(tmp_path):
+    caminho = tmp_path / "truncada.jpg"
+    gravar_jpeg(caminho, truncar_em=400)
+
+    with pytest.raises(carregador_imagens.ERROS_DECODIFICACAO):
+        carregador_imagens.preparar_imagem(str(caminho), 100, 100)
+
+
+def test_falha_de_acesso_nao_e_falha_de_decodificacao(tmp_path, monkeypatch):
+    caminho = tmp_path / "boa.jpg"
+    gravar_jpeg(caminho)
+
+    def abrir_bloqueado(*args, **kwargs):
+        raise PermissionError(13, "arquivo em uso por outro processo", str(caminho))
+    monkeypatch.setattr(carregador_imagens.Image, "open", abrir_bloqueado)
+
+    with pytest.raises(PermissionError) as erro:
+        carregador_imagens.preparar_imagem(str(caminho), 100, 100)
+    assert not isinstance(erro.value, carregador_imagens.ERROS_DECODIFICACAO)
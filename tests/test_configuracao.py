@@ -0,0 +1,122 @@
+# test_configuracao.py
+import os
+import json
+import time
+import threading
+import http.server
+
+import pytest
+
+import configuracao
+
+CONFIG_REMOTA = {
+    "versao_config": "teste",
+    "pasta_imagens_rede": "/tmp/imagens",
+    "pasta_cache_local_subpath": "cache_teste",
+    "tempo_exibicao_imagem_segundos": 10,
+}
+ETAG = '"v1"'
+
+
+class ServidorConfiguracao:
+    """http.server local que serve a configuração com ETag e registra o status de cada resposta."""
+
+    def __init__(self, config):
+        self.corpo = json.dumps(config).encode("utf-8")
+        self.respostas = []
+        servidor_teste = self
+
+        class Manipulador(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.headers.get("If-None-Match") == ETAG:
+                    servidor_teste.respostas.append(304)
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                servidor_teste.respostas.append(200)
+                self.send_response(200)
+                self.send_header("ETag", ETAG)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(servidor_teste.corpo)))
+                self.end_headers()
+                self.wfile.write(servidor_teste.corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Manipulador)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.servidor.server_address[1]}/config_remota.json"
+
+    def encerrar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+@pytest.fixture
+def servidor():
+    servidor_config = ServidorConfiguracao(CONFIG_REMOTA)
+    yield servidor_config
+    servidor_config.encerrar()
+
+
+def test_busca_condicional_usa_copia_persistida_no_304(servidor, tmp_path):
+    primeira = configuracao.carregar_configuracao(servidor.url, pasta_estado=str(tmp_path))
+    segunda = configuracao.carregar_configuracao(servidor.url, pasta_estado=str(tmp_path))
+
+    assert servidor.respostas == [200, 304]
+    assert segunda == primeira
+    assert segunda["versao_config"] == "teste"
+    persistida = configuracao.ler_config_persistida(servidor.url, str(tmp_path))
+    assert persistida["etag"] == ETAG
+
+
+def test_dentro_do_ttl_a_origem_nao_e_consultada(tmp_path):
+    servidor_config = ServidorConfiguracao(dict(CONFIG_REMOTA, ttl_configuracao_segundos=3600))
+    try:
+        configuracao.carregar_configuracao(servidor_config.url, pasta_estado=str(tmp_path))
+        config = configuracao.carregar_configuracao(servidor_config.url, pasta_estado=str(tmp_path))
+    finally:
+        servidor_config.encerrar()
+
+    assert servidor_config.respostas == [200]
+    assert config["versao_config"] == "teste"
+
+
+def test_origem_inacessivel_usa_copia_persistida(servidor, tmp_path):
+    configuracao.carregar_configuracao(servidor.url, pasta_estado=str(tmp_path))
+    servidor.encerrar()
+
+    config = configuracao.carregar_configuracao(servidor.url, pasta_estado=str(tmp_path))
+
+    assert config["versao_config"] == "teste"
+    assert config["pasta_cache_local_completa"].endswith("cache_teste")
+
+
+def test_origem_inacessivel_sem_copia_persistida_falha(servidor, tmp_path):
+    servidor.encerrar()
+
+    with pytest.raises(ConnectionError):
+        configuracao.carregar_configuracao(servidor.url, pasta_estado=str(tmp_path))
+
+
+def test_pasta_de_cache_e_criada_e_aceita_gravacao(tmp_path):
+    config = {"pasta_cache_local_completa": str(tmp_path / "ProgramData" / "cache_teste"), "cache_compartilhado_maquina": True}
+
+    assert configuracao.preparar_pasta_cache(config)
+    assert os.listdir(config["pasta_cache_local_completa"]) == []
+
+
+def test_origem_travada_usa_copia_persistida_no_prazo(servidor, tmp_path, monkeypatch):
+    configuracao.carregar_configuracao(servidor.url, pasta_estado=str(tmp_path))
+    liberar = threading.Event()
+    servidor.servidor.RequestHandlerClass.do_GET = lambda manipulador: liberar.wait(10)
+    monkeypatch.setattr(configuracao, "PRAZO_COM_COPIA_LOCAL_SEGUNDOS", 0.3)
+    try:
+        inicio = time.monotonic()
+        config = configuracao.carregar_configuracao(servidor.url, pasta_estado=str(tmp_path))
+        assert time.monotonic() - inicio < 2.0
+    finally:
+        liberar.set()
+
+    assert config["versao_config"] == "teste"
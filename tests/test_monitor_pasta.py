@@ -0,0 +1,45 @@
+# test_monitor_pasta.py
+import os
+import threading
+
+
+def test_alteracao_durante_a_primeira_sincronizacao_leva_a_ressincronizacao(tmp_path, tmp_path_factory, monkeypatch):
+    monkeypatch.setenv("TEMP", str(tmp_path_factory.mktemp("log"))) # Log do protetor fora do repositório
+    import protetor_tela
+
+    pasta_rede = tmp_path / "rede"
+    pasta_rede.mkdir()
+    (pasta_rede / "img1.jpg").write_bytes(b"versao 1")
+    config = {
+        "pasta_imagens_rede": str(pasta_rede), "pasta_cache_local_completa": str(tmp_path / "cache"),
+        "intervalo_ressincronizacao_segundos": 0.2, "notificacoes_pasta_rede": False, "extensoes_permitidas": [".jpg"],
+    }
+    sincronizacoes = []
+    ressincronizou = threading.Event()
+
+    def sincronizar_e_entregar(config, nome_temporizador="sincronizacao", alteracoes=None):
+        sincronizacoes.append((nome_temporizador, alteracoes))
+        if nome_temporizador == "sincronizacao":
+            # Sobrescrita no lugar enquanto a primeira sincronização copia (mesmo tamanho, data restaurada na pasta)
+            mtime_pasta = os.stat(pasta_rede).st_mtime_ns
+            (pasta_rede / "img1.jpg").write_bytes(b"versao 2")
+            os.utime(pasta_rede / "img1.jpg", ns=(mtime_pasta + 10**9, mtime_pasta + 10**9))
+            os.utime(pasta_rede, ns=(mtime_pasta, mtime_pasta))
+        else:
+            ressincronizou.set()
+            protetor_tela.PARAR_RESSINCRONIZACAO.set()
+
+    monkeypatch.setattr(protetor_tela, "_sincronizar_e_entregar", sincronizar_e_entregar)
+    protetor_tela.PARAR_RESSINCRONIZACAO.clear()
+    thread = threading.Thread(target=protetor_tela._executar_sincronizacao_em_segundo_plano, args=(config, True), daemon=True)
+    thread.start()
+    try:
+        assert ressincronizou.wait(5)
+    finally:
+        protetor_tela.PARAR_RESSINCRONIZACAO.set()
+        thread.join(5)
+        protetor_tela.PARAR_RESSINCRONIZACAO.clear()
+
+    nome, alteracoes = sincronizacoes[-1]
+    assert nome == "ressincronizacao"
+    assert alteracoes[1] == {"img1.jpg"}
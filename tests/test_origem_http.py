@@ -0,0 +1,130 @@
+# test_origem_http.py
+import os
+import threading
+import http.server
+
+import pytest
+
+import origem_http
+
+ETAG = '"img-v1"'
+CONTEUDO = bytes(range(256)) * 2048 # 512 KB: maior que TAMANHO_BLOCO_DOWNLOAD, para que parte seja gravada antes da queda
+
+
+class ServidorImagens:
+    """
+    http.server local que serve CONTEUDO com ETag, 304 (If-None-Match) e Range/If-Range.
+    Enquanto 'truncar' for verdadeiro, as respostas completas anunciam o tamanho todo mas
+    fecham a conexão na metade do corpo (simula a queda da rede no meio do download).
+    """
+
+    def __init__(self):
+        self.requisicoes = [] # (status, cabeçalhos relevantes) de cada resposta
+        self.truncar = False
+        self.intervalo_errado = False # Responde 206 a partir do byte 0, ignorando o início pedido
+        servidor_teste = self
+
+        class Manipulador(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                cabecalhos = {nome: self.headers.get(nome) for nome in ("If-None-Match", "Range", "If-Range") if self.headers.get(nome)}
+                if self.headers.get("If-None-Match") == ETAG:
+                    servidor_teste.requisicoes.append((304, cabecalhos))
+                    self.send_response(304)
+                    self.send_header("ETag", ETAG)
+                    self.end_headers()
+                    return
+                intervalo = self.headers.get("Range")
+                if intervalo and self.headers.get("If-Range") == ETAG:
+                    inicio = 0 if servidor_teste.intervalo_errado else int(intervalo.split("=", 1)[1].split("-", 1)[0])
+                    corpo = CONTEUDO[inicio:]
+                    servidor_teste.requisicoes.append((206, cabecalhos))
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {inicio}-{len(CONTEUDO) - 1}/{len(CONTEUDO)}")
+                else:
+                    corpo = CONTEUDO
+                    servidor_teste.requisicoes.append((200, cabecalhos))
+                    self.send_response(200)
+                self.send_header("ETag", ETAG)
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                if servidor_teste.truncar and len(corpo) == len(CONTEUDO):
+                    self.wfile.write(corpo[:len(corpo) * 3 // 4])
+                    self.close_connection = True
+                    return
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Manipulador)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.url_base = f"http://127.0.0.1:{self.servidor.server_address[1]}/imagens/"
+
+    def encerrar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+@pytest.fixture
+def servidor():
+    servidor_imagens = ServidorImagens()
+    yield servidor_imagens
+    servidor_imagens.encerrar()
+
+
+@pytest.fixture
+def origem(servidor, tmp_path):
+    origem = origem_http.OrigemHttp(servidor.url_base, str(tmp_path / "cache"), timeout_s=5)
+    yield origem
+    origem.fechar()
+
+
+def test_etag_inalterada_dispensa_o_download(servidor, origem, tmp_path):
+    destino = str(tmp_path / "foto.jpg")
+    assert origem.baixar("foto.jpg", destino) == len(CONTEUDO)
+    os.remove(destino)
+
+    assert origem.baixar("foto.jpg", destino, condicional=True) is None
+
+    assert servidor.requisicoes[-1] == (304, {"If-None-Match": ETAG})
+    assert not os.path.exists(destino)
+
+
+def test_download_interrompido_e_retomado_com_range(servidor, origem, tmp_path):
+    destino = str(tmp_path / "foto.jpg")
+    servidor.truncar = True
+    with pytest.raises(OSError):
+        origem.baixar("foto.jpg", destino)
+    assert not os.path.exists(destino)
+
+    servidor.truncar = False
+    recebidos = origem.baixar("foto.jpg", destino)
+
+    status, cabecalhos = servidor.requisicoes[-1]
+    assert status == 206
+    assert cabecalhos["If-Range"] == ETAG
+    assert cabecalhos["Range"] == f"bytes={len(CONTEUDO) - recebidos}-"
+    assert 0 < recebidos < len(CONTEUDO)
+    with open(destino, 'rb') as f:
+        assert f.read() == CONTEUDO
+    assert not os.listdir(origem.pasta_parciais)
+
+
+def test_retomada_com_intervalo_inesperado_descarta_o_parcial(servidor, origem, tmp_path):
+    destino = str(tmp_path / "foto.jpg")
+    servidor.truncar = True
+    with pytest.raises(OSError):
+        origem.baixar("foto.jpg", destino)
+    servidor.truncar = False
+    servidor.intervalo_errado = True
+    with pytest.raises(OSError):
+        origem.baixar("foto.jpg", destino)
+    assert not os.listdir(origem.pasta_parciais)
+
+    assert origem.baixar("foto.jpg", destino) == len(CONTEUDO)
+
+    assert servidor.requisicoes[-1] == (200, {})
+    with open(destino, 'rb') as f:
+        assert f.read() == CONTEUDO
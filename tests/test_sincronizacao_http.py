@@ -0,0 +1,103 @@
+# test_sincronizacao_http.py
+import os
+import io
+import json
+import threading
+import http.server
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+QUANTIDADE_IMAGENS = 6
+
+
+def gerar_png(semente):
+    imagem = Image.frombytes("RGB", (64, 64), bytes((semente * 7 + i) % 256 for i in range(64 * 64 * 3)))
+    saida = io.BytesIO()
+    imagem.save(saida, format="PNG")
+    return saida.getvalue()
+
+
+class ServidorPastaImagens:
+    """Pasta de imagens por HTTP com ETag/304 e um manifesto só com os tamanhos (sem mtime nem hash)."""
+
+    def __init__(self, arquivos):
+        self.arquivos = arquivos
+        self.respostas = []
+        servidor_teste = self
+        manifesto = json.dumps({
+            "versao": 1, "arquivos": {nome: {"tamanho": len(corpo)} for nome, corpo in arquivos.items()}
+        }).encode("utf-8")
+
+        class Manipulador(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                nome = self.path.rsplit("/", 1)[-1]
+                corpo = manifesto if nome == "manifesto.json" else servidor_teste.arquivos.get(nome)
+                if corpo is None:
+                    self.send_error(404)
+                    return
+                etag = f'"{hash(corpo) & 0xffffffff:x}"'
+                if self.headers.get("If-None-Match") == etag:
+                    servidor_teste.respostas.append((nome, 304))
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                servidor_teste.respostas.append((nome, 200))
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Manipulador)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.url_base = f"http://127.0.0.1:{self.servidor.server_address[1]}/imagens/"
+
+    def downloads(self):
+        return [nome for nome, status in self.respostas if status == 200 and nome != "manifesto.json"]
+
+    def encerrar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+@pytest.fixture
+def protetor_tela(tmp_path_factory, monkeypatch):
+    monkeypatch.setenv("TEMP", str(tmp_path_factory.mktemp("log"))) # Log do protetor fora do repositório
+    import protetor_tela
+    yield protetor_tela
+    if protetor_tela.ORIGEM_HTTP:
+        protetor_tela.ORIGEM_HTTP.fechar()
+    protetor_tela.ORIGEM_HTTP = None
+    protetor_tela.LISTA_REPRODUCAO = None
+
+
+def test_revalidacao_com_limite_de_cache_nao_remove_nem_baixa_de_novo(protetor_tela, tmp_path):
+    arquivos = {f"img{i}.png": gerar_png(i) for i in range(QUANTIDADE_IMAGENS)}
+    servidor = ServidorPastaImagens(arquivos)
+    tamanho_acervo = sum(len(corpo) for corpo in arquivos.values())
+    config = {
+        "pasta_imagens_rede": servidor.url_base,
+        "url_listagem_imagens": servidor.url_base + "manifesto.json",
+        "pasta_cache_local_completa": str(tmp_path / "cache"),
+        "extensoes_permitidas": [".png"],
+        "limite_cache_mb": tamanho_acervo * 1.1 / (1024 * 1024),
+    }
+    protetor_tela.LISTA_REPRODUCAO = None
+    protetor_tela.obter_lista_reproducao(str(tmp_path / "estado"))
+    try:
+        resultados = [protetor_tela.sincronizar_cache(config) for _ in range(3)]
+    finally:
+        servidor.encerrar()
+
+    assert [len(imagens) for imagens in resultados] == [QUANTIDADE_IMAGENS] * 3
+    assert sorted(servidor.downloads()) == sorted(arquivos) # Baixadas uma única vez; depois, só 304
+    assert protetor_tela.obter_armazem(config).tamanho_total() == tamanho_acervo
@@ -0,0 +1,67 @@
+# transicao.py
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image # pip install Pillow
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+QUADROS_ANTECIPADOS = 3 # Quadros intermediários preparados à frente do relógio (limita a memória usada)
+
+class TransicaoSuave:
+    """
+    Crossfade entre a imagem exibida e a próxima, ambas já redimensionadas para a tela.
+    Os quadros intermediários são misturados em uma thread própria com Image.blend (operação
+    sobre todos os pixels de uma vez, em C) e entregues prontos à thread do Tkinter, que apenas
+    os exibe no ritmo do relógio de quadros. O quadro final é a própria imagem nova.
+    """
+
+    def __init__(self, img_anterior, img_nova, num_quadros):
+        self.img_nova = img_nova
+        self.num_quadros = max(1, int(num_quadros))
+        self.indice_exibido = 0 # Último quadro exibido (0 = imagem anterior)
+        self.quadros_exibidos = 0
+        self.quadros_perdidos = 0 # Quadros que não ficaram prontos a tempo do relógio
+        self.instante_inicio = None # Definido pela thread do Tkinter ao exibir o primeiro quadro
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="TransicaoSuave")
+        self._futuros = {} # {indice: Future} (acessado apenas pela thread do Tkinter)
+        self._bases = self._executor.submit(self._preparar_bases, img_anterior, img_nova)
+
+    @staticmethod
+    def _sobre_fundo_preto(img_pil, tamanho):
+        """Centraliza a imagem (em RGB) sobre um fundo preto do tamanho informado, como o Label a exibe."""
+        fundo = Image.new("RGB", tamanho, "black")
+        posicao = ((tamanho[0] - img_pil.width) // 2, (tamanho[1] - img_pil.height) // 2)
+        if img_pil.mode in ("RGBA", "LA", "PA") or (img_pil.mode == "P" and "transparency" in img_pil.info):
+            img_rgba = img_pil.convert("RGBA")
+            fundo.paste(img_rgba, posicao, img_rgba)
+        else:
+            fundo.paste(img_pil.convert("RGB"), posicao)
+        return fundo
+
+    def _preparar_bases(self, img_anterior, img_nova):
+        # As duas imagens podem ter proporções diferentes: ambas são levadas ao mesmo tamanho (o maior em cada eixo)
+        tamanho = (max(img_anterior.width, img_nova.width), max(img_anterior.height, img_nova.height))
+        return self._sobre_fundo_preto(img_anterior, tamanho), self._sobre_fundo_preto(img_nova, tamanho)
+
+    def _misturar(self, indice):
+        base_anterior, base_nova = self._bases.result()
+        return Image.blend(base_anterior, base_nova, indice / self.num_quadros)
+
+    def futuro_quadro(self, indice):
+        """
+        Retorna o Future do quadro intermediário 'indice' (1 a num_quadros - 1) e agenda os próximos,
+        descartando os que ficaram para trás.
+        """
+        for indice_antigo in [i for i in self._futuros if i < indice]:
+            self._futuros.pop(indice_antigo).cancel()
+        for i in range(indice, min(indice + QUADROS_ANTECIPADOS, self.num_quadros)):
+            if i not in self._futuros:
+                self._futuros[i] = self._executor.submit(self._misturar, i)
+        return self._futuros[indice]
+
+    def encerrar(self):
+        """Descarta os quadros pendentes e libera a thread da transição."""
+        self._futuros.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
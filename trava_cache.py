@@ -0,0 +1,201 @@
+# trava_cache.py
+import os
+import sys
+import json
+import time
+import uuid
+import ctypes
+import socket
+import logging
+import threading
+
+# Usaremos o logger configurado no script principal
+logger = logging.getLogger(__name__)
+
+NOME_TRAVA = "sincronizacao.lock" # Na raiz da pasta de cache
+INTERVALO_RENOVACAO_S = 10 # O dono da trava atualiza a data do arquivo periodicamente
+LIMITE_TRAVA_OBSOLETA_S = 60 # Sem renovação por mais que isso, a trava é considerada abandonada
+INTERVALO_ESPERA_S = 0.5
+
+def _processo_ativo(pid):
+    """True se o processo (nesta máquina) ainda existe."""
+    if sys.platform == "win32":
+        import ctypes.wintypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        STILL_ACTIVE = 259
+        ERROR_ACCESS_DENIED = 5
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.OpenProcess.restype = ctypes.wintypes.HANDLE
+        kernel32.OpenProcess.argtypes = [ctypes.wintypes.DWORD, ctypes.wintypes.BOOL, ctypes.wintypes.DWORD]
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return ctypes.get_last_error() == ERROR_ACCESS_DENIED # Existe, mas pertence a outro usuário
+        try:
+            codigo_saida = ctypes.wintypes.DWORD()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(codigo_saida)):
+                return True
+            return codigo_saida.value == STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True # Existe, mas pertence a outro usuário
+    return True
+
+
+class TravaSincronizacao:
+    """
+    Trava entre processos (e usuários) sobre a pasta de cache: apenas o dono sincroniza com a rede
+    e grava o índice; as demais instâncias leem o índice já gravado, que é sempre consistente
+    (gravação atômica e objetos imutáveis, endereçados pelo hash).
+
+    A trava é um arquivo criado de forma exclusiva (O_EXCL), com a identificação do dono, cuja data
+    é renovada por uma thread enquanto ela estiver em uso. Uma trava sem renovação há mais de
+    LIMITE_TRAVA_OBSOLETA_S, ou cujo processo dono (nesta máquina) não existe mais, é recuperada.
+    """
+
+    def __init__(self, pasta_cache):
+        self.caminho_trava = os.path.join(pasta_cache, NOME_TRAVA)
+        self._token = None
+        self._parar_renovacao = threading.Event()
+        self._thread_renovacao = None
+
+    @property
+    def adquirida(self):
+        return self._token is not None
+
+    def _ler_trava(self):
+        """Retorna (dados do dono, idade em segundos) da trava existente, ou (None, None) se não existir."""
+        try:
+            idade_s = time.time() - os.path.getmtime(self.caminho_trava)
+        except FileNotFoundError:
+            return None, None
+        except OSError:
+            return {}, 0.0
+        try:
+            with open(self.caminho_trava, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+            return (dados if isinstance(dados, dict) else {}), idade_s
+        except FileNotFoundError:
+            return None, None
+        except (OSError, ValueError):
+            return {}, idade_s # Sendo gravada agora (ou corrompida): avaliada apenas pela idade
+
+    def descricao_dono(self):
+        dados, _ = self._ler_trava()
+        if not dados:
+            return "desconhecido"
+        return f"{dados.get('usuario', '?')}@{dados.get('maquina', '?')}, pid {dados.get('pid', '?')}"
+
+    def _obsoleta(self, dados, idade_s):
+        if idade_s > LIMITE_TRAVA_OBSOLETA_S:
+            return True
+        if dados and dados.get("maquina") == socket.gethostname() and isinstance(dados.get("pid"), int):
+            return dados["pid"] != os.getpid() and not _processo_ativo(dados["pid"])
+        return False
+
+    def _recuperar_obsoleta(self):
+        """Remove a trava existente se estiver abandonada. Retorna True se a trava não existe mais."""
+        dados, idade_s = self._ler_trava()
+        if dados is None:
+            return True
+        if not self._obsoleta(dados, idade_s):
+            return False
+        # Renomear é atômico: se duas instâncias tentarem recuperar ao mesmo tempo, apenas uma consegue
+        caminho_descartado = f"{self.caminho_trava}.{os.getpid()}.{threading.get_ident()}.obsoleta"
+        try:
+            os.rename(self.caminho_trava, caminho_descartado)
+        except OSError:
+            return False
+        try:
+            with open(caminho_descartado, 'r', encoding='utf-8') as f:
+                dados_descartados = json.load(f)
+        except (OSError, ValueError):
+            dados_descartados = {}
+        if dados and dados_descartados.get("token") != dados.get("token"):
+            # Outra instância recuperou e recriou a trava entre a leitura e a renomeação: devolve a dela
+            try:
+                os.rename(caminho_descartado, self.caminho_trava)
+            except OSError:
+                pass
+            return False
+        try:
+            os.remove(caminho_descartado)
+        except OSError:
+            pass
+        logger.warning(f"Trava de sincronização abandonada recuperada (dono: {dados or 'desconhecido'}, sem renovação há {idade_s:.0f} s).")
+        return True
+
+    def tentar_adquirir(self):
+        """Tenta obter a trava sem esperar. Retorna True se esta instância passou a ser a dona."""
+        if self._token:
+            return True
+        for _ in range(2): # Segunda tentativa após recuperar uma trava abandonada
+            try:
+                descritor = os.open(self.caminho_trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not self._recuperar_obsoleta():
+                    return False
+                continue
+            except OSError as e:
+                logger.warning(f"Não foi possível criar a trava de sincronização '{self.caminho_trava}': {e}")
+                return False
+            token = uuid.uuid4().hex
+            dono = {
+                "token": token, "pid": os.getpid(), "maquina": socket.gethostname(),
+                "usuario": os.getenv("USERNAME") or os.getenv("USER") or "?", "criada_em": time.time(),
+            }
+            with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+                json.dump(dono, f)
+            self._token = token
+            self._parar_renovacao.clear()
+            self._thread_renovacao = threading.Thread(target=self._renovar, name="RenovacaoTravaCache", daemon=True)
+            self._thread_renovacao.start()
+            return True
+        return False
+
+    def _renovar(self):
+        while not self._parar_renovacao.wait(INTERVALO_RENOVACAO_S):
+            try:
+                os.utime(self.caminho_trava)
+            except OSError as e:
+                logger.warning(f"Não foi possível renovar a trava de sincronização: {e}")
+
+    def liberar(self):
+        """Libera a trava (se esta instância for a dona)."""
+        if not self._token:
+            return
+        self._parar_renovacao.set()
+        dados, _ = self._ler_trava()
+        if dados and dados.get("token") == self._token:
+            try:
+                os.remove(self.caminho_trava)
+            except OSError as e:
+                logger.warning(f"Não foi possível remover a trava de sincronização: {e}")
+        else:
+            logger.warning("A trava de sincronização foi recuperada por outra instância antes de ser liberada.")
+        self._token = None
+
+    def aguardar_liberacao(self, prazo_segundos):
+        """
+        Aguarda (sem adquirir) até a trava de outra instância ser liberada ou ficar obsoleta.
+        Retorna True se ela foi liberada dentro do prazo.
+        """
+        limite = time.monotonic() + prazo_segundos
+        while True:
+            dados, idade_s = self._ler_trava()
+            if dados is None:
+                return True
+            if self._obsoleta(dados, idade_s) or time.monotonic() >= limite:
+                return False
+            time.sleep(INTERVALO_ESPERA_S)
+
+    def __enter__(self):
+        return self.tentar_adquirir()
+
+    def __exit__(self, *exc):
+        self.liberar()
+        return False